@@ -1,8 +1,83 @@
 import asyncio
 import json
+import os
+import sys
 from typing import Dict, List, Any
 from dataclasses import dataclass
 from enum import Enum
+import importlib.util
+# Load once per process so every agent shares one index
+knowledge_index_module = sys.modules.get("knowledge_index")
+if knowledge_index_module is None:
+    spec = importlib.util.spec_from_file_location("knowledge_index", "knowledge-index.py")
+    knowledge_index_module = importlib.util.module_from_spec(spec)
+    sys.modules["knowledge_index"] = knowledge_index_module
+    spec.loader.exec_module(knowledge_index_module)
+KnowledgeIndex = knowledge_index_module.KnowledgeIndex
+get_knowledge_index = knowledge_index_module.get_knowledge_index
+
+# Load once per process so every agent shares one connection pool
+llm_client_module = sys.modules.get("llm_client")
+if llm_client_module is None:
+    spec = importlib.util.spec_from_file_location("llm_client", "llm-client.py")
+    llm_client_module = importlib.util.module_from_spec(spec)
+    sys.modules["llm_client"] = llm_client_module
+    spec.loader.exec_module(llm_client_module)
+LLMClientPool = llm_client_module.LLMClientPool
+project_scope = llm_client_module.token_budget_module.project_scope
+
+spec = importlib.util.spec_from_file_location("writing_agent", "writing-agent.py")
+writing_agent_module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(writing_agent_module)
+WritingAgent = writing_agent_module.WritingAgent
+StoryBible = writing_agent_module.StoryBible
+default_outline = writing_agent_module.default_outline
+ChapterPlan = writing_agent_module.ChapterPlan
+Chapter = writing_agent_module.Chapter
+OutlineTree = writing_agent_module.OutlineTree
+
+spec = importlib.util.spec_from_file_location("editing_agent", "editing-agent.py")
+editing_agent_module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(editing_agent_module)
+EditingAgent = editing_agent_module.EditingAgent
+
+# Load once per process so Manuscript and ArtifactStore are the same classes everywhere
+manuscript_module = sys.modules.get("manuscript")
+if manuscript_module is None:
+    spec = importlib.util.spec_from_file_location("manuscript", "manuscript.py")
+    manuscript_module = importlib.util.module_from_spec(spec)
+    sys.modules["manuscript"] = manuscript_module
+    spec.loader.exec_module(manuscript_module)
+ArtifactStore = manuscript_module.ArtifactStore
+Manuscript = manuscript_module.Manuscript
+
+spec = importlib.util.spec_from_file_location("manuscript_buffer", "manuscript-buffer.py")
+manuscript_buffer_module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(manuscript_buffer_module)
+ManuscriptBuffer = manuscript_buffer_module.ManuscriptBuffer
+
+spec = importlib.util.spec_from_file_location("consistency_checker", "consistency-checker.py")
+consistency_checker_module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(consistency_checker_module)
+ConsistencyChecker = consistency_checker_module.ConsistencyChecker
+
+spec = importlib.util.spec_from_file_location("manuscript_metrics", "manuscript-metrics.py")
+manuscript_metrics_module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(manuscript_metrics_module)
+ManuscriptMetrics = manuscript_metrics_module.ManuscriptMetrics
+
+# Registered by name so export workers can unpickle its render function
+book_export_module = sys.modules.get("book_export")
+if book_export_module is None:
+    spec = importlib.util.spec_from_file_location("book_export", "book-export.py")
+    book_export_module = importlib.util.module_from_spec(spec)
+    sys.modules["book_export"] = book_export_module
+    spec.loader.exec_module(book_export_module)
+BookExporter = book_export_module.BookExporter
+EXPORT_FORMATS = book_export_module.EXPORT_FORMATS
+
+# RAG knowledge sources, laid out as <domain>/[<genre>/]<document>.md
+KNOWLEDGE_BASE_DIR = os.getenv("KNOWLEDGE_BASE_DIR", "knowledge_base")
 
 class ProjectStatus(Enum):
     REQUESTED = "requested"
@@ -15,6 +90,13 @@ class ProjectStatus(Enum):
     FINAL_REVIEW = "final_review"
     COMPLETED = "completed"
 
+# Where each chapter is in the writing -> editing -> narration pipeline, in order
+CHAPTER_STAGES = ["planned", "written", "edited", "narrated"]
+PIPELINE_STATUSES = (ProjectStatus.WRITING_IN_PROGRESS, ProjectStatus.EDITING, ProjectStatus.AUDIOBOOK_PRODUCTION)
+
+# Beats an outline is checked against for arc coverage
+STORY_ARC = [title for title, _ in writing_agent_module.DEFAULT_BEATS]
+
 @dataclass
 class BookProject:
     id: str
@@ -29,27 +111,55 @@ class BookProject:
     assigned_writer_id: str = None
     assigned_editor_id: str = None
     outline: str = None
-    manuscript: str = None
+    outline_tree: OutlineTree = None
+    approval_required: bool = False
+    manuscript: Manuscript = None
+    revisions: ManuscriptBuffer = None
     cover_design: str = None
     audiobook_url: str = None
+    audiobook_requested: bool = False
+    chapter_progress: Dict[int, str] = None
+    audio_tracks: Dict[int, str] = None
+    characters: List[Any] = None
+    world: Any = None
+    consistency: ConsistencyChecker = None
+    completed: bool = False
+
+    @property
+    def wants_audiobook(self) -> bool:
+        return self.audiobook_requested or bool(self.audiobook_url)
 
 class AgentCoordinator:
     """
     Master agent that coordinates the entire book creation workflow
     """
     
-    def __init__(self):
+    def __init__(self, knowledge_index: KnowledgeIndex = None, llm_client: LLMClientPool = None,
+                 artifact_store: ArtifactStore = None):
+        self.llm_client = llm_client or llm_client_module.get_llm_client()
+        self.artifact_store = artifact_store or ArtifactStore()
+        self.knowledge_index = knowledge_index or get_knowledge_index()
+        if knowledge_index is None and os.path.isdir(KNOWLEDGE_BASE_DIR):
+            self.knowledge_index.sync_directory(KNOWLEDGE_BASE_DIR)
         self.agents = {
-            'development': DevelopmentAgent(),
-            'research': ResearchAgent(),
-            'outline': OutlineAgent(),
-            'writing': WritingAgent(),
-            'editing': EditingAgent(),
-            'cover_design': CoverDesignAgent(),
-            'audiobook': AudiobookAgent()
+            'development': DevelopmentAgent(knowledge_index=self.knowledge_index),
+            'research': ResearchAgent(knowledge_index=self.knowledge_index),
+            'outline': OutlineAgent(knowledge_index=self.knowledge_index),
+            'writing': WritingAgent(llm_client=self.llm_client),
+            'editing': EditingAgent(llm_client=self.llm_client),
+            'cover_design': CoverDesignAgent(knowledge_index=self.knowledge_index),
+            'audiobook': AudiobookAgent(knowledge_index=self.knowledge_index)
         }
+        # Each agent only searches the partitions named in its rag_knowledge,
+        # and all of them share one index and one LLM connection pool
+        for agent in self.agents.values():
+            if agent.knowledge is None:
+                agent.knowledge = self.knowledge_index.scoped(agent.rag_knowledge)
+            agent.llm_client = self.llm_client
+        self.manuscript_metrics = ManuscriptMetrics()
+        self.exporter = BookExporter(self.artifact_store)
         self.active_projects = {}
-        self.workflow_manager = WorkflowManager()
+        self.workflow_manager = WorkflowManager(self.agents, self.artifact_store)
     
     async def process_book_request(self, customer_request: Dict[str, Any]) -> BookProject:
         """
@@ -63,6 +173,10 @@ class AgentCoordinator:
             genre=customer_request.get('genre'),
             tone=customer_request.get('tone'),
             requirements=customer_request.get('requirements'),
+            audiobook_requested=bool(customer_request.get('audiobook', False)),
+            approval_required=bool(customer_request.get('approval_required', False)),
+            characters=customer_request.get('characters'),
+            world=customer_request.get('world'),
             status=ProjectStatus.REQUESTED,
             created_at=customer_request.get('created_at'),
             updated_at=customer_request.get('updated_at')
@@ -71,8 +185,9 @@ class AgentCoordinator:
         # Store project
         self.active_projects[project.id] = project
         
-        # Start workflow
-        await self.workflow_manager.execute_workflow(project)
+        # Start workflow; every LLM call it makes is billed to this project
+        with project_scope(project.id):
+            await self.workflow_manager.execute_workflow(project)
         
         return project
     
@@ -89,13 +204,196 @@ class AgentCoordinator:
             "status": project.status.value,
             "title": project.title,
             "genre": project.genre,
-            "progress": self._calculate_progress(project.status),
+            "progress": self._calculate_progress(project.status, self._chapter_fraction(project)),
             "current_stage": self._get_current_stage(project.status),
-            "estimated_completion": self._estimate_completion(project.status)
+            "estimated_completion": self._estimate_completion(project.status),
+            "chapters": self._chapter_status(project),
+            "outline": {
+                "chapters": len(project.outline_tree.chapters()),
+                "approved_chapters": project.outline_tree.root.approved_chapters(),
+                "word_target": project.outline_tree.total_words()
+            } if project.outline_tree else None,
+            "manuscript": project.manuscript.get_stats() if project.manuscript else None,
+            "audio_tracks": dict(sorted(project.audio_tracks.items())) if project.audio_tracks else None,
+            "token_usage": self.llm_client.ledger.project_usage(project.id)
+        }
+    
+    async def revise_chapter(self, project_id: str, number: int, text: str) -> Dict[str, Any]:
+        """
+        Re-edit a chapter after a customer revision. Only changed paragraphs (plus a
+        little context) go back to the editing model; the rest reuse cached edits.
+        """
+        project = self.active_projects.get(project_id)
+        if project is None or not project.manuscript or number not in project.manuscript.entries:
+            return {"error": "Chapter not found"}
+        
+        entry = project.manuscript.entries[number]
+        with project_scope(project.id):
+            result = await self.agents['editing'].edit_text(text, key=f"{project.id}:{number}", genre=project.genre)
+        buffer = revision_buffer(project)
+        project.manuscript.add_chapter(number, entry.title, result.text)
+        buffer.replace_chapter(sorted(project.manuscript.entries).index(number), result.text)
+        snapshot = buffer.snapshot(f"chapter {number} revision")
+        report = consistency_checker(project).check_chapter(number, result.text)
+        return {
+            "chapter": number,
+            "version": snapshot.version,
+            "paragraphs": result.paragraphs,
+            "changed_paragraphs": result.changed,
+            "paragraphs_sent": result.sent,
+            "paragraphs_reused": result.reused,
+            "consistency_issues": len(report.issues)
         }
     
-    def _calculate_progress(self, status: ProjectStatus) -> int:
-        """Calculate project completion percentage"""
+    async def get_revisions(self, project_id: str, version: int = None, chapter: int = None) -> Dict[str, Any]:
+        """
+        Version history of the manuscript under revision. With a version (and
+        optionally a chapter number) the text as it stood at that snapshot.
+        """
+        project = self.active_projects.get(project_id)
+        if project is None or not project.manuscript:
+            return {"error": "Manuscript not found"}
+        buffer = revision_buffer(project)
+        versions = [
+            {"version": s.version, "label": s.label, "created_at": s.created_at, "length": s.length}
+            for s in buffer.history
+        ]
+        if version is None:
+            return {"versions": versions, "buffer": buffer.get_stats()}
+        if not any(snapshot.version == version for snapshot in buffer.history):
+            return {"error": f"Unknown version: {version}"}
+        view = buffer.at(version)
+        if chapter is None:
+            return {"version": version, "text": view.text()}
+        index = sorted(project.manuscript.entries).index(chapter) if chapter in project.manuscript.entries else -1
+        if not 0 <= index < view.chapter_count:
+            return {"error": f"Chapter not found: {chapter}"}
+        return {"version": version, "chapter": chapter, "text": view.chapter_text(index)}
+    
+    async def get_outline(self, project_id: str) -> Dict[str, Any]:
+        """The outline tree with word targets, act balance, arc coverage, progress and approvals"""
+        project = self.active_projects.get(project_id)
+        if project is None or project.outline_tree is None:
+            return {"error": "Outline not found"}
+        return project.outline_tree.to_dict(arc=STORY_ARC, stages=3 if project.wants_audiobook else 2)
+    
+    async def update_outline(self, project_id: str, node_id: str, **fields) -> Dict[str, Any]:
+        """Edit one outline node; only the aggregates on its path to the root are recomputed"""
+        project = self.active_projects.get(project_id)
+        if project is None or project.outline_tree is None:
+            return {"error": "Outline not found"}
+        try:
+            node = project.outline_tree.node(node_id)
+        except KeyError as e:
+            return {"error": str(e.args[0])}
+        node.update(**{name: value for name, value in fields.items() if value is not None})
+        project.outline = project.outline_tree.render()
+        return {"node": node.to_dict(), "act_balance": project.outline_tree.act_balance()}
+    
+    async def approve_outline(self, project_id: str, node_ids: List[str] = None, approved: bool = True,
+                              feedback: str = None) -> Dict[str, Any]:
+        """
+        Approve or send back part of the outline (acts, chapters or scenes by id, or all of it).
+        Newly approved chapters go straight into the writing pipeline.
+        """
+        project = self.active_projects.get(project_id)
+        if project is None or project.outline_tree is None:
+            return {"error": "Outline not found"}
+        try:
+            chapters = project.outline_tree.approve(node_ids, approved, feedback)
+        except KeyError as e:
+            return {"error": str(e.args[0])}
+        if approved:
+            with project_scope(project.id):
+                await self.workflow_manager.continue_after_approval(project)
+        return {
+            "chapters": chapters,
+            "approved": approved,
+            "approved_chapters": project.outline_tree.root.approved_chapters(),
+            "fully_approved": project.outline_tree.fully_approved
+        }
+    
+    async def analyze_manuscript(self, project_id: str) -> Dict[str, Any]:
+        """Readability, sentence-length, dialogue, diversity and pacing metrics; chapters are cached by hash"""
+        project = self.active_projects.get(project_id)
+        if project is None:
+            return {"error": "Project not found"}
+        if not project.manuscript:
+            return {"error": "Manuscript is not ready yet"}
+        
+        return await asyncio.to_thread(self.manuscript_metrics.analyze_manuscript, project.manuscript)
+    
+    async def export_manuscript(self, project_id: str, fmt: str) -> Dict[str, Any]:
+        """Render the manuscript as EPUB, DOCX or PDF; unchanged books are served from the artifact store"""
+        project = self.active_projects.get(project_id)
+        if project is None:
+            return {"error": "Project not found"}
+        if not project.manuscript:
+            return {"error": "Manuscript is not ready yet"}
+        if fmt not in EXPORT_FORMATS:
+            return {"error": f"Unsupported format: {fmt}"}
+        
+        meta = {"title": project.title or "Untitled", "author": "InkWell", "identifier": f"urn:inkwell:{project.id}"}
+        result = await self.exporter.export(project.manuscript, fmt, meta)
+        return {"export": result}
+    
+    async def check_consistency(self, project_id: str) -> Dict[str, Any]:
+        """Check every stored chapter against the project's characters and world; unchanged chapters are cached"""
+        project = self.active_projects.get(project_id)
+        if project is None:
+            return {"error": "Project not found"}
+        
+        checker = consistency_checker(project)
+        chapters = ((entry.number, text) for entry, text in project.manuscript.iter_chapters()) if project.manuscript else []
+        return dict(checker.check_chapters(chapters), checker=checker.get_stats())
+
+    async def lint_manuscript(self, project_id: str) -> Dict[str, Any]:
+        """Style report for every stored chapter, linted across worker processes"""
+        project = self.active_projects.get(project_id)
+        if project is None:
+            return {"error": "Project not found"}
+        
+        entries, texts = [], []
+        for entry, text in (project.manuscript.iter_chapters() if project.manuscript else []):
+            entries.append(entry)
+            texts.append(text)
+        results = await self.agents['editing'].linter.lint_chapters(texts, genre=project.genre)
+        chapters = []
+        for entry, result in zip(entries, results):
+            counts: Dict[str, int] = {}
+            for issue in result["issues"]:
+                counts[issue["rule"]] = counts.get(issue["rule"], 0) + 1
+            chapters.append({"chapter": entry.number, "title": entry.title, "counts": counts,
+                             "issues": result["issues"]})
+        return {"genre": project.genre, "chapters": chapters,
+                "total_issues": sum(len(result["issues"]) for result in results)}
+    
+    def _chapter_status(self, project: BookProject) -> Dict[str, Any]:
+        """How many chapters have reached each pipeline stage, plus the stage of every chapter"""
+        progress = project.chapter_progress or {}
+        reached = [CHAPTER_STAGES.index(stage) for stage in progress.values()]
+        return dict(
+            {stage: sum(1 for index in reached if index >= level)
+             for level, stage in enumerate(CHAPTER_STAGES) if level > 0},
+            total=len(progress),
+            by_chapter=dict(progress)
+        )
+    
+    def _chapter_fraction(self, project: BookProject) -> float:
+        """Share of per-chapter pipeline work done, or None before the pipeline starts"""
+        if not project.chapter_progress:
+            return None
+        stages = 3 if project.wants_audiobook else 2
+        if project.outline_tree is not None:
+            # Weighted by word target, and unapproved chapters count as work still to do
+            return project.outline_tree.progress(stages)
+        done = sum(min(stages, CHAPTER_STAGES.index(stage)) for stage in project.chapter_progress.values())
+        return done / (stages * len(project.chapter_progress))
+    
+    def _calculate_progress(self, status: ProjectStatus, chapter_fraction: float = None) -> int:
+        """Calculate project completion percentage, per chapter while the pipeline runs"""
+        if chapter_fraction is not None and status in PIPELINE_STATUSES:
+            return 25 + int(60 * chapter_fraction)
         progress_map = {
             ProjectStatus.REQUESTED: 0,
             ProjectStatus.IN_DEVELOPMENT: 10,
@@ -144,7 +442,11 @@ class WorkflowManager:
     Manages the workflow execution between agents
     """
     
-    def __init__(self):
+    def __init__(self, agents: Dict[str, Any] = None, artifact_store: ArtifactStore = None):
+        self.agents = agents or {}
+        self.artifact_store = artifact_store or ArtifactStore()
+        # Per project: only one approval may run the finishing phases
+        self._finishing: Dict[str, asyncio.Lock] = {}
         self.stages = [
             'development',
             'research', 
@@ -172,21 +474,33 @@ class WorkflowManager:
         # Outline Phase
         await self._execute_outline_phase(project)
         
-        # Writing Phase
-        await self._execute_writing_phase(project)
-        
-        # Editing Phase
-        await self._execute_editing_phase(project)
-        
-        # Cover Design (parallel)
-        await self._execute_cover_design_phase(project)
+        if project.approval_required:
+            # Writing starts per act or chapter as the customer approves them
+            print(f"Outline for {project.title} is awaiting approval")
+            return
+        project.outline_tree.approve()
+        await self.continue_after_approval(project)
+    
+    async def continue_after_approval(self, project: BookProject):
+        """Write every approved chapter not yet started; finish the book once all chapters are through"""
+        # Writing, editing and audiobook (if requested), pipelined chapter by chapter
+        await self._execute_chapter_pipeline(project)
         
-        # Audiobook (if requested)
-        if project.audiobook_url:
-            await self._execute_audiobook_phase(project)
+        if not project.outline_tree.fully_approved or len(project.manuscript or []) < len(project.outline_tree.chapters()):
+            return
         
-        # Final Review
-        await self._execute_final_review_phase(project)
+        # Overlapping or repeated approvals can all find the book complete; it is finished once
+        async with self._finishing.setdefault(project.id, asyncio.Lock()):
+            if project.completed:
+                return
+            
+            # Cover Design
+            await self._execute_cover_design_phase(project)
+            
+            # Final Review
+            await self._execute_final_review_phase(project)
+            
+            project.completed = True
         
         print(f"Workflow completed for project: {project.title}")
     
@@ -205,20 +519,103 @@ class WorkflowManager:
     async def _execute_outline_phase(self, project: BookProject):
         """Execute outline creation phase"""
         print(f"Executing outline phase for: {project.title}")
+        if not project.outline:
+            project.outline = default_outline(project.title, project.genre)
+        project.outline_tree = OutlineTree.from_outline(project.outline, arc=STORY_ARC)
+        if not project.outline_tree.chapters():
+            project.outline_tree = OutlineTree.from_outline(default_outline(project.title, project.genre), arc=STORY_ARC)
         project.status = ProjectStatus.OUTLINE_READY
-        await asyncio.sleep(1)  # Simulate processing time
     
-    async def _execute_writing_phase(self, project: BookProject):
-        """Execute writing phase"""
-        print(f"Executing writing phase for: {project.title}")
-        project.status = ProjectStatus.WRITING_IN_PROGRESS
-        await asyncio.sleep(2)  # Simulate longer processing time
+    async def _execute_chapter_pipeline(self, project: BookProject):
+        """
+        Writing, editing and narration run as stages joined by queues, with the
+        chapter as the unit of work: editing starts on the first finished chapter
+        while later ones are still being written, and narration starts on each
+        edited chapter. The book takes about the slowest stage plus one chapter.
+        """
+        if project.outline_tree is None:
+            await self._execute_outline_phase(project)
+        project.chapter_progress = project.chapter_progress or {}
+        # The bible summarizes the whole outline; only approved chapters not yet started are written
+        outline_plans = [ChapterPlan.from_node(chapter) for chapter in project.outline_tree.chapters()]
+        plans = [plan for plan in outline_plans
+                 if project.outline_tree.chapter(plan.number).approved and plan.number not in project.chapter_progress]
+        if not plans:
+            return
+        print(f"Executing chapter pipeline for: {project.title} (chapters {', '.join(str(p.number) for p in plans)})")
+        project.chapter_progress.update({plan.number: "planned" for plan in plans})
+        # Chapters go straight to the artifact store; the book is never one string
+        if project.manuscript is None:
+            project.manuscript = Manuscript(project.id, self.artifact_store)
+        to_edit, to_narrate = asyncio.Queue(), asyncio.Queue()
+        stages = [
+            self._writing_stage(project, plans, to_edit, outline_plans),
+            self._editing_stage(project, to_edit, to_narrate if project.wants_audiobook else None)
+        ]
+        if project.wants_audiobook:
+            project.audio_tracks = project.audio_tracks or {}
+            stages.append(self._audiobook_stage(project, to_narrate))
+        
+        tasks = [asyncio.ensure_future(stage) for stage in stages]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
     
-    async def _execute_editing_phase(self, project: BookProject):
-        """Execute editing phase"""
-        print(f"Executing editing phase for: {project.title}")
+    async def _writing_stage(self, project: BookProject, plans: List[Any], outbox: asyncio.Queue,
+                             outline_plans: List[Any] = None):
+        """Chapters are written concurrently against a shared story bible and handed on as they land"""
+        project.status = ProjectStatus.WRITING_IN_PROGRESS
+        writer = self.agents.get('writing') or WritingAgent()
+        try:
+            checker = consistency_checker(project)
+            bible = StoryBible.from_project(project, outline_plans or plans)
+            # Chapters stored by earlier approvals that precede one of these; openings follow their real endings
+            numbers = {plan.number for plan in plans}
+            earlier = {
+                entry.number: Chapter.from_text(entry.number, entry.title, project.manuscript.chapter_text(entry.number))
+                for entry in project.manuscript.chapters if entry.number + 1 in numbers and entry.number not in numbers
+            }
+            async for chapter in writer.stream_book(bible, plans, earlier):
+                _advance(project, chapter.number, "written", chapter.word_count)
+                if checker.has_entities:
+                    # One linear pass per chapter as it lands, so drift is caught while writing
+                    report = checker.check_chapter(chapter.number, chapter.text)
+                    if report.issues:
+                        print(f"Chapter {chapter.number}: {len(report.issues)} consistency issues")
+                await outbox.put(chapter)
+        finally:
+            await outbox.put(None)
         project.status = ProjectStatus.EDITING
-        await asyncio.sleep(1)  # Simulate processing time
+    
+    async def _editing_stage(self, project: BookProject, inbox: asyncio.Queue, outbox: asyncio.Queue):
+        editor = self.agents.get('editing') or EditingAgent()
+        try:
+            while True:
+                chapter = await inbox.get()
+                if chapter is None:
+                    break
+                chapter = await editor.edit_chapter(chapter, key=f"{project.id}:{chapter.number}", genre=project.genre)
+                project.manuscript.add_chapter(chapter.number, chapter.title, chapter.text)
+                _advance(project, chapter.number, "edited", chapter.word_count)
+                if outbox is not None:
+                    await outbox.put(chapter)
+        finally:
+            if outbox is not None:
+                await outbox.put(None)
+        if outbox is not None:
+            project.status = ProjectStatus.AUDIOBOOK_PRODUCTION
+    
+    async def _audiobook_stage(self, project: BookProject, inbox: asyncio.Queue):
+        narrator = self.agents.get('audiobook') or AudiobookAgent()
+        while True:
+            chapter = await inbox.get()
+            if chapter is None:
+                break
+            project.audio_tracks[chapter.number] = await narrator.narrate_chapter(project.id, chapter)
+            _advance(project, chapter.number, "narrated")
     
     async def _execute_cover_design_phase(self, project: BookProject):
         """Execute cover design phase"""
@@ -226,12 +623,6 @@ class WorkflowManager:
         project.status = ProjectStatus.COVER_DESIGN
         await asyncio.sleep(1)  # Simulate processing time
     
-    async def _execute_audiobook_phase(self, project: BookProject):
-        """Execute audiobook production phase"""
-        print(f"Executing audiobook phase for: {project.title}")
-        project.status = ProjectStatus.AUDIOBOOK_PRODUCTION
-        await asyncio.sleep(2)  # Simulate longer processing time
-    
     async def _execute_final_review_phase(self, project: BookProject):
         """Execute final review phase"""
         print(f"Executing final review phase for: {project.title}")
@@ -239,41 +630,84 @@ class WorkflowManager:
         await asyncio.sleep(1)  # Simulate processing time
         project.status = ProjectStatus.COMPLETED
 
+def _advance(project: BookProject, number: int, stage: str, words: int = None):
+    """Record a chapter's pipeline stage on the project and its outline node"""
+    project.chapter_progress[number] = stage
+    if project.outline_tree is not None:
+        project.outline_tree.set_stage(number, stage, words)
+
+def revision_buffer(project: BookProject) -> ManuscriptBuffer:
+    """
+    The project's revision history as a rope, built from the manuscript on first
+    use and rebuilt (keeping its snapshots) when chapters have been added since
+    """
+    buffer = project.revisions
+    if buffer is None or buffer.chapter_count != len(project.manuscript):
+        history = buffer.history if buffer is not None else []
+        buffer = ManuscriptBuffer.from_manuscript(project.manuscript)
+        buffer.history = history
+        buffer.snapshot("draft" if not history else f"{len(project.manuscript)} chapters written")
+        project.revisions = buffer
+    return buffer
+
+def consistency_checker(project: BookProject) -> ConsistencyChecker:
+    """The project's checker, built from its characters and world on first use"""
+    if project.consistency is None:
+        project.consistency = ConsistencyChecker(project.characters or [], project.world)
+    return project.consistency
+
+class RAGAgent:
+    """
+    Base for agents that retrieve from their own knowledge domains
+    """
+    knowledge = None
+    llm_client = None
+    
+    def __init__(self, knowledge_index: KnowledgeIndex = None):
+        # A scoped view of the shared index; no agent builds or re-embeds its own
+        self.knowledge = (knowledge_index or get_knowledge_index()).scoped(self.rag_knowledge)
+    
+    def retrieve(self, query: str, genre: str = None, k: int = 4) -> List[Dict[str, Any]]:
+        """Search this agent's knowledge partitions, pre-filtered by genre"""
+        if self.knowledge is None:
+            return []
+        return [result.__dict__ for result in self.knowledge.search(query, k, genre=genre)]
+
 # Placeholder agent classes (will be implemented with actual RAG functionality)
-class DevelopmentAgent:
-    def __init__(self):
+class DevelopmentAgent(RAGAgent):
+    def __init__(self, knowledge_index: KnowledgeIndex = None):
         self.name = "Development Agent"
         self.rag_knowledge = ["fiction_writing_guides", "character_development"]
+        super().__init__(knowledge_index)
 
-class ResearchAgent:
-    def __init__(self):
+class ResearchAgent(RAGAgent):
+    def __init__(self, knowledge_index: KnowledgeIndex = None):
         self.name = "Research Agent"
         self.rag_knowledge = ["research_methodologies", "fact_checking_sources"]
+        super().__init__(knowledge_index)
 
-class OutlineAgent:
-    def __init__(self):
+class OutlineAgent(RAGAgent):
+    def __init__(self, knowledge_index: KnowledgeIndex = None):
         self.name = "Outline Agent"
         self.rag_knowledge = ["story_structure", "chapter_organization"]
+        super().__init__(knowledge_index)
 
-class WritingAgent:
-    def __init__(self):
-        self.name = "Writing Agent"
-        self.rag_knowledge = ["writing_styles", "genre_conventions"]
-
-class EditingAgent:
-    def __init__(self):
-        self.name = "Editing Agent"
-        self.rag_knowledge = ["grammar_rules", "style_guides"]
-
-class CoverDesignAgent:
-    def __init__(self):
+class CoverDesignAgent(RAGAgent):
+    def __init__(self, knowledge_index: KnowledgeIndex = None):
         self.name = "Cover Design Agent"
         self.rag_knowledge = ["design_principles", "genre_conventions"]
+        super().__init__(knowledge_index)
 
-class AudiobookAgent:
-    def __init__(self):
+class AudiobookAgent(RAGAgent):
+    def __init__(self, knowledge_index: KnowledgeIndex = None):
         self.name = "Audiobook Agent"
         self.rag_knowledge = ["narration_styles", "audio_production"]
+        super().__init__(knowledge_index)
+    
+    async def narrate_chapter(self, project_id: str, chapter) -> str:
+        """Narrate one chapter and return its track location"""
+        await asyncio.sleep(0.2)  # Simulate narration time
+        return f"audiobooks/{project_id}/chapter-{chapter.number:02d}.mp3"
 
 # Example usage
 async def main():
@@ -287,6 +721,7 @@ async def main():
         "genre": "non-fiction",
         "tone": "professional",
         "requirements": "A comprehensive guide to AI in business",
+        "audiobook": True,
         "created_at": "2024-01-15T10:00:00Z",
         "updated_at": "2024-01-15T10:00:00Z"
     }
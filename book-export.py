@@ -0,0 +1,370 @@
+import asyncio
+import hashlib
+import logging
+import os
+import sys
+import textwrap
+import time
+import uuid
+import zipfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pickle import PicklingError
+from dataclasses import dataclass
+from typing import Dict, List, Any, BinaryIO, Iterator, Optional, Tuple
+from xml.sax.saxutils import escape
+import importlib.util
+
+# Load once per process so Manuscript and ArtifactStore are the same classes everywhere
+manuscript_module = sys.modules.get("manuscript")
+if manuscript_module is None:
+    spec = importlib.util.spec_from_file_location("manuscript", "manuscript.py")
+    manuscript_module = importlib.util.module_from_spec(spec)
+    sys.modules["manuscript"] = manuscript_module
+    spec.loader.exec_module(manuscript_module)
+ArtifactStore = manuscript_module.ArtifactStore
+Manuscript = manuscript_module.Manuscript
+
+# Load once per process, like the other shared helpers
+single_flight_module = sys.modules.get("single_flight")
+if single_flight_module is None:
+    spec = importlib.util.spec_from_file_location("single_flight", "single-flight.py")
+    single_flight_module = importlib.util.module_from_spec(spec)
+    sys.modules["single_flight"] = single_flight_module
+    spec.loader.exec_module(single_flight_module)
+SingleFlight = single_flight_module.SingleFlight
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = {
+    "epub": "application/epub+zip",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "pdf": "application/pdf"
+}
+
+# Bump when a writer's output changes so cached exports are rebuilt
+EXPORT_VERSION = "1"
+
+# PDF page layout (US Letter, points)
+PAGE_WIDTH, PAGE_HEIGHT, MARGIN = 612, 792, 72
+FONT_SIZE, LEADING, HEADING_SIZE = 11, 15, 16
+LINE_CHARS = 88
+
+# A chapter as the writers see it: (number, title, text)
+ChapterText = Tuple[int, str, str]
+
+@dataclass
+class ExportResult:
+    format: str
+    key: str
+    size: int
+    media_type: str
+    cached: bool = False
+    seconds: float = 0.0
+
+def paragraphs(text: str) -> List[str]:
+    return [" ".join(p.split()) for p in text.split("\n\n") if p.strip()]
+
+# EPUB 3: the mimetype entry goes first and uncompressed; chapters are
+# deflated into the archive one at a time.
+
+def write_epub(f: BinaryIO, meta: Dict[str, str], chapters: Iterator[ChapterText], toc: List[Tuple[int, str]]):
+    title, language = escape(meta.get("title") or "Untitled"), meta.get("language") or "en"
+    identifier = meta.get("identifier") or f"urn:uuid:{uuid.uuid5(uuid.NAMESPACE_URL, title)}"
+    with zipfile.ZipFile(f, "w", zipfile.ZIP_DEFLATED) as book:
+        book.writestr(zipfile.ZipInfo("mimetype"), "application/epub+zip", compress_type=zipfile.ZIP_STORED)
+        book.writestr("META-INF/container.xml", (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">'
+            '<rootfiles><rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/>'
+            '</rootfiles></container>'
+        ))
+        for number, chapter_title, text in chapters:
+            with book.open(f"OEBPS/chapter-{number:03d}.xhtml", "w") as page:
+                page.write((
+                    '<?xml version="1.0" encoding="UTF-8"?>\n<!DOCTYPE html>\n'
+                    f'<html xmlns="http://www.w3.org/1999/xhtml" xml:lang="{language}"><head>'
+                    f'<title>{escape(chapter_title)}</title></head><body>'
+                    f'<h1>Chapter {number}: {escape(chapter_title)}</h1>\n'
+                ).encode("utf-8"))
+                for paragraph in paragraphs(text):
+                    page.write(f"<p>{escape(paragraph)}</p>\n".encode("utf-8"))
+                page.write(b"</body></html>")
+        items = "".join(
+            f'<item id="c{n}" href="chapter-{n:03d}.xhtml" media-type="application/xhtml+xml"/>' for n, _ in toc
+        )
+        spine = "".join(f'<itemref idref="c{n}"/>' for n, _ in toc)
+        book.writestr("OEBPS/content.opf", (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<package xmlns="http://www.idpf.org/2007/opf" version="3.0" unique-identifier="book-id">'
+            '<metadata xmlns:dc="http://purl.org/dc/elements/1.1/">'
+            f'<dc:identifier id="book-id">{escape(identifier)}</dc:identifier>'
+            f'<dc:title>{title}</dc:title><dc:language>{language}</dc:language>'
+            f'<dc:creator>{escape(meta.get("author") or "InkWell")}</dc:creator>'
+            f'<meta property="dcterms:modified">{time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())}</meta>'
+            '</metadata><manifest>'
+            '<item id="nav" href="nav.xhtml" media-type="application/xhtml+xml" properties="nav"/>'
+            f'{items}</manifest><spine>{spine}</spine></package>'
+        ))
+        links = "".join(
+            f'<li><a href="chapter-{n:03d}.xhtml">Chapter {n}: {escape(t)}</a></li>' for n, t in toc
+        )
+        book.writestr("OEBPS/nav.xhtml", (
+            '<?xml version="1.0" encoding="UTF-8"?>\n<!DOCTYPE html>\n'
+            '<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops">'
+            f'<head><title>{title}</title></head><body><nav epub:type="toc"><h1>Contents</h1>'
+            f'<ol>{links}</ol></nav></body></html>'
+        ))
+
+# DOCX: word/document.xml is streamed paragraph by paragraph into the archive.
+
+DOCX_NAMESPACE = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+
+def _docx_paragraph(text: str, style: str = None, page_break: bool = False) -> str:
+    properties = f'<w:pPr><w:pStyle w:val="{style}"/>{"<w:pageBreakBefore/>" if page_break else ""}</w:pPr>' if style else ""
+    return f'<w:p>{properties}<w:r><w:t xml:space="preserve">{escape(text)}</w:t></w:r></w:p>'
+
+def write_docx(f: BinaryIO, meta: Dict[str, str], chapters: Iterator[ChapterText], toc: List[Tuple[int, str]]):
+    with zipfile.ZipFile(f, "w", zipfile.ZIP_DEFLATED) as document:
+        document.writestr("[Content_Types].xml", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/word/document.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+            '<Override PartName="/word/styles.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.styles+xml"/>'
+            '<Override PartName="/docProps/core.xml" '
+            'ContentType="application/vnd.openxmlformats-package.core-properties+xml"/>'
+            '</Types>'
+        ))
+        document.writestr("_rels/.rels", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/'
+            'officeDocument" Target="word/document.xml"/>'
+            '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/package/2006/relationships/metadata/'
+            'core-properties" Target="docProps/core.xml"/>'
+            '</Relationships>'
+        ))
+        document.writestr("word/_rels/document.xml.rels", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/'
+            'styles" Target="styles.xml"/></Relationships>'
+        ))
+        document.writestr("word/styles.xml", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            f'<w:styles xmlns:w="{DOCX_NAMESPACE}">'
+            '<w:style w:type="paragraph" w:default="1" w:styleId="Normal"><w:name w:val="Normal"/>'
+            '<w:pPr><w:spacing w:after="160" w:line="276" w:lineRule="auto"/></w:pPr></w:style>'
+            '<w:style w:type="paragraph" w:styleId="Title"><w:name w:val="Title"/><w:basedOn w:val="Normal"/>'
+            '<w:rPr><w:b/><w:sz w:val="56"/></w:rPr></w:style>'
+            '<w:style w:type="paragraph" w:styleId="Heading1"><w:name w:val="heading 1"/><w:basedOn w:val="Normal"/>'
+            '<w:pPr><w:outlineLvl w:val="0"/></w:pPr><w:rPr><w:b/><w:sz w:val="36"/></w:rPr></w:style>'
+            '</w:styles>'
+        ))
+        document.writestr("docProps/core.xml", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<cp:coreProperties xmlns:cp="http://schemas.openxmlformats.org/package/2006/metadata/core-properties" '
+            'xmlns:dc="http://purl.org/dc/elements/1.1/">'
+            f'<dc:title>{escape(meta.get("title") or "Untitled")}</dc:title>'
+            f'<dc:creator>{escape(meta.get("author") or "InkWell")}</dc:creator></cp:coreProperties>'
+        ))
+        with document.open("word/document.xml", "w") as body:
+            body.write((
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                f'<w:document xmlns:w="{DOCX_NAMESPACE}"><w:body>'
+                + _docx_paragraph(meta.get("title") or "Untitled", "Title")
+            ).encode("utf-8"))
+            for number, chapter_title, text in chapters:
+                body.write(_docx_paragraph(f"Chapter {number}: {chapter_title}", "Heading1", page_break=True).encode("utf-8"))
+                for paragraph in paragraphs(text):
+                    body.write(_docx_paragraph(paragraph).encode("utf-8"))
+            body.write(b'<w:sectPr><w:pgSz w:w="12240" w:h="15840"/></w:sectPr></w:body></w:document>')
+
+# PDF: objects are written as pages fill up, with byte offsets recorded for the
+# cross-reference table; the page tree, which needs every page, goes last.
+
+class _PdfWriter:
+    def __init__(self, f: BinaryIO):
+        self.f = f
+        self.offsets: Dict[int, int] = {}
+        self.position = 0
+        self.next_number = 1
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def _write(self, data: bytes):
+        self.f.write(data)
+        self.position += len(data)
+
+    def reserve(self) -> int:
+        number = self.next_number
+        self.next_number += 1
+        return number
+
+    def object(self, number: int, body: bytes):
+        self.offsets[number] = self.position
+        self._write(f"{number} 0 obj\n".encode("ascii") + body + b"\nendobj\n")
+
+    def stream(self, number: int, data: bytes):
+        packed = zlib.compress(data)
+        self.object(number, f"<< /Length {len(packed)} /Filter /FlateDecode >>\nstream\n".encode("ascii")
+                    + packed + b"\nendstream")
+
+    def close(self, root: int, info: int):
+        xref = self.position
+        count = self.next_number
+        lines = [f"xref\n0 {count}\n", "0000000000 65535 f \n"]
+        lines.extend(f"{self.offsets[n]:010d} 00000 n \n" for n in range(1, count))
+        lines.append(f"trailer\n<< /Size {count} /Root {root} 0 R /Info {info} 0 R >>\nstartxref\n{xref}\n%%EOF\n")
+        self._write("".join(lines).encode("ascii"))
+
+def _pdf_text(text: str) -> str:
+    # Core fonts use WinAnsi (cp1252); anything outside it becomes "?"
+    encoded = text.encode("cp1252", errors="replace").decode("latin-1")
+    return encoded.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def write_pdf(f: BinaryIO, meta: Dict[str, str], chapters: Iterator[ChapterText], toc: List[Tuple[int, str]]):
+    pdf = _PdfWriter(f)
+    catalog, pages, regular, bold, info = (pdf.reserve() for _ in range(5))
+    pdf.object(regular, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+    pdf.object(bold, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>")
+    page_numbers: List[int] = []
+    lines_per_page = (PAGE_HEIGHT - 2 * MARGIN) // LEADING
+
+    def emit(lines: List[Tuple[str, str]]):
+        ops = [f"BT {MARGIN} {PAGE_HEIGHT - MARGIN} Td {LEADING} TL"]
+        for font, line in lines:
+            size = HEADING_SIZE if font == "F2" else FONT_SIZE
+            ops.append(f"/{font} {size} Tf ({_pdf_text(line)}) '")
+        ops.append("ET")
+        content, page = pdf.reserve(), pdf.reserve()
+        pdf.stream(content, "\n".join(ops).encode("latin-1"))
+        pdf.object(page, (
+            f"<< /Type /Page /Parent {pages} 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+            f"/Resources << /Font << /F1 {regular} 0 R /F2 {bold} 0 R >> >> /Contents {content} 0 R >>"
+        ).encode("ascii"))
+        page_numbers.append(page)
+
+    emit([("F2", meta.get("title") or "Untitled"), ("F1", ""), ("F1", meta.get("author") or "")])
+    for number, chapter_title, text in chapters:
+        # Every chapter starts a page; only the current page is held in memory
+        page: List[Tuple[str, str]] = [("F2", f"Chapter {number}: {chapter_title}"), ("F1", "")]
+        for paragraph in paragraphs(text):
+            for line in textwrap.wrap(paragraph, LINE_CHARS) + [""]:
+                if len(page) >= lines_per_page:
+                    emit(page)
+                    page = []
+                page.append(("F1", line))
+        emit(page)
+
+    kids = " ".join(f"{n} 0 R" for n in page_numbers)
+    pdf.object(pages, f"<< /Type /Pages /Kids [{kids}] /Count {len(page_numbers)} >>".encode("ascii"))
+    pdf.object(catalog, f"<< /Type /Catalog /Pages {pages} 0 R >>".encode("ascii"))
+    pdf.object(info, f"<< /Title ({_pdf_text(meta.get('title') or 'Untitled')}) /Producer (InkWell) >>".encode("latin-1"))
+    pdf.close(catalog, info)
+
+WRITERS = {"epub": write_epub, "docx": write_docx, "pdf": write_pdf}
+
+def export_book(root: str, key: str, fmt: str, meta: Dict[str, str], toc: List[Tuple[int, str, str]]) -> int:
+    """
+    Pool worker: render the chapters listed in toc as (number, title, chapter key)
+    from the artifact store at root into the artifact key. Returns its size.
+    """
+    store = ArtifactStore(root)
+    chapters = ((number, title, store.read_text(chapter_key)) for number, title, chapter_key in toc)
+    with store.open_write(key) as f:
+        WRITERS[fmt](f, meta, chapters, [(number, title) for number, title, _ in toc])
+    return store.size(key)
+
+class BookExporter:
+    """
+    Renders finished manuscripts as EPUB, DOCX or PDF.
+
+    Writers read one chapter at a time from the artifact store and stream into
+    the output archive or file, so a book is never held in memory. Rendering
+    runs on a process pool. Output is stored under the manuscript's digest, so
+    repeat downloads of an unchanged book are served from the store, and
+    concurrent requests for the same export share one render.
+    """
+
+    def __init__(self, store: ArtifactStore = None, workers: int = None, single_flight: SingleFlight = None):
+        self.store = store or ArtifactStore()
+        self.workers = workers or int(os.getenv("EXPORT_WORKERS", 2))
+        self.single_flight = single_flight or SingleFlight()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.stats = {"exports": 0, "cache_hits": 0, "bytes_written": 0, "render_seconds": 0.0, "inline_fallbacks": 0}
+
+    def export_key(self, manuscript: Manuscript, fmt: str, meta: Dict[str, str]) -> str:
+        fingerprint = hashlib.sha256(
+            f"{EXPORT_VERSION}:{manuscript.digest}:{sorted(meta.items())}".encode("utf-8")
+        ).hexdigest()[:16]
+        return f"{manuscript.project_id}/exports/{fingerprint}.{fmt}"
+
+    async def export(self, manuscript: Manuscript, fmt: str, meta: Dict[str, str] = None) -> ExportResult:
+        if fmt not in WRITERS:
+            raise ValueError(f"Unsupported export format: {fmt} (expected one of {', '.join(WRITERS)})")
+        meta = dict(meta or {})
+        key = self.export_key(manuscript, fmt, meta)
+        if self.store.exists(key):
+            self.stats["cache_hits"] += 1
+            return ExportResult(fmt, key, self.store.size(key), EXPORT_FORMATS[fmt], cached=True)
+        toc = [(entry.number, entry.title, entry.key) for entry in manuscript.chapters]
+        return await self.single_flight.do(key, lambda: self._render(key, fmt, meta, toc))
+
+    async def _render(self, key: str, fmt: str, meta: Dict[str, str], toc: List[Tuple[int, str, str]]) -> ExportResult:
+        started = time.perf_counter()
+        args = (self.store.root, key, fmt, meta, toc)
+        try:
+            size = await asyncio.get_running_loop().run_in_executor(self._executor(), export_book, *args)
+        except (BrokenProcessPool, PicklingError) as e:
+            # e.g. a spawn-based platform that cannot import this module by name;
+            # errors from the render itself (a missing chapter artifact) are raised as they are
+            logger.warning("Export pool unavailable, rendering %s in a thread: %s", fmt, e)
+            self.stats["inline_fallbacks"] += 1
+            size = await asyncio.to_thread(export_book, *args)
+        seconds = time.perf_counter() - started
+        self.stats["exports"] += 1
+        self.stats["bytes_written"] += size
+        self.stats["render_seconds"] += seconds
+        return ExportResult(fmt, key, size, EXPORT_FORMATS[fmt], seconds=round(seconds, 3))
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.stats, workers=self.workers, in_flight=self.single_flight.in_flight())
+
+# Example usage
+async def main():
+    import tempfile
+
+    store = ArtifactStore(tempfile.mkdtemp(prefix="inkwell-artifacts-"))
+    manuscript = Manuscript("book_demo", store)
+    for number in range(1, 31):
+        text = "\n\n".join(f"Paragraph {p} of chapter {number}: the river ran on past the mill, as it always had. " * 4
+                           for p in range(1, 41))
+        manuscript.add_chapter(number, f"Part {number}", text)
+
+    exporter = BookExporter(store)
+    meta = {"title": "The Clockwork Heir", "author": "InkWell"}
+    results = await asyncio.gather(*(exporter.export(manuscript, fmt, meta) for fmt in EXPORT_FORMATS))
+    for result in results:
+        print(f"{result.format}: {result.size // 1024} KB in {result.seconds:.2f}s -> {result.key}")
+    again = await exporter.export(manuscript, "epub", meta)
+    print(f"Repeat EPUB download served from the store: {again.cached}")
+    print(exporter.get_stats())
+    exporter.shutdown()
+
+if __name__ == "__main__":
+    asyncio.run(main())
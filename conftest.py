@@ -0,0 +1,7 @@
+import os
+
+# Modules are loaded by file name relative to the repository root, as in production
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+# test_railway.py is the deployment smoke script, run directly; agent-system/ is a separate copy of the tree
+collect_ignore = ["test_railway.py", "agent-system"]
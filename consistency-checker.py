@@ -0,0 +1,387 @@
+import asyncio
+import hashlib
+import re
+from collections import deque
+from dataclasses import dataclass, field, asdict
+from typing import Dict, List, Any, Iterable, Iterator, Optional, Tuple
+
+# Honorifics and ranks are not names on their own ("Commander Sarah Chen" -> "Sarah", "Chen")
+TITLES = {
+    "mr", "mrs", "ms", "miss", "dr", "doctor", "professor", "sir", "lady", "lord", "king", "queen",
+    "prince", "princess", "captain", "commander", "detective", "inspector", "sergeant", "general",
+    "father", "mother", "sister", "brother", "uncle", "aunt", "master"
+}
+
+# Capitalized mid-sentence words that are not character or place names
+COMMON_CAPITALIZED = {
+    "i", "i'm", "i'd", "i'll", "i've", "god", "monday", "tuesday", "wednesday", "thursday", "friday",
+    "saturday", "sunday", "january", "february", "march", "april", "may", "june", "july", "august",
+    "september", "october", "november", "december", "english", "chapter", "ok", "okay", "tv", "the"
+} | TITLES
+
+# Words that contradict a trait, keyed by the trait as the development agent writes it (lower-cased)
+TRAIT_ANTONYMS = {
+    "brave": ["cowardly", "fearful", "timid", "craven"],
+    "curious": ["incurious", "uninterested"],
+    "determined": ["irresolute", "half-hearted", "gave up easily"],
+    "innocent": ["jaded", "cynical"],
+    "wise": ["foolish", "unwise", "naive"],
+    "secretive": ["candid", "forthcoming", "open book"],
+    "protective": ["neglectful", "careless of others"],
+    "haunted": ["carefree", "untroubled"],
+    "strategic": ["impulsive", "reckless"],
+    "loyal": ["disloyal", "treacherous", "faithless"],
+    "pragmatic": ["idealistic", "impractical"],
+    "observant": ["oblivious", "unobservant", "inattentive"],
+    "persistent": ["gave up easily", "easily discouraged"],
+    "guarded": ["trusting", "open-hearted"],
+    "just": ["unjust", "corrupt"],
+    "independent": ["dependent", "clingy", "needy"],
+    "ambitious": ["unambitious", "complacent"],
+    "hopeful": ["hopeless", "despairing"],
+    "calm": ["frantic", "panicked"],
+    "kind": ["cruel", "unkind", "heartless"],
+    "honest": ["dishonest", "deceitful"],
+    "shy": ["outgoing", "brash"],
+    "cheerful": ["gloomy", "morose", "sullen"],
+    "patient": ["impatient"]
+}
+
+# A trait word is attributed to the last character named this many characters before it, in the same sentence
+TRAIT_WINDOW = 80
+NEGATIONS = ("not ", "never ", "no longer ", "n't ")
+
+NAME_CANDIDATE = re.compile(r"(?<=[a-z,;:] )[A-Z][a-z]+(?:'[a-z]+)?(?:[ -][A-Z][a-z]+)*")
+
+@dataclass(frozen=True)
+class Entry:
+    kind: str        # "character", "location" or "trait"
+    canonical: str   # the character or location name, or the trait a word contradicts
+    phrase: str      # the indexed text
+
+@dataclass
+class ConsistencyIssue:
+    kind: str
+    chapter: int
+    start: int
+    end: int
+    text: str
+    message: str
+    suggestion: str = None
+
+@dataclass
+class ChapterReport:
+    chapter: int
+    digest: str
+    mentions: Dict[str, int] = field(default_factory=dict)
+    issues: List[ConsistencyIssue] = field(default_factory=list)
+    unknown_names: Dict[str, int] = field(default_factory=dict)
+
+class NameIndex:
+    """
+    Aho-Corasick automaton over lower-cased phrases.
+
+    Every name, alias, location and trait word is found in one left-to-right
+    pass over the text, however many phrases are indexed. Matches must sit on
+    word boundaries.
+    """
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Entry]] = [[]]
+        self._built = True
+
+    def add(self, phrase: str, entry: Entry):
+        state = 0
+        for char in phrase.lower():
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = next_state
+        if entry not in self._out[state]:
+            self._out[state].append(entry)
+        self._built = False
+
+    def build(self):
+        """Breadth-first failure links; each state also inherits its fallback's outputs"""
+        queue = deque(self._goto[0].values())
+        for state in queue:
+            self._fail[state] = 0
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+                queue.append(child)
+        self._built = True
+
+    def __len__(self) -> int:
+        return len(self._goto)
+
+    def find(self, text: str) -> Iterator[Tuple[int, int, Entry]]:
+        """(start, end, entry) for every whole-word match, in order of end position"""
+        if not self._built:
+            self.build()
+        goto, fail, out = self._goto, self._fail, self._out
+        lowered = text.lower()
+        length = len(lowered)
+        state = 0
+        for position, char in enumerate(lowered):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if not out[state]:
+                continue
+            end = position + 1
+            # "Don" is not in "don't", but "Aria's" is a mention of Aria
+            if end < length and (lowered[end].isalnum() or lowered[end] == "'" and end + 1 < length
+                                 and lowered[end + 1].isalpha() and not _possessive(lowered, end)):
+                continue
+            for entry in out[state]:
+                start = end - len(entry.phrase)
+                if start == 0 or not lowered[start - 1].isalnum():
+                    yield start, end, entry
+
+def _possessive(text: str, apostrophe: int) -> bool:
+    after = apostrophe + 2
+    return text[apostrophe + 1] == "s" and (after >= len(text) or not text[after].isalnum())
+
+def _field(entity: Any, name: str, default: Any = None) -> Any:
+    """Attribute of a development-agent dataclass, or key of its JSON form"""
+    if isinstance(entity, dict):
+        return entity.get(name, default)
+    return getattr(entity, name, default)
+
+def name_aliases(name: str) -> List[str]:
+    """The full name, the name without its title, and each name part long enough to be distinctive"""
+    words = name.replace(".", "").split()
+    bare = [word for word in words if word.lower() not in TITLES]
+    aliases = [name, " ".join(bare)]
+    if len(bare) > 1:
+        aliases.extend(word for word in bare if len(word) > 2)
+    if len(words) > len(bare) and bare:
+        aliases.append(f"{words[0]} {bare[-1]}")
+    return list(dict.fromkeys(alias for alias in aliases if alias))
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal-string-alignment distance (adjacent swaps count once), or limit + 1 once it is exceeded"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+class ConsistencyChecker:
+    """
+    Checks chapters against the story bible's characters and world.
+
+    Names, aliases, locations and trait antonyms share one Aho-Corasick index,
+    so a chapter is scanned once for all of them. Capitalized words the index
+    does not know are either near-misses of a known name (likely misspellings)
+    or unknown names. Reports are cached per chapter by content hash, so during
+    writing only new or changed chapters are scanned.
+    """
+
+    def __init__(self, characters: List[Any] = None, world: Any = None, aliases: Dict[str, List[str]] = None):
+        self.index = NameIndex()
+        self.traits: Dict[str, set] = {}
+        self.name_words: Dict[str, str] = {}
+        self._reports: Dict[int, ChapterReport] = {}
+        self._suggestions: Dict[str, Optional[str]] = {}
+        self.stats = {"chapters_checked": 0, "cache_hits": 0, "issues": 0}
+        self.set_entities(characters or [], world, aliases or {})
+
+    def set_entities(self, characters: List[Any], world: Any = None, aliases: Dict[str, List[str]] = None):
+        """(Re)build the index; cached reports are dropped since they were checked against the old bible"""
+        self.index = NameIndex()
+        self.traits, self.name_words = {}, {}
+        self._reports.clear()
+        self._suggestions.clear()
+        aliases = aliases or {}
+        for character in characters:
+            name = _field(character, "name")
+            if not name:
+                continue
+            for alias in name_aliases(name) + list(aliases.get(name, [])):
+                self._add_name(alias, Entry("character", name, alias.lower()))
+            self.traits[name] = {trait.lower() for trait in _field(character, "personality_traits", []) or []}
+        if world is not None:
+            places = list(_field(world, "locations", []) or [])
+            if _field(world, "name"):
+                places.append(_field(world, "name"))
+            for place in places:
+                for alias in [place] + list(aliases.get(place, [])):
+                    self._add_name(alias, Entry("location", place, alias.lower()))
+        for trait in {trait for traits in self.traits.values() for trait in traits}:
+            for word in TRAIT_ANTONYMS.get(trait, []):
+                self.index.add(word, Entry("trait", trait, word))
+        self.index.build()
+
+    def _add_name(self, alias: str, entry: Entry):
+        self.index.add(alias, entry)
+        for word in alias.split():
+            if word.lower() not in TITLES:
+                self.name_words.setdefault(word.lower(), entry.canonical)
+
+    @property
+    def has_entities(self) -> bool:
+        return bool(self.name_words)
+
+    def check_chapter(self, number: int, text: str) -> ChapterReport:
+        """Report for one chapter, reused while its text is unchanged"""
+        digest = hashlib.sha1(text.encode("utf-8")).hexdigest()
+        cached = self._reports.get(number)
+        if cached is not None and cached.digest == digest:
+            self.stats["cache_hits"] += 1
+            return cached
+        report = self._scan(number, text, digest)
+        self._reports[number] = report
+        self.stats["chapters_checked"] += 1
+        self.stats["issues"] += len(report.issues)
+        return report
+
+    def _scan(self, number: int, text: str, digest: str) -> ChapterReport:
+        report = ChapterReport(chapter=number, digest=digest)
+        last_character: Optional[Tuple[int, str]] = None
+        covered_until = -1
+        # Longer phrases end later than the aliases inside them, so keep the longest per start
+        matches = sorted(self.index.find(text), key=lambda m: (m[0], -(m[1] - m[0])))
+        for start, end, entry in matches:
+            if entry.kind == "trait":
+                self._check_trait(report, text, start, end, entry, last_character)
+                continue
+            if start < covered_until:
+                continue
+            covered_until = end
+            report.mentions[entry.canonical] = report.mentions.get(entry.canonical, 0) + 1
+            if entry.kind == "character":
+                last_character = (end, entry.canonical)
+        self._check_names(report, text)
+        report.issues.sort(key=lambda issue: issue.start)
+        return report
+
+    def _check_trait(self, report: ChapterReport, text: str, start: int, end: int, entry: Entry,
+                     last_character: Optional[Tuple[int, str]]):
+        if last_character is None or start - last_character[0] > TRAIT_WINDOW:
+            return
+        between = text[last_character[0]:start]
+        if re.search(r"[.!?]", between) or any(text[max(0, start - 12):start].lower().endswith(n) for n in NEGATIONS):
+            return
+        name = last_character[1]
+        if entry.canonical in self.traits.get(name, ()):
+            report.issues.append(ConsistencyIssue(
+                "trait_contradiction", report.chapter, start, end, text[start:end],
+                f"{name} is described as \"{text[start:end]}\" but the story bible says {entry.canonical}"
+            ))
+
+    def _check_names(self, report: ChapterReport, text: str):
+        for match in NAME_CANDIDATE.finditer(text):
+            offset = match.start()
+            for word in re.split(r"[ -]", match.group(0)):
+                key = word.lower()
+                start, offset = offset, offset + len(word) + 1
+                if key in self.name_words or key in COMMON_CAPITALIZED or key.split("'")[0] in self.name_words:
+                    continue
+                suggestion = self._suggest(key)
+                if suggestion:
+                    report.issues.append(ConsistencyIssue(
+                        "misspelling", report.chapter, start, start + len(word), word,
+                        f"\"{word}\" looks like a misspelling of {suggestion}", suggestion=suggestion
+                    ))
+                elif key not in report.unknown_names and word not in report.unknown_names:
+                    report.unknown_names[word] = 1
+                    report.issues.append(ConsistencyIssue(
+                        "unknown_name", report.chapter, start, start + len(word), word,
+                        f"\"{word}\" is not in the story bible"
+                    ))
+                else:
+                    report.unknown_names[word] = report.unknown_names.get(word, 0) + 1
+
+    def _suggest(self, word: str) -> Optional[str]:
+        """Closest known name part within a length-scaled edit distance, memoized per word"""
+        if word not in self._suggestions:
+            limit = 1 if len(word) <= 5 else 2
+            best, best_distance = None, limit + 1
+            for known in self.name_words:
+                distance = edit_distance(word, known, limit)
+                if distance < best_distance:
+                    best, best_distance = known, distance
+            self._suggestions[word] = best.capitalize() if best else None
+        return self._suggestions[word]
+
+    def check_chapters(self, chapters: Iterable[Tuple[int, str]]) -> Dict[str, Any]:
+        """Reports for (number, text) pairs plus a book-level summary; unchanged chapters come from cache"""
+        reports = [self.check_chapter(number, text) for number, text in chapters]
+        appearances: Dict[str, List[int]] = {}
+        unknown: Dict[str, int] = {}
+        for report in reports:
+            for name in report.mentions:
+                appearances.setdefault(name, []).append(report.chapter)
+            for name, count in report.unknown_names.items():
+                unknown[name] = unknown.get(name, 0) + count
+        return {
+            "chapters": [asdict(report) for report in reports],
+            "appearances": appearances,
+            "unknown_names": dict(sorted(unknown.items(), key=lambda item: -item[1])),
+            "total_issues": sum(len(report.issues) for report in reports)
+        }
+
+    def forget(self, number: int):
+        self._reports.pop(number, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.stats, cached_chapters=len(self._reports), index_states=len(self.index),
+                    known_names=len(self.name_words))
+
+# Example usage
+async def main():
+    import time
+
+    characters = [
+        {"name": "Aria Stormwind", "personality_traits": ["Curious", "Brave", "Determined", "Innocent"]},
+        {"name": "Thorne Blackwood", "personality_traits": ["Wise", "Secretive", "Protective", "Haunted"]}
+    ]
+    world = {"name": "Eldoria", "locations": ["Capital City", "Enchanted Forest", "Ancient Ruins"]}
+    checker = ConsistencyChecker(characters, world)
+
+    chapter = (
+        "Aria Stormwind left the Capital City at dawn. Thorne followed, candid about his past for once. "
+        "By noon Aira reached the Enchanted Forest, where Aria, cowardly and shaking, hid from Malrec. "
+        "Stormwind was not cowardly for long."
+    )
+    report = checker.check_chapter(1, chapter)
+    print(f"Mentions: {report.mentions}")
+    for issue in report.issues:
+        print(f"  {issue.kind}: {issue.message}")
+
+    book = [(number, (chapter + " ") * 150) for number in range(1, 31)]
+    started = time.perf_counter()
+    summary = checker.check_chapters(book)
+    first = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    checker.check_chapters(book[:-1] + [(30, book[-1][1] + " Thorne rested.")])
+    again = (time.perf_counter() - started) * 1000
+    words = sum(len(text.split()) for _, text in book)
+    print(f"{words} words checked in {first:.0f} ms ({summary['total_issues']} issues); "
+          f"after editing one chapter, re-checked in {again:.0f} ms")
+    print(checker.get_stats())
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,18 +1,23 @@
 import asyncio
 import json
+import sys
 from typing import Dict, List, Any
-from dataclasses import dataclass
+import importlib.util
+
+# Load once per process so every agent shares the same frozen registry
+knowledge_registry_module = sys.modules.get("knowledge_registry")
+if knowledge_registry_module is None:
+    spec = importlib.util.spec_from_file_location("knowledge_registry", "knowledge-registry.py")
+    knowledge_registry_module = importlib.util.module_from_spec(spec)
+    sys.modules["knowledge_registry"] = knowledge_registry_module
+    spec.loader.exec_module(knowledge_registry_module)
+AgentPersonality = knowledge_registry_module.AgentPersonality
+
+spec = importlib.util.spec_from_file_location("prompt_templates", "prompt-templates.py")
+prompt_templates_module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(prompt_templates_module)
+PromptLibrary = prompt_templates_module.PromptLibrary
 
-@dataclass
-class AgentPersonality:
-    name: str
-    role: str
-    personality: str
-    backstory: str
-    expertise: List[str]
-    communication_style: str
-    work_approach: str
-    quirks: List[str]
 
 class CrewAIIntegration:
     """
@@ -21,84 +26,14 @@ class CrewAIIntegration:
     
     def __init__(self):
         self.agent_personalities = self._load_agent_personalities()
+        self.prompt_library = PromptLibrary(self.agent_personalities)
     
     def _load_agent_personalities(self) -> Dict[str, AgentPersonality]:
         """
-        Load agent personalities from Crew AI
-        You can replace these with your actual Crew AI agent personalities
+        Load agent personalities from the shared read-only registry.
+        Every integration instance references the same objects, so construction is O(1).
         """
-        return {
-            "development": AgentPersonality(
-                name="Dr. Elena Rodriguez",
-                role="Development Agent",
-                personality="Creative and imaginative, with a deep love for storytelling and character development",
-                backstory="Former creative writing professor with 15 years of experience in character development. Published author of 8 novels across multiple genres. Known for creating memorable characters that readers connect with deeply.",
-                expertise=["Character Development", "World Building", "Story Structure", "Genre Conventions"],
-                communication_style="Warm and encouraging, often uses metaphors and storytelling examples",
-                work_approach="Methodical but creative, starts with character motivations and builds outward",
-                quirks=["Always carries a notebook", "Speaks in character voices", "References classic literature"]
-            ),
-            "research": AgentPersonality(
-                name="Dr. Marcus Chen",
-                role="Research Agent",
-                personality="Analytical and thorough, with an insatiable curiosity for facts and details",
-                backstory="Former investigative journalist turned academic researcher. PhD in Information Science. Known for uncovering hidden connections and finding the most obscure but relevant information.",
-                expertise=["Fact Checking", "Research Methodologies", "Data Analysis", "Source Validation"],
-                communication_style="Precise and detailed, always cites sources and explains reasoning",
-                work_approach="Systematic research with multiple verification steps",
-                quirks=["Organizes everything in color-coded folders", "Always fact-checks twice", "Keeps a research log"]
-            ),
-            "outline": AgentPersonality(
-                name="Sarah Mitchell",
-                role="Outline Agent",
-                personality="Organized and strategic, with a gift for seeing the big picture",
-                backstory="Former screenwriter and story consultant for major studios. Expert in story structure and pacing. Has helped develop over 200 successful projects across film, TV, and books.",
-                expertise=["Story Structure", "Pacing", "Chapter Organization", "Plot Development"],
-                communication_style="Clear and structured, uses visual aids and diagrams",
-                work_approach="Creates detailed outlines with clear progression and pacing",
-                quirks=["Draws story maps", "Uses index cards for scenes", "Always considers audience engagement"]
-            ),
-            "writing": AgentPersonality(
-                name="James \"Jazz\" Thompson",
-                role="Writing Agent",
-                personality="Passionate and expressive, with a natural talent for capturing voice and tone",
-                backstory="Award-winning author with 12 published novels. Known for distinctive voice and ability to adapt writing style to any genre. Former journalist who brings authenticity to every piece.",
-                expertise=["Writing Styles", "Voice Development", "Genre Adaptation", "Creative Writing"],
-                communication_style="Enthusiastic and engaging, often shares writing tips and techniques",
-                work_approach="Immersive writing that captures the essence of the story and characters",
-                quirks=["Writes in different fonts for different characters", "Acts out dialogue", "Keeps a voice journal"]
-            ),
-            "editing": AgentPersonality(
-                name="Professor Margaret \"Maggie\" O'Connor",
-                role="Editing Agent",
-                personality="Meticulous and caring, with an eye for both technical excellence and artistic integrity",
-                backstory="Former senior editor at major publishing house with 25 years of experience. Known for nurturing authors while maintaining high standards. Has edited 50+ bestsellers.",
-                expertise=["Grammar and Style", "Content Editing", "Quality Control", "Author Development"],
-                communication_style="Constructive and supportive, explains changes clearly",
-                work_approach="Balances technical perfection with preserving author voice",
-                quirks=["Uses red pen for major edits, blue for suggestions", "Reads aloud to check flow", "Keeps style guides for each genre"]
-            ),
-            "cover_design": AgentPersonality(
-                name="Alex Rivera",
-                role="Cover Design Agent",
-                personality="Visual and intuitive, with a deep understanding of design psychology",
-                backstory="Award-winning graphic designer with expertise in book covers. Former art director for major publishing house. Known for creating covers that both attract readers and accurately represent the content.",
-                expertise=["Visual Design", "Typography", "Color Theory", "Market Psychology"],
-                communication_style="Visual and descriptive, often sketches ideas while talking",
-                work_approach="Research-driven design that considers genre conventions and target audience",
-                quirks=["Collects book covers for inspiration", "Tests designs on different devices", "Studies reader psychology"]
-            ),
-            "audiobook": AgentPersonality(
-                name="Natalie \"Nat\" Williams",
-                role="Audiobook Agent",
-                personality="Expressive and technical, with a deep understanding of audio storytelling",
-                backstory="Former voice actor and audio engineer. Has narrated over 100 audiobooks and produced 50+ audio projects. Expert in voice casting and audio production.",
-                expertise=["Voice Acting", "Audio Production", "Narration Styles", "Audio Engineering"],
-                communication_style="Clear and expressive, often demonstrates different voices",
-                work_approach="Technical precision combined with artistic interpretation",
-                quirks=["Practices voices in different accents", "Tests audio on various devices", "Studies pronunciation guides"]
-            )
-        }
+        return knowledge_registry_module.get_agent_personalities()
     
     def get_agent_personality(self, agent_type: str) -> AgentPersonality:
         """Get personality for a specific agent type"""
@@ -118,10 +53,10 @@ class CrewAIIntegration:
                 "role": personality.role,
                 "personality": personality.personality,
                 "backstory": personality.backstory,
-                "expertise": personality.expertise,
+                "expertise": list(personality.expertise),
                 "communication_style": personality.communication_style,
                 "work_approach": personality.work_approach,
-                "quirks": personality.quirks
+                "quirks": list(personality.quirks)
             },
             "base_agent": base_agent
         }
@@ -129,32 +64,25 @@ class CrewAIIntegration:
         return enhanced_agent
     
     def create_personality_prompt(self, agent_type: str, task: str) -> str:
-        """Create a prompt that incorporates the agent's personality"""
-        personality = self.get_agent_personality(agent_type)
+        """
+        Create a prompt that incorporates the agent's personality.
+        The persona preamble is precompiled and identical across calls; the task comes last.
+        """
+        template = self.prompt_library.get(agent_type)
         
-        if not personality:
+        if not template:
             return f"Complete the following task: {task}"
         
-        prompt = f"""
-You are {personality.name}, a {personality.role}.
-
-PERSONALITY: {personality.personality}
-
-BACKSTORY: {personality.backstory}
-
-EXPERTISE: {', '.join(personality.expertise)}
-
-COMMUNICATION STYLE: {personality.communication_style}
-
-WORK APPROACH: {personality.work_approach}
-
-QUIRKS: {', '.join(personality.quirks)}
-
-TASK: {task}
-
-Please complete this task in character, using your unique personality, expertise, and approach. Stay true to your communication style and work methodology.
-"""
-        return prompt
+        return template.render(task)
+    
+    def create_personality_messages(self, agent_type: str, task: str) -> List[Dict[str, str]]:
+        """Chat messages with the persona preamble as a cacheable system prefix"""
+        template = self.prompt_library.get(agent_type)
+        
+        if not template:
+            return [{"role": "user", "content": f"Complete the following task: {task}"}]
+        
+        return template.messages(task)
     
     def get_agent_team_overview(self) -> Dict[str, Any]:
         """Get overview of all agent personalities"""
@@ -168,7 +96,7 @@ Please complete this task in character, using your unique personality, expertise
             team_overview["agents"][agent_type] = {
                 "name": personality.name,
                 "role": personality.role,
-                "expertise": personality.expertise,
+                "expertise": list(personality.expertise),
                 "personality_summary": personality.personality[:100] + "..."
             }
         
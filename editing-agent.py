@@ -0,0 +1,294 @@
+import asyncio
+import difflib
+import hashlib
+import json
+import os
+import re
+import sys
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Any, Optional, Tuple
+import importlib.util
+
+spec = importlib.util.spec_from_file_location("crew_ai_integration", "crew-ai-integration.py")
+crew_ai_module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(crew_ai_module)
+CrewAIIntegration = crew_ai_module.CrewAIIntegration
+
+# Load once per process so every agent shares one connection pool
+llm_client_module = sys.modules.get("llm_client")
+if llm_client_module is None:
+    spec = importlib.util.spec_from_file_location("llm_client", "llm-client.py")
+    llm_client_module = importlib.util.module_from_spec(spec)
+    sys.modules["llm_client"] = llm_client_module
+    spec.loader.exec_module(llm_client_module)
+LLMClientPool = llm_client_module.LLMClientPool
+get_llm_client = llm_client_module.get_llm_client
+TokenBudgeter = llm_client_module.token_budget_module.TokenBudgeter
+
+# Registered by name so the linter's pool workers can unpickle its functions
+style_linter_module = sys.modules.get("style_linter")
+if style_linter_module is None:
+    spec = importlib.util.spec_from_file_location("style_linter", "style-linter.py")
+    style_linter_module = importlib.util.module_from_spec(spec)
+    sys.modules["style_linter"] = style_linter_module
+    spec.loader.exec_module(style_linter_module)
+StyleLinter = style_linter_module.StyleLinter
+
+# Bump when the editing instructions change so cached edits are not reused
+EDIT_PROMPT_VERSION = "2"
+
+# Unchanged paragraphs sent on each side of a changed run, for reference only
+CONTEXT_PARAGRAPHS = 1
+
+# Paragraphs edited per request, so a full first pass is split into bounded calls
+MAX_RUN_PARAGRAPHS = 12
+
+def split_paragraphs(text: str) -> List[str]:
+    return [paragraph.strip() for paragraph in re.split(r"\n\s*\n", text or "") if paragraph.strip()]
+
+def paragraph_hash(paragraph: str) -> str:
+    """Content hash that ignores whitespace-only differences"""
+    normalized = " ".join(paragraph.split())
+    return hashlib.sha1(f"{EDIT_PROMPT_VERSION}:{normalized}".encode("utf-8")).hexdigest()
+
+def edit_key(paragraph_hash: str, genre: str = None) -> str:
+    """Edit-cache key: the same paragraph is edited differently under another genre's style notes"""
+    return f"{(genre or '').lower()}:{paragraph_hash}"
+
+def matched_paragraphs(old_hashes: List[str], new_hashes: List[str]) -> Dict[int, int]:
+    """New-version index -> old-version index for every paragraph the diff finds unchanged"""
+    matcher = difflib.SequenceMatcher(a=old_hashes, b=new_hashes, autojunk=False)
+    matches = {}
+    for tag, i1, _, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            matches.update(zip(range(j1, j2), range(i1, i1 + j2 - j1)))
+    return matches
+
+def group_runs(indices: List[int], gap: int = 2 * CONTEXT_PARAGRAPHS,
+               max_size: int = MAX_RUN_PARAGRAPHS) -> List[Tuple[int, int]]:
+    """Merge sorted indices into [start, end) runs; runs closer than gap share one request"""
+    runs: List[List[int]] = []
+    for index in sorted(indices):
+        if runs and index - runs[-1][1] <= gap and index + 1 - runs[-1][0] <= max_size:
+            runs[-1][1] = index + 1
+        else:
+            runs.append([index, index + 1])
+    return [(start, end) for start, end in runs]
+
+@dataclass
+class EditResult:
+    text: str
+    paragraphs: int
+    changed: List[int] = field(default_factory=list)
+    reused: int = 0
+    sent: int = 0
+    context_sent: int = 0
+
+@dataclass
+class _Version:
+    """The last version of a document seen, with the edit kept for each paragraph"""
+    hashes: List[str]
+    edited: List[Optional[str]]
+    genre: str
+
+class EditCache:
+    """LRU map from a source paragraph's hash (and genre) to its edited text"""
+
+    def __init__(self, max_entries: int = 50000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[str]:
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: str, value: str):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class EditingAgent:
+    """
+    Copy-edits chapters paragraph by paragraph.
+
+    Every source paragraph is hashed. On a re-edit the new version is diffed
+    against the last one seen for the same chapter: paragraphs the diff
+    matches keep their previous edit, and only the changed ones, plus
+    CONTEXT_PARAGRAPHS of read-only context on each side, go to the model, so
+    cost and latency follow the size of the change rather than the chapter.
+    A first pass reuses edits of identical paragraphs (per genre) from the cache.
+
+    A local style linter runs first: spacing slips are fixed before hashing,
+    and the remaining findings are passed to the model as notes.
+    """
+
+    def __init__(self, llm_client: LLMClientPool = None, crew_ai: CrewAIIntegration = None,
+                 token_budgeter: TokenBudgeter = None, edit_cache: EditCache = None, workers: int = None,
+                 linter: StyleLinter = None, max_documents: int = 4096):
+        self.name = "Editing Agent"
+        self.rag_knowledge = ["grammar_rules", "style_guides"]
+        self.knowledge = None
+        self.llm_client = llm_client or get_llm_client()
+        self.crew_ai = crew_ai or CrewAIIntegration()
+        self.token_budgeter = token_budgeter or TokenBudgeter()
+        self.budget = self.token_budgeter.budget_for("editing")
+        self.edit_cache = edit_cache or EditCache()
+        self.workers = workers or int(os.getenv("EDITING_WORKERS", 4))
+        self.linter = linter or StyleLinter()
+        # Last version per document key, least recently edited first
+        self.max_documents = max_documents
+        self._versions: "OrderedDict[str, _Version]" = OrderedDict()
+        self.stats = {
+            "edits": 0, "paragraphs": 0, "paragraphs_reused": 0, "paragraphs_sent": 0,
+            "context_paragraphs_sent": 0, "runs": 0, "failed_runs": 0
+        }
+
+    async def edit_chapter(self, chapter, key: str = None, genre: str = None):
+        """Edit a writing-stage chapter in place"""
+        result = await self.edit_text(chapter.text, key=key or f"chapter:{chapter.number}", genre=genre)
+        chapter.text = result.text
+        chapter.word_count = len(result.text.split())
+        return chapter
+
+    async def edit_text(self, text: str, key: str = None, genre: str = None) -> EditResult:
+        """
+        Edit text, reusing cached edits for paragraphs that have not changed.
+        key names the document (e.g. "book_1:7") whose previous version is diffed against;
+        genre selects the style guide the linter checks against.
+        """
+        paragraphs = split_paragraphs(self.linter.fix(text))
+        hashes = [paragraph_hash(paragraph) for paragraph in paragraphs]
+        genre_key = (genre or "").lower()
+        previous = self._versions.get(key) if key else None
+        if previous is not None and previous.genre == genre_key:
+            # The diff decides: matched paragraphs keep the previous version's edit
+            matches = matched_paragraphs(previous.hashes, hashes)
+            edited: List[Optional[str]] = [
+                previous.edited[matches[i]] if i in matches else None for i in range(len(hashes))
+            ]
+            changed = [i for i in range(len(hashes)) if i not in matches]
+        else:
+            edited = [self.edit_cache.get(edit_key(h, genre)) for h in hashes]
+            changed = list(range(len(hashes)))
+        # Changed paragraphs, and matched ones whose previous edit failed, go to the model
+        dirty = [i for i, value in enumerate(edited) if value is None]
+        result = EditResult(text="", paragraphs=len(paragraphs), changed=changed,
+                            reused=len(paragraphs) - len(dirty))
+
+        semaphore = asyncio.Semaphore(self.workers)
+
+        async def run(start: int, end: int):
+            async with semaphore:
+                sent, context = await self._edit_run(paragraphs, hashes, edited, start, end, genre)
+            result.sent += sent
+            result.context_sent += context
+
+        await asyncio.gather(*(run(start, end) for start, end in group_runs(dirty)))
+
+        result.text = "\n\n".join(value if value is not None else paragraphs[i] for i, value in enumerate(edited))
+        if key:
+            self._versions[key] = _Version(hashes, edited, genre_key)
+            self._versions.move_to_end(key)
+            while len(self._versions) > self.max_documents:
+                self._versions.popitem(last=False)
+        self.stats["edits"] += 1
+        self.stats["paragraphs"] += result.paragraphs
+        self.stats["paragraphs_reused"] += result.reused
+        self.stats["paragraphs_sent"] += result.sent
+        self.stats["context_paragraphs_sent"] += result.context_sent
+        return result
+
+    async def _edit_run(self, paragraphs: List[str], hashes: List[str], edited: List[Optional[str]],
+                        start: int, end: int, genre: str = None) -> Tuple[int, int]:
+        """Edit paragraphs[start:end] (some may already be cached) with context on both sides"""
+        targets = [i for i in range(start, end) if edited[i] is None]
+        before = range(max(0, start - CONTEXT_PARAGRAPHS), start)
+        after = range(end, min(len(paragraphs), end + CONTEXT_PARAGRAPHS))
+        context = [i for i in list(before) + list(range(start, end)) + list(after) if i not in targets]
+        self.stats["runs"] += 1
+
+        revised = None
+        if self.llm_client.enabled:
+            try:
+                result = await self.llm_client.chat(
+                    self._run_messages(paragraphs, targets, before, range(start, end), after, genre),
+                    agent="editing", call_class="editing", max_tokens=self.budget.max_completion_tokens
+                )
+                revised = _parse_paragraphs(result.text, len(targets))
+            except Exception as e:
+                print(f"Editing run {start}-{end} failed, keeping the original text: {e}")
+            if revised is None:
+                self.stats["failed_runs"] += 1
+                return len(targets), len(context)
+        else:
+            # Without a model only mechanical clean-up is applied
+            revised = [" ".join(paragraphs[i].split()) for i in targets]
+
+        for i, paragraph in zip(targets, revised):
+            edited[i] = paragraph
+            self.edit_cache.put(edit_key(hashes[i], genre), paragraph)
+        return len(targets), len(context) if self.llm_client.enabled else 0
+
+    def _run_messages(self, paragraphs: List[str], targets: List[int], before: range, middle: range,
+                      after: range, genre: str = None) -> List[Dict[str, str]]:
+        blocks = []
+        for i in list(before) + list(middle) + list(after):
+            if i not in targets:
+                blocks.append(f"[CONTEXT]\n{paragraphs[i]}")
+                continue
+            notes = "; ".join(issue.message for issue in self.linter.lint(paragraphs[i], genre))
+            blocks.append(f"[EDIT]\n{paragraphs[i]}" + (f"\nStyle notes: {notes}" if notes else ""))
+        task = (
+            "Copy-edit the paragraphs marked [EDIT] for grammar, clarity and flow without changing "
+            "the plot, voice or paragraph breaks. Address any style notes where it reads better. "
+            "Paragraphs marked [CONTEXT] are for reference only.\n\n"
+            + "\n\n".join(blocks)
+            + f"\n\nReply with a JSON array of exactly {len(targets)} strings: the edited [EDIT] paragraphs, in order."
+        )
+        return self.crew_ai.create_personality_messages("editing", task)
+
+    def get_stats(self) -> Dict[str, Any]:
+        paragraphs = self.stats["paragraphs"]
+        return dict(
+            self.stats,
+            reuse_rate=self.stats["paragraphs_reused"] / paragraphs if paragraphs else 0.0,
+            cached_paragraphs=len(self.edit_cache),
+            documents=len(self._versions),
+            linter=self.linter.get_stats()
+        )
+
+def _parse_paragraphs(text: str, expected: int) -> Optional[List[str]]:
+    """The model's JSON array of paragraphs, or None if it is malformed or the wrong length"""
+    start, end = text.find("["), text.rfind("]")
+    if start < 0 or end <= start:
+        return None
+    try:
+        values = json.loads(text[start:end + 1])
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(values, list) or len(values) != expected or not all(isinstance(v, str) for v in values):
+        return None
+    return [value.strip() for value in values]
+
+# Example usage
+async def main():
+    agent = EditingAgent()
+    draft = "\n\n".join(f"Paragraph {i}  has  some   loose spacing ,and and a repeated word." for i in range(1, 41))
+    first = await agent.edit_text(draft, key="book_demo:1")
+    print(f"First pass: {first.paragraphs} paragraphs, {first.sent} sent, {first.reused} reused")
+
+    revised = draft.replace("Paragraph 17 ", "Paragraph seventeen, rewritten by the customer, ")
+    second = await agent.edit_text(revised, key="book_demo:1")
+    print(f"Re-edit: changed {second.changed}, {second.sent} sent, {second.reused} reused")
+    print(f"Paragraph 1 after the pre-pass: {second.text.split(chr(10))[0]!r}")
+    print(agent.get_stats())
+
+if __name__ == "__main__":
+    asyncio.run(main())
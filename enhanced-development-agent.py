@@ -1,13 +1,61 @@
 import asyncio
 import json
-from typing import Dict, List, Any
-from dataclasses import dataclass
+import sys
+from typing import Dict, List, Any, AsyncIterator
+from dataclasses import dataclass, asdict
 import importlib.util
+
+# Load once per process so every agent shares the same frozen registry
+knowledge_registry_module = sys.modules.get("knowledge_registry")
+if knowledge_registry_module is None:
+    spec = importlib.util.spec_from_file_location("knowledge_registry", "knowledge-registry.py")
+    knowledge_registry_module = importlib.util.module_from_spec(spec)
+    sys.modules["knowledge_registry"] = knowledge_registry_module
+    spec.loader.exec_module(knowledge_registry_module)
+
 spec = importlib.util.spec_from_file_location("crew_ai_integration", "crew-ai-integration.py")
 crew_ai_module = importlib.util.module_from_spec(spec)
 spec.loader.exec_module(crew_ai_module)
 CrewAIIntegration = crew_ai_module.CrewAIIntegration
 
+# Load once per process so every agent shares one index
+knowledge_index_module = sys.modules.get("knowledge_index")
+if knowledge_index_module is None:
+    spec = importlib.util.spec_from_file_location("knowledge_index", "knowledge-index.py")
+    knowledge_index_module = importlib.util.module_from_spec(spec)
+    sys.modules["knowledge_index"] = knowledge_index_module
+    spec.loader.exec_module(knowledge_index_module)
+KnowledgeIndex = knowledge_index_module.KnowledgeIndex
+get_knowledge_index = knowledge_index_module.get_knowledge_index
+flatten_knowledge = knowledge_index_module.flatten_knowledge
+
+spec = importlib.util.spec_from_file_location("retrieval_cache", "retrieval-cache.py")
+retrieval_cache_module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(retrieval_cache_module)
+RetrievalCache = retrieval_cache_module.RetrievalCache
+normalize_query = retrieval_cache_module.normalize_query
+retrieval_key = retrieval_cache_module.retrieval_key
+
+spec = importlib.util.spec_from_file_location("single_flight", "single-flight.py")
+single_flight_module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(single_flight_module)
+SingleFlight = single_flight_module.SingleFlight
+call_key = single_flight_module.call_key
+
+# Load once per process so every agent shares one connection pool
+llm_client_module = sys.modules.get("llm_client")
+if llm_client_module is None:
+    spec = importlib.util.spec_from_file_location("llm_client", "llm-client.py")
+    llm_client_module = importlib.util.module_from_spec(spec)
+    sys.modules["llm_client"] = llm_client_module
+    spec.loader.exec_module(llm_client_module)
+LLMClientPool = llm_client_module.LLMClientPool
+get_llm_client = llm_client_module.get_llm_client
+TokenBudgeter = llm_client_module.token_budget_module.TokenBudgeter
+
+# Knowledge domains the development agent retrieves from
+DEVELOPMENT_DOMAINS = ["fiction_writing_guides", "character_development", "world_building", "genre_conventions"]
+
 @dataclass
 class Character:
     name: str
@@ -33,77 +81,52 @@ class EnhancedDevelopmentAgent:
     Development Agent enhanced with Crew AI personality
     """
     
-    def __init__(self, openai_api_key: str = None):
+    def __init__(self, openai_api_key: str = None, crew_ai: CrewAIIntegration = None,
+                 knowledge_index: KnowledgeIndex = None, retrieval_cache: RetrievalCache = None,
+                 llm_client: LLMClientPool = None, single_flight: SingleFlight = None,
+                 token_budgeter: TokenBudgeter = None):
         self.name = "Dr. Elena Rodriguez"
         self.role = "Development Agent"
-        self.crew_ai = CrewAIIntegration()
+        self.crew_ai = crew_ai or CrewAIIntegration()
         self.personality = self.crew_ai.get_agent_personality("development")
+        self.llm_client = llm_client or (LLMClientPool(api_key=openai_api_key) if openai_api_key else get_llm_client())
         
-        # Initialize knowledge base (same as before)
-        self.knowledge_base = {
-            "character_development": self._load_character_development_knowledge(),
-            "world_building": self._load_world_building_knowledge(),
-            "genre_conventions": self._load_genre_conventions()
-        }
-    
-    def _load_character_development_knowledge(self) -> Dict[str, Any]:
-        """Load character development knowledge base"""
-        return {
-            "archetypes": [
-                "Hero", "Mentor", "Threshold Guardian", "Herald", "Shapeshifter", 
-                "Shadow", "Ally", "Trickster"
-            ],
-            "personality_traits": [
-                "Extroverted", "Introverted", "Analytical", "Creative", "Practical",
-                "Idealistic", "Cautious", "Adventurous", "Loyal", "Independent"
-            ],
-            "character_goals": [
-                "External Goal", "Internal Goal", "Relationship Goal", "Professional Goal",
-                "Personal Growth Goal", "Survival Goal", "Revenge Goal", "Discovery Goal"
-            ],
-            "conflict_types": [
-                "Man vs Man", "Man vs Nature", "Man vs Society", "Man vs Self",
-                "Man vs Technology", "Man vs Supernatural"
-            ]
-        }
-    
-    def _load_world_building_knowledge(self) -> Dict[str, Any]:
-        """Load world building knowledge base"""
-        return {
-            "world_elements": [
-                "Geography", "Climate", "Culture", "Politics", "Economy",
-                "Technology", "Magic Systems", "Religion", "History", "Social Structure"
-            ],
-            "atmosphere_types": [
-                "Dark and Gritty", "Light and Hopeful", "Mysterious", "Tense",
-                "Peaceful", "Chaotic", "Orderly", "Romantic", "Dangerous"
-            ],
-            "time_periods": [
-                "Ancient", "Medieval", "Renaissance", "Industrial", "Modern",
-                "Future", "Post-Apocalyptic", "Alternate History"
-            ]
-        }
+        # Shared read-only knowledge base (same objects for every agent instance)
+        self.knowledge_base = knowledge_registry_module.get_development_knowledge()
+        
+        # Retrieval over the shared index; unchanged documents are skipped on upsert
+        self.knowledge_index = knowledge_index or get_knowledge_index()
+        self.knowledge_index.upsert_documents(flatten_knowledge(self.knowledge_base))
+        self.knowledge = self.knowledge_index.scoped(DEVELOPMENT_DOMAINS)
+        self.retrieval_cache = retrieval_cache or RetrievalCache()
+        
+        # Identical briefs submitted concurrently share one generation
+        self.single_flight = single_flight or SingleFlight()
+        
+        # Retrieved notes are trimmed to the development agent's prompt budget
+        self.token_budgeter = token_budgeter or TokenBudgeter(model=self.llm_client.model)
+        self.budget = self.token_budgeter.budget_for("development")
     
-    def _load_genre_conventions(self) -> Dict[str, Any]:
-        """Load genre-specific conventions"""
-        return {
-            "fantasy": {
-                "elements": ["Magic", "Fantasy Races", "Quests", "Good vs Evil"],
-                "tropes": ["Chosen One", "Dark Lord", "Magical Artifacts", "Hidden World"]
-            },
-            "sci_fi": {
-                "elements": ["Advanced Technology", "Space Travel", "Aliens", "Future Society"],
-                "tropes": ["AI Rebellion", "Time Travel", "Space Opera", "Dystopia"]
-            },
-            "mystery": {
-                "elements": ["Crime", "Investigation", "Clues", "Suspense"],
-                "tropes": ["Detective", "Red Herring", "Whodunit", "Amateur Sleuth"]
-            },
-            "romance": {
-                "elements": ["Love Story", "Emotional Conflict", "Happy Ending"],
-                "tropes": ["Enemies to Lovers", "Second Chance", "Forbidden Love"]
+    async def retrieve_context(self, purpose: str, genre: str, tone: str = "", requirements: str = "") -> Dict[str, Any]:
+        """
+        Retrieve knowledge for a brief. Near-identical briefs share one cache entry
+        (keyed by the normalized genre, tone and requirements), and any index update
+        invalidates it.
+        """
+        key = retrieval_key(purpose, genre, tone, requirements)
+        _, norm_genre, norm_tone, norm_requirements = key
+        
+        def _search() -> Dict[str, Any]:
+            query = f"{purpose} {norm_genre} {norm_tone} {norm_requirements}"
+            return {
+                "genre_conventions": dict(self.knowledge_base["genre_conventions"].get(norm_genre.split(" ")[0], {})),
+                "retrieved": [
+                    {"doc_id": result.doc_id, "text": result.text, "score": result.score}
+                    for result in self.knowledge.search(query, k=4, genre=norm_genre.split(" ")[0] or None)
+                ]
             }
-        }
+        
+        return await self.retrieval_cache.get_or_compute(key, _search, index_version=self.knowledge.version)
     
     def get_personality_introduction(self) -> str:
         """Get Dr. Elena's introduction in character"""
@@ -123,14 +146,22 @@ Now, tell me about your story - what genre are we working with, and what's the h
     
     async def create_characters(self, genre: str, tone: str, requirements: str) -> List[Character]:
         """
-        Create characters using Dr. Elena's personality and expertise
+        Create characters using Dr. Elena's personality and expertise.
+        Concurrent calls with the same brief (up to case and whitespace) share one in-flight result.
         """
+        return await self.single_flight.do(
+            call_key("create_characters", genre, tone, requirements),
+            lambda: self._create_characters(genre, tone, requirements)
+        )
+    
+    async def _create_characters(self, genre: str, tone: str, requirements: str) -> List[Character]:
         print(self.get_personality_introduction())
         print(f"\n*flips through notebook thoughtfully*\n")
         print(f"Ah, {genre} with a {tone} tone! This is going to be wonderful. Let me think about this...")
         
-        # Get relevant knowledge from RAG
-        genre_conventions = self.knowledge_base["genre_conventions"].get(genre, {})
+        # Get relevant knowledge from RAG (cached per normalized brief)
+        context = await self.retrieve_context("characters", genre, tone, requirements)
+        genre_conventions = context["genre_conventions"]
         character_techniques = self.knowledge_base["character_development"]
         
         print(f"\n*consults her extensive knowledge of {genre} conventions*\n")
@@ -139,16 +170,11 @@ Now, tell me about your story - what genre are we working with, and what's the h
         # Generate characters based on genre and requirements
         characters = []
         
-        if genre == "fantasy":
-            characters = await self._create_fantasy_characters(tone, requirements)
-        elif genre == "sci_fi":
-            characters = await self._create_scifi_characters(tone, requirements)
-        elif genre == "mystery":
-            characters = await self._create_mystery_characters(tone, requirements)
-        elif genre == "romance":
-            characters = await self._create_romance_characters(tone, requirements)
-        else:
-            characters = await self._create_general_characters(genre, tone, requirements)
+        if self.llm_client.enabled:
+            characters = await self._generate_characters(genre, tone, requirements, context)
+        
+        if not characters:
+            characters = await self._create_template_characters(genre, tone, requirements)
         
         print(f"\n*closes notebook with satisfaction*\n")
         print(f"Excellent! I've created {len(characters)} characters that I think will really resonate with readers. Each one has their own unique voice and journey.")
@@ -157,31 +183,157 @@ Now, tell me about your story - what genre are we working with, and what's the h
     
     async def build_world(self, genre: str, setting_requirements: str) -> World:
         """
-        Build world using Dr. Elena's world-building expertise
+        Build world using Dr. Elena's world-building expertise.
+        Concurrent calls with the same brief (up to case and whitespace) share one in-flight result.
         """
+        return await self.single_flight.do(
+            call_key("build_world", genre, setting_requirements),
+            lambda: self._build_world(genre, setting_requirements)
+        )
+    
+    async def _build_world(self, genre: str, setting_requirements: str) -> World:
         print(f"\n*adjusts glasses and pulls out a fresh page*\n")
         print(f"Now for the world-building! This is where the magic happens - literally, in the case of fantasy! *laughs*")
         
-        # Get relevant world building knowledge
+        # Get relevant world building knowledge (cached per normalized brief)
         world_elements = self.knowledge_base["world_building"]["world_elements"]
-        genre_conventions = self.knowledge_base["genre_conventions"].get(genre, {})
+        context = await self.retrieve_context("world", genre, requirements=setting_requirements)
+        genre_conventions = context["genre_conventions"]
         
         print(f"\n*consults her world-building checklist*\n")
         print(f"For a {genre} world, we need to consider {len(world_elements)} key elements. Let me craft something special for you...")
         
         # Generate world based on genre and requirements
-        if genre == "fantasy":
-            world = await self._create_fantasy_world(setting_requirements)
-        elif genre == "sci_fi":
-            world = await self._create_scifi_world(setting_requirements)
-        else:
-            world = await self._create_general_world(genre, setting_requirements)
+        world = None
+        if self.llm_client.enabled:
+            world = await self._generate_world(genre, setting_requirements, context)
+        
+        if not world:
+            world = await self._create_template_world(genre, setting_requirements)
         
         print(f"\n*sketches a quick map in the margin*\n")
         print(f"There we go! I've created '{world.name}' - a world that I think will really serve your story and characters.")
         
         return world
     
+    async def stream_characters(self, genre: str, tone: str, requirements: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield {"event": "delta", "text": ...} chunks while the model writes,
+        then one {"event": "character", ...} per finished character
+        """
+        context = await self.retrieve_context("characters", genre, tone, requirements)
+        characters = []
+        if self.llm_client.enabled:
+            parts = []
+            try:
+                async for delta in self.llm_client.stream_chat(
+                    self._characters_messages(genre, tone, requirements, context), agent="development",
+                    call_class="brainstorm", max_tokens=self.budget.max_completion_tokens
+                ):
+                    parts.append(delta)
+                    yield {"event": "delta", "text": delta}
+                characters = [Character(**item) for item in _parse_json("".join(parts), "[", "]")]
+            except Exception as e:
+                print(f"Character streaming failed, using templates: {e}")
+        
+        if not characters:
+            characters = await self._create_template_characters(genre, tone, requirements)
+        for character in characters:
+            yield {"event": "character", "character": asdict(character)}
+    
+    async def stream_world(self, genre: str, setting_requirements: str) -> AsyncIterator[Dict[str, Any]]:
+        """Yield {"event": "delta", ...} chunks while the model writes, then {"event": "world", ...}"""
+        context = await self.retrieve_context("world", genre, requirements=setting_requirements)
+        world = None
+        if self.llm_client.enabled:
+            parts = []
+            try:
+                async for delta in self.llm_client.stream_chat(
+                    self._world_messages(genre, setting_requirements, context), agent="development",
+                    call_class="brainstorm", max_tokens=self.budget.max_completion_tokens
+                ):
+                    parts.append(delta)
+                    yield {"event": "delta", "text": delta}
+                world = World(**_parse_json("".join(parts), "{", "}"))
+            except Exception as e:
+                print(f"World streaming failed, using templates: {e}")
+        
+        if not world:
+            world = await self._create_template_world(genre, setting_requirements)
+        yield {"event": "world", "world": asdict(world)}
+    
+    def _characters_messages(self, genre: str, tone: str, requirements: str,
+                             context: Dict[str, Any]) -> List[Dict[str, str]]:
+        def task(notes: List[str]) -> str:
+            return (
+                f"Create 2-4 characters for a {genre} novel with a {tone} tone.\n"
+                f"Requirements: {requirements}\n"
+                f"Genre conventions: {json.dumps(context.get('genre_conventions', {}))}\n"
+                f"Reference notes: {json.dumps(notes)}\n"
+                "Respond with only a JSON array of objects with the keys name, role, description, "
+                "backstory, personality_traits, goals and conflicts."
+            )
+        
+        notes = self.token_budgeter.fit_context(
+            "development",
+            [r["text"] for r in context.get("retrieved", [])],
+            fixed_messages=self.crew_ai.create_personality_messages("development", task([]))
+        )
+        return self.crew_ai.create_personality_messages("development", task(notes))
+    
+    def _world_messages(self, genre: str, requirements: str, context: Dict[str, Any]) -> List[Dict[str, str]]:
+        task = (
+            f"Build the world for a {genre} novel.\n"
+            f"Setting requirements: {requirements}\n"
+            f"Genre conventions: {json.dumps(context.get('genre_conventions', {}))}\n"
+            "Respond with only a JSON object with the keys name, description, setting_details, "
+            "rules_systems, locations, time_period and atmosphere."
+        )
+        return self.crew_ai.create_personality_messages("development", task)
+    
+    async def _generate_characters(self, genre: str, tone: str, requirements: str,
+                                   context: Dict[str, Any]) -> List[Character]:
+        """Ask the model for characters; returns [] so callers fall back to templates"""
+        try:
+            result = await self.llm_client.chat(self._characters_messages(genre, tone, requirements, context),
+                                                agent="development", call_class="brainstorm",
+                                                max_tokens=self.budget.max_completion_tokens)
+            return [Character(**item) for item in _parse_json(result.text, "[", "]")]
+        except Exception as e:
+            print(f"Character generation failed, using templates: {e}")
+            return []
+    
+    async def _generate_world(self, genre: str, requirements: str, context: Dict[str, Any]) -> World:
+        """Ask the model for a world; returns None so callers fall back to templates"""
+        try:
+            result = await self.llm_client.chat(self._world_messages(genre, requirements, context),
+                                                agent="development", call_class="brainstorm",
+                                                max_tokens=self.budget.max_completion_tokens)
+            return World(**_parse_json(result.text, "{", "}"))
+        except Exception as e:
+            print(f"World generation failed, using templates: {e}")
+            return None
+    
+    async def _create_template_characters(self, genre: str, tone: str, requirements: str) -> List[Character]:
+        """Built-in characters used when no model is configured"""
+        if genre == "fantasy":
+            return await self._create_fantasy_characters(tone, requirements)
+        elif genre == "sci_fi":
+            return await self._create_scifi_characters(tone, requirements)
+        elif genre == "mystery":
+            return await self._create_mystery_characters(tone, requirements)
+        elif genre == "romance":
+            return await self._create_romance_characters(tone, requirements)
+        return await self._create_general_characters(genre, tone, requirements)
+    
+    async def _create_template_world(self, genre: str, requirements: str) -> World:
+        """Built-in world used when no model is configured"""
+        if genre == "fantasy":
+            return await self._create_fantasy_world(requirements)
+        elif genre == "sci_fi":
+            return await self._create_scifi_world(requirements)
+        return await self._create_general_world(genre, requirements)
+    
     async def _create_fantasy_characters(self, tone: str, requirements: str) -> List[Character]:
         """Create fantasy characters with Dr. Elena's touch"""
         print("*speaks in a mystical voice* 'In the realm of fantasy, every character carries the weight of destiny...'")
@@ -341,6 +493,10 @@ Now, tell me about your story - what genre are we working with, and what's the h
         
         return summary
 
+def _parse_json(text: str, opener: str, closer: str) -> Any:
+    """Parse the outermost JSON array/object in a model response"""
+    return json.loads(text[text.index(opener):text.rindex(closer) + 1])
+
 # Example usage
 async def main():
     agent = EnhancedDevelopmentAgent()
@@ -145,22 +145,23 @@ class InkWellAgentIntegration:
             project = self.active_projects[project_id]
             
             if approval:
-                # Continue to writing phase
-                project.status = ProjectStatus.WRITING_IN_PROGRESS
-                await self.agent_coordinator.workflow_manager._execute_writing_phase(project)
+                # Continue to writing phase; the whole outline is approved at once
+                result = await self.agent_coordinator.approve_outline(project_id, None, True, feedback)
                 
                 return {
-                    "success": True,
-                    "message": "Outline approved, writing phase started"
+                    "success": "error" not in result,
+                    "message": "Outline approved, writing phase started",
+                    "approval": result
                 }
             else:
-                # Return to outline phase for revisions
+                # Stay in the outline phase with the feedback recorded on every chapter
+                result = await self.agent_coordinator.approve_outline(project_id, None, False, feedback)
                 project.status = ProjectStatus.OUTLINE_READY
-                await self.agent_coordinator.workflow_manager._execute_outline_phase(project)
                 
                 return {
-                    "success": True,
-                    "message": "Outline rejected, revisions requested"
+                    "success": "error" not in result,
+                    "message": "Outline rejected, revisions requested",
+                    "approval": result
                 }
         
         except Exception as e:
@@ -189,9 +190,13 @@ class InkWellAgentIntegration:
                 "title": project.title,
                 "status": project.status.value,
                 "outline": project.outline,
-                "manuscript": project.manuscript,
+                "manuscript": project.manuscript.get_stats() if project.manuscript else None,
+                "exports": {
+                    fmt: f"/project/{project_id}/export/{fmt}" for fmt in ("epub", "docx", "pdf")
+                } if project.manuscript else {},
                 "cover_design": project.cover_design,
                 "audiobook_url": project.audiobook_url,
+                "audio_tracks": dict(sorted(project.audio_tracks.items())) if project.audio_tracks else {},
                 "created_at": project.created_at,
                 "updated_at": project.updated_at
             }
@@ -0,0 +1,660 @@
+import asyncio
+import hashlib
+import os
+import re
+import tempfile
+import threading
+import time
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+# Genre-agnostic documents (grammar rules, style guides) live in this partition
+ANY_GENRE = "*"
+GENRES = ("fantasy", "sci_fi", "mystery", "romance", "non-fiction", "academic", "biography")
+
+import importlib.util
+spec = importlib.util.spec_from_file_location("vector_quantization", "vector-quantization.py")
+vector_quantization_module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(vector_quantization_module)
+create_codec = vector_quantization_module.create_codec
+
+@dataclass
+class SearchResult:
+    doc_id: str
+    version: int
+    chunk: int
+    text: str
+    metadata: Dict[str, Any]
+    score: float
+
+@dataclass
+class Segment:
+    """
+    Immutable batch of embedded chunks from one (domain, genre) partition.
+    Only the `alive` mask changes after creation.
+    """
+    id: int
+    partition: Tuple[str, str]
+    doc_ids: List[str]
+    versions: np.ndarray
+    chunks: np.ndarray
+    texts: List[str]
+    metadata: List[Dict[str, Any]]
+    vectors: np.ndarray
+    alive: np.ndarray
+    codec: Any = None
+    codes: np.ndarray = None
+    path: str = None
+    rows_by_doc: Dict[str, np.ndarray] = field(default_factory=dict)
+    columns: Dict[str, np.ndarray] = field(default_factory=dict)
+    created_at: float = field(default_factory=time.time)
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    def live_count(self) -> int:
+        return int(self.alive.sum())
+
+    def filter_mask(self, where: Dict[str, Any] = None) -> np.ndarray:
+        """Rows that are alive and match every metadata condition (value or list of values)"""
+        mask = self.alive.copy()
+        for key, expected in (where or {}).items():
+            column = self.columns.get(key)
+            if column is None:
+                column = np.array([m.get(key) for m in self.metadata], dtype=object)
+                self.columns[key] = column
+            if isinstance(expected, (list, tuple, set)):
+                mask &= np.isin(column, list(expected))
+            else:
+                mask &= column == expected
+        return mask
+
+class HashingEmbeddings:
+    """
+    Deterministic local embeddings based on feature hashing.
+    Same interface as langchain's OpenAIEmbeddings, used when no API key is configured.
+    """
+
+    def __init__(self, dimensions: int = 256):
+        self.dimensions = dimensions
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        tokens = re.findall(r"[a-z0-9']+", text.lower())
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        for feature in features:
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dimensions
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector.tolist()
+
+def split_text(text: str, chunk_size: int = 800, chunk_overlap: int = 100) -> List[str]:
+    """Split text into chunks on paragraph boundaries, falling back to hard splits"""
+    paragraphs = [p.strip() for p in re.split(r"\n\s*\n", text) if p.strip()]
+    chunks = []
+    current = ""
+    for paragraph in paragraphs:
+        while len(paragraph) > chunk_size:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(paragraph[:chunk_size])
+            paragraph = paragraph[chunk_size - chunk_overlap:]
+        if current and len(current) + len(paragraph) + 2 > chunk_size:
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n\n{paragraph}" if current else paragraph
+    if current:
+        chunks.append(current)
+    return chunks
+
+def partition_metadata(doc_id: str, genres: tuple = GENRES) -> Dict[str, str]:
+    """
+    Infer partition metadata from a document id laid out as domain/[genre/]name:
+    the first path component is the domain, and the first later component that
+    names a known genre is the genre.
+    """
+    parts = doc_id.split("/")
+    genre = next((part for part in parts[1:] if part in genres), ANY_GENRE)
+    return {"domain": parts[0], "genre": genre}
+
+def flatten_knowledge(knowledge: Dict[str, Any], prefix: str = "") -> Dict[str, str]:
+    """
+    Turn a nested knowledge base dict into {doc_id: text} documents,
+    one document per leaf list or value.
+    """
+    documents = {}
+    for key, value in knowledge.items():
+        doc_id = f"{prefix}/{key}" if prefix else key
+        if isinstance(value, Mapping):
+            documents.update(flatten_knowledge(value, doc_id))
+        elif isinstance(value, (list, tuple)):
+            documents[doc_id] = f"{doc_id.replace('/', ' ').replace('_', ' ')}: " + ", ".join(str(v) for v in value)
+        else:
+            documents[doc_id] = f"{doc_id.replace('/', ' ').replace('_', ' ')}: {value}"
+    return documents
+
+class KnowledgeScope:
+    """
+    Read-only view of a KnowledgeIndex restricted to a set of knowledge domains
+    """
+
+    def __init__(self, index, domains: List[str]):
+        self.index = index
+        self.domains = list(domains)
+
+    @property
+    def version(self) -> int:
+        return self.index.version
+
+    def search(self, query: str, k: int = 4, genre: str = None, where: Dict[str, Any] = None) -> List[SearchResult]:
+        return self.index.search(query, k, domains=self.domains, genres=[genre] if genre else None, where=where)
+
+class KnowledgeIndex:
+    """
+    Incrementally updatable vector index for RAG knowledge.
+
+    Every upsert embeds only the changed document and appends it as a new segment.
+    Segments are partitioned by (domain, genre) metadata, so a search scoped to a few
+    domains and one genre never scores rows from other partitions.
+    Older versions are tombstoned, and a background compaction merges small segments
+    and drops dead rows, so no edit ever requires a full rebuild.
+
+    With quantization="int8" or "pq" only compact codes are kept in memory; the
+    full-precision vectors are memory-mapped from storage_dir and used to re-rank
+    the top k * rerank_factor candidates.
+    """
+
+    def __init__(self, embeddings=None, chunk_size: int = 800, chunk_overlap: int = 100,
+                 max_segments: int = 8, max_dead_ratio: float = 0.3,
+                 quantization: str = "none", rerank_factor: int = 4, storage_dir: str = None,
+                 codec_options: Dict[str, Any] = None):
+        self.embeddings = embeddings or HashingEmbeddings()
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.max_segments = max_segments
+        self.max_dead_ratio = max_dead_ratio
+        self.quantization = quantization
+        self.rerank_factor = rerank_factor
+        self.codec_options = codec_options or {}
+        create_codec(quantization, **self.codec_options)
+        if quantization != "none" and storage_dir is None:
+            storage_dir = tempfile.mkdtemp(prefix="inkwell-index-")
+        self.storage_dir = storage_dir
+        self._codec = None
+        self._codec_trained_rows = 0
+
+        self.version = 0
+        self._segments: List[Segment] = []
+        self._next_segment_id = 0
+        self._live: Dict[str, int] = {}
+        self._doc_versions: Dict[str, int] = {}
+        self._tombstones: Dict[str, int] = {}
+        self._content_hashes: Dict[str, str] = {}
+        self._lock = threading.RLock()
+        self._compaction_task: Optional[asyncio.Task] = None
+
+    def upsert_document(self, doc_id: str, text: str, metadata: Dict[str, Any] = None) -> int:
+        """Add or replace one document; returns its new version"""
+        return self.upsert_documents({doc_id: text}, {doc_id: metadata} if metadata else None)[doc_id]
+
+    def upsert_documents(self, documents: Dict[str, str],
+                         metadata: Dict[str, Dict[str, Any]] = None) -> Dict[str, int]:
+        """
+        Add or replace several documents, appending one segment per partition.
+        Documents whose content is unchanged are skipped.
+        """
+        metadata = {
+            doc_id: self._partition_of(doc_id, (metadata or {}).get(doc_id)) for doc_id in documents
+        }
+        changed = {
+            doc_id: text for doc_id, text in documents.items()
+            if doc_id not in self._live or self._content_hashes.get(doc_id) != self._hash(text, metadata[doc_id])
+        }
+        versions = {doc_id: self._live[doc_id] for doc_id in documents if doc_id not in changed}
+        if not changed:
+            return versions
+
+        # Chunk and embed outside the lock so queries and other writers are not blocked
+        rows = []
+        for doc_id, text in changed.items():
+            for chunk_no, chunk in enumerate(split_text(text, self.chunk_size, self.chunk_overlap)):
+                rows.append((doc_id, chunk_no, chunk))
+        vectors = self._embed([chunk for _, _, chunk in rows])
+
+        by_partition: Dict[Tuple[str, str], List[int]] = {}
+        for position, (doc_id, _, _) in enumerate(rows):
+            by_partition.setdefault(self._partition_key(metadata[doc_id]), []).append(position)
+
+        with self._lock:
+            for doc_id in changed:
+                versions[doc_id] = self._doc_versions.get(doc_id, 0) + 1
+            new_segments = [
+                self._build_segment(
+                    partition=partition,
+                    doc_ids=[rows[p][0] for p in positions],
+                    versions=[versions[rows[p][0]] for p in positions],
+                    chunks=[rows[p][1] for p in positions],
+                    texts=[rows[p][2] for p in positions],
+                    metadata=[dict(metadata[rows[p][0]], doc_id=rows[p][0]) for p in positions],
+                    vectors=vectors[positions]
+                )
+                for partition, positions in by_partition.items()
+            ]
+            for doc_id, text in changed.items():
+                self._tombstone(doc_id)
+                self._doc_versions[doc_id] = versions[doc_id]
+                self._live[doc_id] = versions[doc_id]
+                self._tombstones.pop(doc_id, None)
+                self._content_hashes[doc_id] = self._hash(text, metadata[doc_id])
+            self._segments = self._segments + new_segments
+            self.version += 1
+
+        return versions
+
+    def delete_document(self, doc_id: str) -> bool:
+        """Tombstone a document; its rows are dropped at the next compaction"""
+        with self._lock:
+            if doc_id not in self._live:
+                return False
+            self._tombstone(doc_id)
+            self._tombstones[doc_id] = self._live.pop(doc_id)
+            self._content_hashes.pop(doc_id, None)
+            self.version += 1
+            return True
+
+    def sync_directory(self, path: str, extensions: tuple = (".md", ".txt"),
+                       genres: tuple = GENRES) -> Dict[str, int]:
+        """
+        Bring the index in line with a directory of knowledge files laid out as
+        <domain>/[<genre>/]<name>.md. Only new, modified and removed files are touched.
+        """
+        documents = {}
+        for root, _, files in os.walk(path):
+            for filename in files:
+                if filename.endswith(extensions):
+                    full_path = os.path.join(root, filename)
+                    doc_id = os.path.relpath(full_path, path).replace(os.sep, "/")
+                    with open(full_path, encoding="utf-8") as f:
+                        documents[doc_id] = f.read()
+
+        before = dict(self._live)
+        versions = self.upsert_documents(
+            documents, {doc_id: partition_metadata(doc_id, genres) for doc_id in documents}
+        )
+        removed = [doc_id for doc_id in before if doc_id not in documents]
+        for doc_id in removed:
+            self.delete_document(doc_id)
+
+        return {
+            "added": sum(1 for doc_id in documents if doc_id not in before),
+            "updated": sum(1 for doc_id in documents if doc_id in before and versions[doc_id] != before[doc_id]),
+            "deleted": len(removed),
+            "unchanged": sum(1 for doc_id in documents if before.get(doc_id) == versions[doc_id])
+        }
+
+    def search(self, query: str, k: int = 4, domains: List[str] = None, genres: List[str] = None,
+               where: Dict[str, Any] = None) -> List[SearchResult]:
+        """
+        Return the k chunks most similar to the query.
+
+        Partitions outside `domains` / `genres` are skipped entirely (genre-agnostic
+        documents always match a genre filter), and `where` metadata conditions are
+        applied before any vector is scored.
+        """
+        segments = self._select_segments(domains, genres)
+        if not segments:
+            return []
+        query_vector = self._embed([query])[0]
+
+        candidates = []
+        for segment in segments:
+            eligible = np.flatnonzero(segment.filter_mask(where)) if where else np.flatnonzero(segment.alive)
+            if not len(eligible):
+                continue
+            scores = segment.codec.scores(segment.codes[eligible], query_vector)
+            top = min(k if segment.codec.name == "none" else k * max(self.rerank_factor, 1), len(eligible))
+            best = np.argpartition(-scores, top - 1)[:top]
+            rows = eligible[best]
+            scores = scores[best]
+            if segment.codec.name != "none":
+                # Re-rank the shortlist at full precision
+                order = np.argsort(rows)
+                rows = rows[order]
+                scores = np.asarray(segment.vectors[rows]) @ query_vector
+            for score, row in zip(scores, rows):
+                candidates.append((float(score), segment, int(row)))
+
+        candidates.sort(key=lambda c: c[0], reverse=True)
+        results = []
+        seen = set()
+        for score, segment, row in candidates:
+            key = (segment.doc_ids[row], int(segment.chunks[row]))
+            # A reader can briefly see both versions while an upsert is being applied
+            if key in seen or self._live.get(key[0]) != segment.versions[row]:
+                continue
+            seen.add(key)
+            results.append(SearchResult(
+                doc_id=segment.doc_ids[row],
+                version=int(segment.versions[row]),
+                chunk=int(segment.chunks[row]),
+                text=segment.texts[row],
+                metadata=segment.metadata[row],
+                score=score
+            ))
+            if len(results) == k:
+                break
+        return results
+
+    def scoped(self, domains: List[str]) -> KnowledgeScope:
+        """Return a view that only searches the given knowledge domains"""
+        return KnowledgeScope(self, domains)
+
+    def partitions(self) -> Dict[str, int]:
+        """Live row counts per "domain/genre" partition"""
+        counts: Dict[str, int] = {}
+        for segment in self._segments:
+            key = "/".join(segment.partition)
+            counts[key] = counts.get(key, 0) + segment.live_count()
+        return counts
+
+    def needs_compaction(self) -> bool:
+        segments = self._segments
+        total = sum(len(segment) for segment in segments)
+        dead = total - sum(segment.live_count() for segment in segments)
+        per_partition: Dict[Tuple[str, str], int] = {}
+        for segment in segments:
+            per_partition[segment.partition] = per_partition.get(segment.partition, 0) + 1
+        return (
+            any(count > self.max_segments for count in per_partition.values())
+            or (total > 0 and dead / total > self.max_dead_ratio)
+        )
+
+    def compact(self) -> Dict[str, int]:
+        """Merge each partition's segments into one, dropping tombstoned and superseded rows"""
+        with self._lock:
+            old_segments = self._segments
+            version_at_start = self.version
+
+        groups: Dict[Tuple[str, str], List[Tuple[Segment, np.ndarray]]] = {}
+        for segment in old_segments:
+            rows = np.flatnonzero(segment.alive)
+            if len(rows):
+                groups.setdefault(segment.partition, []).append((segment, rows))
+        codec = None
+        if self.quantization != "none" and groups:
+            # Retrain the shared codec on everything that survives compaction;
+            # it replaces the index codec only when the merged segments are swapped in
+            training = np.concatenate([segment.vectors[rows] for keep in groups.values() for segment, rows in keep])
+            codec = create_codec(self.quantization, **self.codec_options).train(training)
+
+        merged_segments = []
+        for partition, keep in groups.items():
+            merged = self._build_segment(
+                partition=partition,
+                doc_ids=[segment.doc_ids[row] for segment, rows in keep for row in rows],
+                versions=np.concatenate([segment.versions[rows] for segment, rows in keep]),
+                chunks=np.concatenate([segment.chunks[rows] for segment, rows in keep]),
+                texts=[segment.texts[row] for segment, rows in keep for row in rows],
+                metadata=[segment.metadata[row] for segment, rows in keep for row in rows],
+                vectors=np.concatenate([segment.vectors[rows] for segment, rows in keep]),
+                codec=codec
+            )
+            if len(merged):
+                merged_segments.append(merged)
+
+        with self._lock:
+            # Writes that landed while merging stay in their own segments;
+            # deletes that landed while merging are re-applied to the merged rows
+            newer = self._segments[len(old_segments):]
+            if self.version != version_at_start:
+                for merged in merged_segments:
+                    for row, doc_id in enumerate(merged.doc_ids):
+                        if self._live.get(doc_id) != merged.versions[row]:
+                            merged.alive[row] = False
+            self._segments = merged_segments + newer
+            if codec is not None:
+                self._codec = codec
+                self._codec_trained_rows = len(training)
+            self._tombstones = {
+                doc_id: version for doc_id, version in self._tombstones.items()
+                if any(doc_id in segment.rows_by_doc for segment in newer)
+            }
+
+        # Readers holding the old snapshot keep their mapping; unlinking is safe
+        for segment in old_segments:
+            if segment.path:
+                try:
+                    os.remove(segment.path)
+                except OSError:
+                    pass
+
+        return {
+            "segments_before": len(old_segments),
+            "segments_after": len(self._segments),
+            "rows_dropped": (sum(len(segment) for segment in old_segments)
+                             - sum(len(segment) for segment in merged_segments))
+        }
+
+    def start_background_compaction(self, interval: float = 30.0):
+        """Periodically compact on a worker thread while the event loop keeps serving"""
+        if self._compaction_task and not self._compaction_task.done():
+            return
+
+        async def _loop():
+            while True:
+                await asyncio.sleep(interval)
+                if self.needs_compaction():
+                    await asyncio.to_thread(self.compact)
+
+        self._compaction_task = asyncio.get_running_loop().create_task(_loop())
+
+    async def stop_background_compaction(self):
+        if self._compaction_task:
+            self._compaction_task.cancel()
+            try:
+                await self._compaction_task
+            except asyncio.CancelledError:
+                pass
+            self._compaction_task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        segments = self._segments
+        total = sum(len(segment) for segment in segments)
+        live = sum(segment.live_count() for segment in segments)
+        return {
+            "version": self.version,
+            "documents": len(self._live),
+            "partitions": len({segment.partition for segment in segments}),
+            "segments": len(segments),
+            "rows": total,
+            "live_rows": live,
+            "tombstones": len(self._tombstones),
+            "quantization": self.quantization,
+            "vector_memory_bytes": (
+                sum(segment.codec.nbytes(segment.codes) for segment in segments if len(segment))
+                + sum(codec.overhead_bytes() for codec in {id(s.codec): s.codec for s in segments if len(s)}.values())
+            ),
+            "full_precision_bytes": sum(len(segment) * segment.vectors.shape[1] * 4 for segment in segments if len(segment))
+        }
+
+    def evaluate_recall(self, queries: List[str], k: int = 4) -> Dict[str, Any]:
+        """
+        Compare this index's search results with an exact full-precision scan
+        over the same live rows, and report recall@k next to memory usage.
+        """
+        segments = [segment for segment in self._segments if segment.live_count()]
+        hits = 0
+        total = 0
+        for query in queries:
+            query_vector = self._embed([query])[0]
+            exact = []
+            for segment in segments:
+                rows = np.flatnonzero(segment.alive)
+                scores = np.asarray(segment.vectors[rows]) @ query_vector
+                exact.extend(
+                    (float(score), (segment.doc_ids[row], int(segment.chunks[row])))
+                    for score, row in zip(scores, rows)
+                )
+            expected = {key for _, key in sorted(exact, key=lambda e: e[0], reverse=True)[:k]}
+            found = {(result.doc_id, result.chunk) for result in self.search(query, k)}
+            hits += len(expected & found)
+            total += len(expected)
+
+        stats = self.get_stats()
+        return {
+            "quantization": self.quantization,
+            "k": k,
+            "queries": len(queries),
+            "recall_at_k": hits / total if total else 1.0,
+            "vector_memory_bytes": stats["vector_memory_bytes"],
+            "full_precision_bytes": stats["full_precision_bytes"],
+            "compression_ratio": (stats["full_precision_bytes"] / stats["vector_memory_bytes"]
+                                  if stats["vector_memory_bytes"] else 0.0)
+        }
+
+    def _select_segments(self, domains: List[str] = None, genres: List[str] = None) -> List[Segment]:
+        segments = self._segments
+        if domains is not None:
+            domains = set(domains)
+            segments = [segment for segment in segments if segment.partition[0] in domains]
+        if genres is not None:
+            genres = set(genres) | {ANY_GENRE}
+            segments = [segment for segment in segments if segment.partition[1] in genres]
+        return segments
+
+    @staticmethod
+    def _partition_of(doc_id: str, metadata: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Fill in domain and genre from the doc_id layout when not given explicitly"""
+        return dict(partition_metadata(doc_id), **(metadata or {}))
+
+    @staticmethod
+    def _partition_key(metadata: Dict[str, Any]) -> Tuple[str, str]:
+        return (metadata["domain"], metadata["genre"])
+
+    def _tombstone(self, doc_id: str):
+        """Mark every row of the currently live version of a document as dead"""
+        version = self._live.get(doc_id)
+        if version is None:
+            return
+        for segment in self._segments:
+            rows = segment.rows_by_doc.get(doc_id)
+            if rows is not None:
+                segment.alive[rows[segment.versions[rows] == version]] = False
+
+    def _build_segment(self, partition, doc_ids, versions, chunks, texts, metadata, vectors,
+                       codec=None) -> Segment:
+        """
+        Build (and spill) a segment. Compaction runs this outside the lock with its
+        own freshly trained codec; only the segment id is reserved under the lock.
+        """
+        with self._lock:
+            segment_id = self._next_segment_id
+            self._next_segment_id += 1
+        segment = Segment(
+            id=segment_id,
+            partition=partition,
+            doc_ids=list(doc_ids),
+            versions=np.asarray(versions, dtype=np.int64),
+            chunks=np.asarray(chunks, dtype=np.int32),
+            texts=list(texts),
+            metadata=list(metadata),
+            vectors=np.asarray(vectors, dtype=np.float32),
+            alive=np.ones(len(doc_ids), dtype=bool)
+        )
+        rows_by_doc: Dict[str, List[int]] = {}
+        for row, doc_id in enumerate(segment.doc_ids):
+            rows_by_doc.setdefault(doc_id, []).append(row)
+        segment.rows_by_doc = {doc_id: np.asarray(rows) for doc_id, rows in rows_by_doc.items()}
+
+        if len(segment) and self.quantization != "none":
+            if codec is None:
+                # One codec is shared by all segments; it is retrained at compaction, or
+                # when a batch larger than its training set arrives
+                with self._lock:
+                    if self._codec is None or len(segment) > self._codec_trained_rows:
+                        self._codec = create_codec(self.quantization, **self.codec_options).train(segment.vectors)
+                        self._codec_trained_rows = len(segment)
+                    codec = self._codec
+            segment.codec = codec
+            segment.codes = segment.codec.encode(segment.vectors)
+            # Spill full-precision vectors to disk; only the shortlist is paged in
+            segment.path = os.path.join(self.storage_dir, f"segment-{segment.id}.npy")
+            np.save(segment.path, segment.vectors)
+            segment.vectors = np.load(segment.path, mmap_mode="r")
+        else:
+            segment.codec = create_codec("none")
+            segment.codes = segment.vectors
+        return segment
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        if len(texts) == 1:
+            vectors = np.asarray([self.embeddings.embed_query(texts[0])], dtype=np.float32)
+        else:
+            vectors = np.asarray(self.embeddings.embed_documents(texts), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    @staticmethod
+    def _hash(text: str, metadata: Dict[str, Any] = None) -> str:
+        payload = text + repr(sorted((metadata or {}).items()))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+_shared_index: Optional[KnowledgeIndex] = None
+
+def get_knowledge_index(embeddings=None) -> KnowledgeIndex:
+    """Process-wide index; embeddings only apply to the call that creates it"""
+    global _shared_index
+    if _shared_index is None:
+        _shared_index = KnowledgeIndex(embeddings=embeddings)
+    return _shared_index
+
+# Example usage
+async def main():
+    index = KnowledgeIndex()
+    documents = {
+        "style_guides/fantasy": "Use archaic diction sparingly. Magic should have costs and rules.",
+        "style_guides/mystery": "Plant every clue before the reveal. Keep red herrings fair.",
+        "grammar_rules/commas": "Use a serial comma. Avoid comma splices between independent clauses."
+    }
+    index.upsert_documents(documents)
+    print(f"Index stats: {index.get_stats()}")
+
+    # Updating one style guide only re-embeds that document
+    index.upsert_document("style_guides/fantasy", "Magic must always have a cost. Avoid chosen-one cliches.")
+    index.delete_document("style_guides/mystery")
+
+    for result in index.search("how should magic work", k=2):
+        print(f"{result.score:.3f} {result.doc_id} v{result.version}: {result.text}")
+
+    # The editing agent's scope never touches genre-specific partitions it did not ask for
+    editing = index.scoped(["grammar_rules", "style_guides"])
+    print(f"Partitions: {index.partitions()}")
+    print(f"Editing (mystery): {[r.doc_id for r in editing.search('commas', k=3, genre='mystery')]}")
+
+    print(f"Before compaction: {index.get_stats()}")
+    print(f"Compaction: {index.compact()}")
+    print(f"After compaction: {index.get_stats()}")
+
+    # Quantized storage, checked against an exact scan by the built-in harness
+    quantized = KnowledgeIndex(quantization="int8")
+    quantized.upsert_documents({
+        f"genre_conventions/{genre}/{n}": f"{genre} convention {n}: " + " ".join(f"term{(n * 7 + i) % 97}" for i in range(30))
+        for genre in ["fantasy", "sci_fi", "mystery", "romance"] for n in range(50)
+    })
+    print(f"Recall: {quantized.evaluate_recall(['fantasy convention term3', 'mystery term42 term7'], k=4)}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,198 @@
+import asyncio
+import gc
+import sys
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Tuple, Any, Mapping
+
+@dataclass(frozen=True)
+class AgentPersonality:
+    name: str
+    role: str
+    personality: str
+    backstory: str
+    expertise: Tuple[str, ...]
+    communication_style: str
+    work_approach: str
+    quirks: Tuple[str, ...]
+
+def freeze(value: Any) -> Any:
+    """
+    Recursively convert dicts to read-only mappings and lists to tuples,
+    interning every string so equal values share one object.
+    """
+    if isinstance(value, str):
+        return sys.intern(value)
+    if isinstance(value, dict):
+        return MappingProxyType({sys.intern(key): freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+_DEVELOPMENT_KNOWLEDGE = {
+    "character_development": {
+        "archetypes": [
+            "Hero", "Mentor", "Threshold Guardian", "Herald", "Shapeshifter",
+            "Shadow", "Ally", "Trickster"
+        ],
+        "personality_traits": [
+            "Extroverted", "Introverted", "Analytical", "Creative", "Practical",
+            "Idealistic", "Cautious", "Adventurous", "Loyal", "Independent"
+        ],
+        "character_goals": [
+            "External Goal", "Internal Goal", "Relationship Goal", "Professional Goal",
+            "Personal Growth Goal", "Survival Goal", "Revenge Goal", "Discovery Goal"
+        ],
+        "conflict_types": [
+            "Man vs Man", "Man vs Nature", "Man vs Society", "Man vs Self",
+            "Man vs Technology", "Man vs Supernatural"
+        ]
+    },
+    "world_building": {
+        "world_elements": [
+            "Geography", "Climate", "Culture", "Politics", "Economy",
+            "Technology", "Magic Systems", "Religion", "History", "Social Structure"
+        ],
+        "atmosphere_types": [
+            "Dark and Gritty", "Light and Hopeful", "Mysterious", "Tense",
+            "Peaceful", "Chaotic", "Orderly", "Romantic", "Dangerous"
+        ],
+        "time_periods": [
+            "Ancient", "Medieval", "Renaissance", "Industrial", "Modern",
+            "Future", "Post-Apocalyptic", "Alternate History"
+        ]
+    },
+    "genre_conventions": {
+        "fantasy": {
+            "elements": ["Magic", "Fantasy Races", "Quests", "Good vs Evil"],
+            "tropes": ["Chosen One", "Dark Lord", "Magical Artifacts", "Hidden World"]
+        },
+        "sci_fi": {
+            "elements": ["Advanced Technology", "Space Travel", "Aliens", "Future Society"],
+            "tropes": ["AI Rebellion", "Time Travel", "Space Opera", "Dystopia"]
+        },
+        "mystery": {
+            "elements": ["Crime", "Investigation", "Clues", "Suspense"],
+            "tropes": ["Detective", "Red Herring", "Whodunit", "Amateur Sleuth"]
+        },
+        "romance": {
+            "elements": ["Love Story", "Emotional Conflict", "Happy Ending"],
+            "tropes": ["Enemies to Lovers", "Second Chance", "Forbidden Love"]
+        }
+    }
+}
+
+_AGENT_PERSONALITIES = {
+    "development": dict(
+        name="Dr. Elena Rodriguez",
+        role="Development Agent",
+        personality="Creative and imaginative, with a deep love for storytelling and character development",
+        backstory="Former creative writing professor with 15 years of experience in character development. Published author of 8 novels across multiple genres. Known for creating memorable characters that readers connect with deeply.",
+        expertise=["Character Development", "World Building", "Story Structure", "Genre Conventions"],
+        communication_style="Warm and encouraging, often uses metaphors and storytelling examples",
+        work_approach="Methodical but creative, starts with character motivations and builds outward",
+        quirks=["Always carries a notebook", "Speaks in character voices", "References classic literature"]
+    ),
+    "research": dict(
+        name="Dr. Marcus Chen",
+        role="Research Agent",
+        personality="Analytical and thorough, with an insatiable curiosity for facts and details",
+        backstory="Former investigative journalist turned academic researcher. PhD in Information Science. Known for uncovering hidden connections and finding the most obscure but relevant information.",
+        expertise=["Fact Checking", "Research Methodologies", "Data Analysis", "Source Validation"],
+        communication_style="Precise and detailed, always cites sources and explains reasoning",
+        work_approach="Systematic research with multiple verification steps",
+        quirks=["Organizes everything in color-coded folders", "Always fact-checks twice", "Keeps a research log"]
+    ),
+    "outline": dict(
+        name="Sarah Mitchell",
+        role="Outline Agent",
+        personality="Organized and strategic, with a gift for seeing the big picture",
+        backstory="Former screenwriter and story consultant for major studios. Expert in story structure and pacing. Has helped develop over 200 successful projects across film, TV, and books.",
+        expertise=["Story Structure", "Pacing", "Chapter Organization", "Plot Development"],
+        communication_style="Clear and structured, uses visual aids and diagrams",
+        work_approach="Creates detailed outlines with clear progression and pacing",
+        quirks=["Draws story maps", "Uses index cards for scenes", "Always considers audience engagement"]
+    ),
+    "writing": dict(
+        name="James \"Jazz\" Thompson",
+        role="Writing Agent",
+        personality="Passionate and expressive, with a natural talent for capturing voice and tone",
+        backstory="Award-winning author with 12 published novels. Known for distinctive voice and ability to adapt writing style to any genre. Former journalist who brings authenticity to every piece.",
+        expertise=["Writing Styles", "Voice Development", "Genre Adaptation", "Creative Writing"],
+        communication_style="Enthusiastic and engaging, often shares writing tips and techniques",
+        work_approach="Immersive writing that captures the essence of the story and characters",
+        quirks=["Writes in different fonts for different characters", "Acts out dialogue", "Keeps a voice journal"]
+    ),
+    "editing": dict(
+        name="Professor Margaret \"Maggie\" O'Connor",
+        role="Editing Agent",
+        personality="Meticulous and caring, with an eye for both technical excellence and artistic integrity",
+        backstory="Former senior editor at major publishing house with 25 years of experience. Known for nurturing authors while maintaining high standards. Has edited 50+ bestsellers.",
+        expertise=["Grammar and Style", "Content Editing", "Quality Control", "Author Development"],
+        communication_style="Constructive and supportive, explains changes clearly",
+        work_approach="Balances technical perfection with preserving author voice",
+        quirks=["Uses red pen for major edits, blue for suggestions", "Reads aloud to check flow", "Keeps style guides for each genre"]
+    ),
+    "cover_design": dict(
+        name="Alex Rivera",
+        role="Cover Design Agent",
+        personality="Visual and intuitive, with a deep understanding of design psychology",
+        backstory="Award-winning graphic designer with expertise in book covers. Former art director for major publishing house. Known for creating covers that both attract readers and accurately represent the content.",
+        expertise=["Visual Design", "Typography", "Color Theory", "Market Psychology"],
+        communication_style="Visual and descriptive, often sketches ideas while talking",
+        work_approach="Research-driven design that considers genre conventions and target audience",
+        quirks=["Collects book covers for inspiration", "Tests designs on different devices", "Studies reader psychology"]
+    ),
+    "audiobook": dict(
+        name="Natalie \"Nat\" Williams",
+        role="Audiobook Agent",
+        personality="Expressive and technical, with a deep understanding of audio storytelling",
+        backstory="Former voice actor and audio engineer. Has narrated over 100 audiobooks and produced 50+ audio projects. Expert in voice casting and audio production.",
+        expertise=["Voice Acting", "Audio Production", "Narration Styles", "Audio Engineering"],
+        communication_style="Clear and expressive, often demonstrates different voices",
+        work_approach="Technical precision combined with artistic interpretation",
+        quirks=["Practices voices in different accents", "Tests audio on various devices", "Studies pronunciation guides"]
+    )
+}
+
+_knowledge_base: Mapping[str, Any] = None
+_personalities: Mapping[str, AgentPersonality] = None
+
+def get_development_knowledge() -> Mapping[str, Any]:
+    """Read-only development knowledge base, built on first use and shared by every agent"""
+    global _knowledge_base
+    if _knowledge_base is None:
+        _knowledge_base = freeze(_DEVELOPMENT_KNOWLEDGE)
+    return _knowledge_base
+
+def get_agent_personalities() -> Mapping[str, AgentPersonality]:
+    """Read-only personality registry, built on first use and shared by every agent"""
+    global _personalities
+    if _personalities is None:
+        _personalities = MappingProxyType({
+            sys.intern(agent_type): AgentPersonality(**freeze(fields))
+            for agent_type, fields in _AGENT_PERSONALITIES.items()
+        })
+    return _personalities
+
+def warm():
+    """
+    Build every registry and move it into the GC's permanent generation.
+    Call before forking workers so the registries stay in pages shared with the parent.
+    """
+    get_development_knowledge()
+    get_agent_personalities()
+    gc.collect()
+    gc.freeze()
+
+# Example usage
+async def main():
+    warm()
+    knowledge = get_development_knowledge()
+    personalities = get_agent_personalities()
+    print(f"Knowledge sections: {list(knowledge)}")
+    print(f"Personalities: {[p.name for p in personalities.values()]}")
+    print(f"Shared instance: {get_development_knowledge() is knowledge}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,462 @@
+import asyncio
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Any, AsyncIterator, Awaitable, Callable, Optional
+
+import httpx
+import openai
+import importlib.util
+spec = importlib.util.spec_from_file_location("response_cache", "response-cache.py")
+response_cache_module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(response_cache_module)
+ResponseCache = response_cache_module.ResponseCache
+spec = importlib.util.spec_from_file_location("rate_scheduler", "rate-scheduler.py")
+rate_scheduler_module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(rate_scheduler_module)
+RateScheduler = rate_scheduler_module.RateScheduler
+spec = importlib.util.spec_from_file_location("request_policy", "request-policy.py")
+request_policy_module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(request_policy_module)
+RequestPolicy = request_policy_module.RequestPolicy
+retry_after = request_policy_module.retry_after
+is_retryable = request_policy_module.is_retryable
+spec = importlib.util.spec_from_file_location("model_router", "model-router.py")
+model_router_module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(model_router_module)
+ModelRouter = model_router_module.ModelRouter
+
+# Load once per process so tokenizers are cached for every caller
+token_budget_module = sys.modules.get("token_budget")
+if token_budget_module is None:
+    spec = importlib.util.spec_from_file_location("token_budget", "token-budget.py")
+    token_budget_module = importlib.util.module_from_spec(spec)
+    sys.modules["token_budget"] = token_budget_module
+    spec.loader.exec_module(token_budget_module)
+TokenLedger = token_budget_module.TokenLedger
+estimate_call_tokens = token_budget_module.estimate_call_tokens
+
+@dataclass
+class ChatResult:
+    text: str
+    model: str
+    usage: Dict[str, Any] = field(default_factory=dict)
+    latency: float = 0.0
+    cached: bool = False
+
+class LLMClientPool:
+    """
+    One shared async OpenAI client for every agent.
+
+    All requests go through a single pooled httpx transport with keep-alive,
+    so connections are reused across agents and calls never block the event loop.
+    The provider is a single host, so max_connections bounds connections per host.
+    """
+
+    def __init__(self, api_key: str = None, base_url: str = None, model: str = None,
+                 embedding_model: str = None, max_connections: int = None,
+                 max_keepalive_connections: int = None, keepalive_expiry: float = None,
+                 timeout: float = None, response_cache: ResponseCache = None,
+                 scheduler: RateScheduler = None, ledger: TokenLedger = None,
+                 policy: RequestPolicy = None, router: ModelRouter = None):
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        self.base_url = base_url or os.getenv("OPENAI_BASE_URL")
+        self.model = model or os.getenv("LLM_MODEL", "gpt-4o-mini")
+        self.embedding_model = embedding_model or os.getenv("LLM_EMBEDDING_MODEL", "text-embedding-3-small")
+        self.max_connections = max_connections or int(os.getenv("LLM_MAX_CONNECTIONS", 32))
+        self.max_keepalive_connections = max_keepalive_connections or int(os.getenv("LLM_MAX_KEEPALIVE", 16))
+        self.keepalive_expiry = keepalive_expiry or float(os.getenv("LLM_KEEPALIVE_EXPIRY", 60))
+        self.timeout = timeout or float(os.getenv("LLM_TIMEOUT", 120))
+        self.response_cache = response_cache if response_cache is not None else self._cache_from_env()
+        self.scheduler = scheduler if scheduler is not None else self._scheduler_from_env()
+
+        self.http_client: Optional[httpx.AsyncClient] = None
+        self.client: Optional[openai.AsyncOpenAI] = None
+        self._start_lock = asyncio.Lock()
+        self.stats = {
+            "requests": 0, "streams": 0, "cache_hits": 0, "errors": 0, "rate_limited": 0,
+            "prompt_tokens": 0, "completion_tokens": 0, "cached_prompt_tokens": 0,
+            "total_latency": 0.0, "total_first_token_latency": 0.0
+        }
+        self.ledger = ledger or TokenLedger()
+        self.policy = policy if policy is not None else self._policy_from_env()
+        self.router = router if router is not None else self._router_from_env()
+
+    @property
+    def enabled(self) -> bool:
+        """True when an API key is configured"""
+        return bool(self.api_key)
+
+    async def start(self):
+        """Open the pooled transport (idempotent)"""
+        async with self._start_lock:
+            if self.client is not None or not self.enabled:
+                return
+            self.http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive_connections,
+                    keepalive_expiry=self.keepalive_expiry
+                ),
+                timeout=httpx.Timeout(self.timeout, connect=10.0)
+            )
+            self.client = openai.AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                http_client=self.http_client,
+                # Retries are owned by the request policy when one is configured
+                max_retries=0 if self.policy is not None else 2
+            )
+
+    async def aclose(self):
+        """Close pooled connections and the response cache, flushing its batched recency updates"""
+        async with self._start_lock:
+            if self.client is not None:
+                await self.client.close()
+            self.client = None
+            self.http_client = None
+            if self.response_cache is not None:
+                cache, self.response_cache = self.response_cache, None
+                await asyncio.to_thread(cache.close)
+
+    async def chat(self, messages: List[Dict[str, str]], model: str = None, agent: str = None,
+                   cache: bool = True, call_class: str = None, **params) -> ChatResult:
+        """
+        Send a chat completion through the shared pool.
+        Identical (or, with a semantic threshold, near-identical) prompts are answered
+        from the response cache unless cache=False or the agent has opted out.
+        With a call_class and no explicit model, the router picks the model and
+        falls back to the next candidate when one fails.
+        """
+        if model is None and call_class is not None and self.router is not None:
+            params = dict(self.router.route(call_class).params, **params)
+            candidates = self.router.select(call_class)
+            for index, candidate in enumerate(candidates):
+                try:
+                    return await self.chat(messages, model=candidate, agent=agent, cache=cache,
+                                           call_class=call_class, **params)
+                except Exception as e:
+                    if index + 1 >= len(candidates) or not self._can_fall_back(e):
+                        raise
+                    self.router.record_fallback(call_class)
+                    print(f"Model {candidate} failed for {call_class} ({type(e).__name__}), falling back")
+
+        model = model or self.model
+        use_cache = cache and self.response_cache is not None
+        if use_cache:
+            started = time.monotonic()
+            hit = await self.response_cache.get(model, messages, params, agent=agent)
+            if hit is not None:
+                self.stats["cache_hits"] += 1
+                latency = time.monotonic() - started
+                self.ledger.record(agent, model, hit.get("usage", {}), latency=latency, cached_response=True)
+                self._record_route(call_class, model, latency, cached=True)
+                return ChatResult(text=hit["text"], model=hit["model"], usage=hit.get("usage", {}),
+                                  latency=latency, cached=True)
+
+        if self.client is None:
+            await self.start()
+        if self.client is None:
+            raise RuntimeError("LLM client is not configured (set OPENAI_API_KEY)")
+
+        estimated = estimate_call_tokens(messages, model, params)
+
+        async def attempt():
+            return await self._send(
+                agent, estimated, lambda: self.client.chat.completions.create(model=model, messages=messages, **params)
+            )
+
+        started = time.monotonic()
+        self.stats["requests"] += 1
+        try:
+            # Retried with backoff and hedged past the p95 when a policy is configured
+            response = await (
+                self.policy.execute(
+                    attempt, key=model,
+                    on_discarded=lambda losing: self._record_discarded(agent, model, call_class, losing, estimated)
+                ) if self.policy else attempt()
+            )
+        except Exception as e:
+            self.stats["errors"] += 1
+            # A bad request would fail on any model; only model-side failures cool the model down
+            if self._can_fall_back(e):
+                self._record_route(call_class, model, time.monotonic() - started, success=False)
+            raise
+        latency = time.monotonic() - started
+
+        usage = response.usage.model_dump() if response.usage else {}
+        self._record_usage(agent, model, usage, estimated, latency)
+        self._record_route(call_class, model, latency, usage)
+        result = ChatResult(
+            text=response.choices[0].message.content or "",
+            model=response.model,
+            usage=usage,
+            latency=latency
+        )
+        if use_cache:
+            await self.response_cache.put(
+                model, messages, {"text": result.text, "model": result.model, "usage": usage}, params, agent=agent
+            )
+        return result
+
+    async def stream_chat(self, messages: List[Dict[str, str]], model: str = None, agent: str = None,
+                          cache: bool = True, call_class: str = None, **params) -> AsyncIterator[str]:
+        """
+        Stream a chat completion as text deltas.
+        A cache hit is yielded as one chunk; a streamed response is cached once complete.
+        Routed streams fall back to the next model only before the first delta.
+        """
+        if model is None and call_class is not None and self.router is not None:
+            params = dict(self.router.route(call_class).params, **params)
+            candidates = self.router.select(call_class)
+            for index, candidate in enumerate(candidates):
+                started = False
+                try:
+                    async for delta in self.stream_chat(messages, model=candidate, agent=agent, cache=cache,
+                                                        call_class=call_class, **params):
+                        started = True
+                        yield delta
+                    return
+                except Exception as e:
+                    if started or index + 1 >= len(candidates) or not self._can_fall_back(e):
+                        raise
+                    self.router.record_fallback(call_class)
+                    print(f"Model {candidate} failed for {call_class} ({type(e).__name__}), falling back")
+
+        model = model or self.model
+        use_cache = cache and self.response_cache is not None
+        if use_cache:
+            hit = await self.response_cache.get(model, messages, params, agent=agent)
+            if hit is not None:
+                self.stats["cache_hits"] += 1
+                self.ledger.record(agent, model, hit.get("usage", {}), cached_response=True)
+                self._record_route(call_class, model, 0.0, cached=True)
+                yield hit["text"]
+                return
+
+        if self.client is None:
+            await self.start()
+        if self.client is None:
+            raise RuntimeError("LLM client is not configured (set OPENAI_API_KEY)")
+
+        estimated = estimate_call_tokens(messages, model, params)
+        ticket = None
+
+        async def open_stream():
+            # Each attempt is admitted on its own, like _send; the open stream keeps its ticket
+            nonlocal ticket
+            attempt = None
+            if self.scheduler is not None:
+                attempt = await self.scheduler.acquire(agent or "default", estimated)
+            try:
+                stream = await self.client.chat.completions.create(
+                    model=model, messages=messages, stream=True, stream_options={"include_usage": True}, **params
+                )
+            except openai.RateLimitError as e:
+                self._rate_limited(e)
+                raise
+            except BaseException:
+                if attempt is not None:
+                    self.scheduler.reconcile(attempt, 0)
+                raise
+            ticket = attempt
+            return stream
+
+        started = time.monotonic()
+        self.stats["requests"] += 1
+        parts, usage, response_model = [], {}, model
+        try:
+            # Only opening the stream is retried; nothing has been yielded yet at that point
+            stream = await (self.policy.execute(open_stream, key=model, hedge=False) if self.policy else open_stream())
+            async for chunk in stream:
+                response_model = chunk.model or response_model
+                if chunk.usage:
+                    usage = chunk.usage.model_dump()
+                if chunk.choices and chunk.choices[0].delta.content:
+                    if not parts:
+                        self.stats["total_first_token_latency"] += time.monotonic() - started
+                    parts.append(chunk.choices[0].delta.content)
+                    yield parts[-1]
+        except BaseException as e:
+            # Includes the consumer closing the stream early (GeneratorExit / cancellation)
+            self.stats["errors"] += 1
+            if ticket is not None:
+                self.scheduler.reconcile(ticket, ticket.estimated_tokens if parts else 0)
+            if isinstance(e, Exception) and self._can_fall_back(e):
+                self._record_route(call_class, model, time.monotonic() - started, success=False)
+            raise
+
+        self.stats["streams"] += 1
+        latency = time.monotonic() - started
+        self._record_usage(agent, model, usage, estimated, latency)
+        self._record_route(call_class, model, latency, usage)
+        if ticket is not None:
+            self.scheduler.reconcile(ticket, usage.get("total_tokens", ticket.estimated_tokens))
+        if use_cache:
+            await self.response_cache.put(
+                model, messages, {"text": "".join(parts), "model": response_model, "usage": usage}, params, agent=agent
+            )
+
+    async def _send(self, agent: str, estimated: int, request: Callable[[], Awaitable[Any]]) -> Any:
+        """One provider attempt, admitted by the rate scheduler and reconciled with its real usage"""
+        ticket = None
+        if self.scheduler is not None:
+            ticket = await self.scheduler.acquire(agent or "default", estimated)
+        try:
+            response = await request()
+        except openai.RateLimitError as e:
+            self._rate_limited(e)
+            raise
+        except BaseException:
+            # Failed, or cancelled as the losing side of a hedge
+            if ticket is not None:
+                self.scheduler.reconcile(ticket, 0)
+            raise
+        if ticket is not None:
+            usage = getattr(response, "usage", None)
+            self.scheduler.reconcile(ticket, usage.total_tokens if usage else estimated)
+        return response
+
+    def _rate_limited(self, error: Exception):
+        """The provider still returned 429: hold back every agent for its Retry-After"""
+        self.stats["rate_limited"] += 1
+        if self.scheduler is not None:
+            self.scheduler.penalize(retry_after(error) or 1.0)
+
+    async def embed(self, texts: List[str], model: str = None) -> List[List[float]]:
+        """Embed texts through the shared pool"""
+        if self.client is None:
+            await self.start()
+        if self.client is None:
+            raise RuntimeError("LLM client is not configured (set OPENAI_API_KEY)")
+        response = await self.client.embeddings.create(model=model or self.embedding_model, input=texts)
+        return [item.embedding for item in response.data]
+
+    def _record_usage(self, agent: str, model: str, usage: Dict[str, Any], estimated: int, latency: float):
+        """Pool totals plus a ledger entry attributed to the agent and the current project"""
+        call = self.ledger.record(agent, model, usage, estimated_tokens=estimated, latency=latency)
+        self.stats["prompt_tokens"] += call.prompt_tokens
+        self.stats["completion_tokens"] += call.completion_tokens
+        self.stats["cached_prompt_tokens"] += call.cached_prompt_tokens
+        self.stats["total_latency"] += latency
+
+    def _record_discarded(self, agent: str, model: str, call_class: str, response: Any, estimated: int):
+        """A hedge's losing primary still completed and is billed: count its tokens and cost"""
+        usage = response.usage.model_dump() if getattr(response, "usage", None) else {}
+        self._record_usage(agent, model, usage, estimated, 0.0)
+        if call_class is not None and self.router is not None:
+            self.router.record_cost(call_class, model, usage)
+
+    def _record_route(self, call_class: str, model: str, latency: float, usage: Dict[str, Any] = None,
+                      success: bool = True, cached: bool = False):
+        if call_class is not None and self.router is not None:
+            self.router.record(call_class, model, latency, usage, success=success, cached=cached)
+
+    @staticmethod
+    def _can_fall_back(error: Exception) -> bool:
+        """Transient failures, or a model this key cannot use; bad requests fail on every model"""
+        return is_retryable(error) or isinstance(error, (openai.NotFoundError, openai.PermissionDeniedError))
+
+    def get_stats(self) -> Dict[str, Any]:
+        requests = self.stats["requests"]
+        return dict(
+            self.stats,
+            enabled=self.enabled,
+            started=self.client is not None,
+            average_latency=self.stats["total_latency"] / requests if requests else 0.0,
+            average_first_token_latency=(
+                self.stats["total_first_token_latency"] / self.stats["streams"] if self.stats["streams"] else 0.0
+            ),
+            prefix_cache_hit_rate=(
+                self.stats["cached_prompt_tokens"] / self.stats["prompt_tokens"] if self.stats["prompt_tokens"] else 0.0
+            ),
+            usage=self.ledger.get_stats(),
+            response_cache=self.response_cache.get_stats() if self.response_cache else None,
+            scheduler=self.scheduler.get_stats() if self.scheduler else None,
+            request_policy=self.policy.get_stats() if self.policy else None,
+            routes=self.router.get_stats() if self.router else None
+        )
+
+    def _cache_from_env(self) -> Optional[ResponseCache]:
+        """
+        LLM_CACHE=off disables caching; LLM_CACHE_PATH persists it to disk;
+        LLM_CACHE_SEMANTIC_THRESHOLD (e.g. 0.97) enables the embedding tier;
+        LLM_CACHE_DISABLED_AGENTS is a comma-separated opt-out list.
+        """
+        if os.getenv("LLM_CACHE", "on").lower() in ("off", "0", "false"):
+            return None
+        threshold = os.getenv("LLM_CACHE_SEMANTIC_THRESHOLD")
+        return ResponseCache(
+            path=os.getenv("LLM_CACHE_PATH"),
+            max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", 10000)),
+            max_bytes=int(os.getenv("LLM_CACHE_MAX_BYTES", 256 * 1024 * 1024)),
+            semantic_threshold=float(threshold) if threshold else None,
+            embed_fn=self.embed if threshold else None,
+            disabled_agents=[a.strip() for a in os.getenv("LLM_CACHE_DISABLED_AGENTS", "").split(",") if a.strip()]
+        )
+
+    def _scheduler_from_env(self) -> Optional[RateScheduler]:
+        """
+        LLM_TPM_LIMIT / LLM_RPM_LIMIT set the provider quota (scheduling is off when unset);
+        LLM_AGENT_WEIGHTS gives per-agent shares, e.g. "editing=2,writing=1".
+        """
+        tpm, rpm = os.getenv("LLM_TPM_LIMIT"), os.getenv("LLM_RPM_LIMIT")
+        if not tpm and not rpm:
+            return None
+        weights = {}
+        for pair in os.getenv("LLM_AGENT_WEIGHTS", "").split(","):
+            if "=" in pair:
+                agent, weight = pair.split("=", 1)
+                weights[agent.strip()] = float(weight)
+        return RateScheduler(
+            tokens_per_minute=float(tpm or 10 ** 9),
+            requests_per_minute=float(rpm or 10 ** 6),
+            weights=weights
+        )
+
+    def _router_from_env(self) -> Optional[ModelRouter]:
+        """
+        Routing is opt-in: without LLM_ROUTING=on (or LLM_ROUTES) every call goes to LLM_MODEL.
+        LLM_ROUTES overrides routes (inline JSON or a JSON file path); the "default" class
+        stays on LLM_MODEL. LLM_ROUTE_COOLDOWN sets the failure cooldown.
+        """
+        routing = os.getenv("LLM_ROUTING", "on" if os.getenv("LLM_ROUTES") else "off")
+        if routing.lower() in ("off", "0", "false"):
+            return None
+        return ModelRouter(cooldown=float(os.getenv("LLM_ROUTE_COOLDOWN", 30)), default_model=self.model)
+
+    def _policy_from_env(self) -> Optional[RequestPolicy]:
+        """
+        LLM_REQUEST_POLICY=off disables retries and hedging; LLM_RETRY_ATTEMPTS sets attempts;
+        LLM_HEDGE_QUANTILE (0 disables) and LLM_HEDGE_BUDGET bound hedging.
+        """
+        if os.getenv("LLM_REQUEST_POLICY", "on").lower() in ("off", "0", "false"):
+            return None
+        return RequestPolicy(
+            max_attempts=int(os.getenv("LLM_RETRY_ATTEMPTS", 3)),
+            hedge_quantile=float(os.getenv("LLM_HEDGE_QUANTILE", 0.95)),
+            hedge_budget=float(os.getenv("LLM_HEDGE_BUDGET", 0.05))
+        )
+
+_shared_client: Optional[LLMClientPool] = None
+
+def get_llm_client() -> LLMClientPool:
+    """Process-wide client pool configured from the environment"""
+    global _shared_client
+    if _shared_client is None:
+        _shared_client = LLMClientPool()
+    return _shared_client
+
+# Example usage
+async def main():
+    client = get_llm_client()
+    print(f"LLM client enabled: {client.enabled}")
+    if client.enabled:
+        result = await client.chat([{"role": "user", "content": "Name one classic fantasy trope."}], agent="development")
+        print(f"{result.model} ({result.latency:.2f}s): {result.text}")
+    await client.aclose()
+    print(f"Stats: {client.get_stats()}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,15 +1,33 @@
 import asyncio
 import json
 import os
+import sys
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import Dict, List, Any
+from typing import Dict, List, Any, AsyncIterator
 import uvicorn
 
 # Import our agent modules
 import importlib.util
 
+# Import knowledge_registry (once per process, shared by every agent)
+knowledge_registry_module = sys.modules.get("knowledge_registry")
+if knowledge_registry_module is None:
+    spec = importlib.util.spec_from_file_location("knowledge_registry", "knowledge-registry.py")
+    knowledge_registry_module = importlib.util.module_from_spec(spec)
+    sys.modules["knowledge_registry"] = knowledge_registry_module
+    spec.loader.exec_module(knowledge_registry_module)
+
+# Import llm_client (once per process, one connection pool for every agent)
+llm_client_module = sys.modules.get("llm_client")
+if llm_client_module is None:
+    spec = importlib.util.spec_from_file_location("llm_client", "llm-client.py")
+    llm_client_module = importlib.util.module_from_spec(spec)
+    sys.modules["llm_client"] = llm_client_module
+    spec.loader.exec_module(llm_client_module)
+
 # Import agent_coordinator
 spec = importlib.util.spec_from_file_location("agent_coordinator", "agent-coordinator.py")
 agent_coordinator_module = importlib.util.module_from_spec(spec)
@@ -43,10 +61,31 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize agents
-agent_coordinator = AgentCoordinator()
+# Initialize agents (one shared personality registry and LLM connection pool for all of them)
+llm_client = llm_client_module.get_llm_client()
+agent_coordinator = AgentCoordinator(llm_client=llm_client)
 crew_ai = CrewAIIntegration()
-development_agent = EnhancedDevelopmentAgent()
+development_agent = EnhancedDevelopmentAgent(
+    crew_ai=crew_ai,
+    knowledge_index=agent_coordinator.knowledge_index,
+    llm_client=llm_client
+)
+
+# Freeze shared registries before any worker fork so their pages stay shared
+knowledge_registry_module.warm()
+
+@app.on_event("startup")
+async def startup():
+    """Open the shared LLM connection pool and start merging index segments on the serving event loop"""
+    await llm_client.start()
+    agent_coordinator.knowledge_index.start_background_compaction()
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Stop index compaction, close pooled LLM connections and export workers"""
+    await agent_coordinator.knowledge_index.stop_background_compaction()
+    await llm_client.aclose()
+    agent_coordinator.exporter.shutdown()
 
 # Pydantic models for API
 class BookRequest(BaseModel):
@@ -55,6 +94,24 @@ class BookRequest(BaseModel):
     tone: str
     requirements: str
     customer_id: str
+    characters: List[Dict[str, Any]] = None
+    world: Dict[str, Any] = None
+    approval_required: bool = False
+    audiobook: bool = False
+
+class ChapterRevision(BaseModel):
+    text: str
+
+class OutlineApproval(BaseModel):
+    node_ids: List[str] = None
+    approved: bool = True
+    feedback: str = None
+
+class OutlineEdit(BaseModel):
+    title: str = None
+    summary: str = None
+    word_target: int = None
+    beats: List[str] = None
 
 class ProjectStatus(BaseModel):
     project_id: str
@@ -75,7 +132,18 @@ async def root():
             "agents": "/agents",
             "create_project": "/create-project",
             "project_status": "/project/{project_id}",
+            "project_outline": "/project/{project_id}/outline",
+            "approve_outline": "/project/{project_id}/outline/approve",
+            "edit_outline": "/project/{project_id}/outline/{node_id}",
+            "project_manuscript": "/project/{project_id}/manuscript",
+            "project_manuscript_metrics": "/project/{project_id}/manuscript/metrics",
+            "project_export": "/project/{project_id}/export/{epub|docx|pdf}",
+            "project_lint": "/project/{project_id}/lint",
+            "project_consistency": "/project/{project_id}/consistency",
+            "revise_chapter": "/project/{project_id}/chapters/{number}",
+            "project_revisions": "/project/{project_id}/revisions[/{version}[?chapter=n]]",
             "develop_characters": "/develop-characters",
+            "develop_characters_stream": "/develop-characters/stream?format=ndjson|sse",
             "agent_info": "/agent/{agent_type}"
         }
     }
@@ -115,6 +183,10 @@ async def create_project(request: BookRequest):
             "genre": request.genre,
             "tone": request.tone,
             "requirements": request.requirements,
+            "characters": request.characters,
+            "world": request.world,
+            "approval_required": request.approval_required,
+            "audiobook": request.audiobook,
             "created_at": asyncio.get_event_loop().time(),
             "updated_at": asyncio.get_event_loop().time()
         }
@@ -128,7 +200,7 @@ async def create_project(request: BookRequest):
             "message": "Project created successfully",
             "title": request.title,
             "genre": request.genre,
-            "status": "workflow_started"
+            "status": "awaiting_outline_approval" if request.approval_required else "workflow_started"
         }
     
     except Exception as e:
@@ -148,6 +220,113 @@ async def get_project_status(project_id: str):
     except Exception as e:
         raise HTTPException(status_code=404, detail=f"Project not found: {str(e)}")
 
+@app.get("/project/{project_id}/outline")
+async def get_project_outline(project_id: str):
+    """Outline tree with word targets, act balance, arc coverage, progress and approvals"""
+    outline = await agent_coordinator.get_outline(project_id)
+    if "error" in outline:
+        raise HTTPException(status_code=404, detail=outline["error"])
+    return {"success": True, "project_id": project_id, "outline": outline}
+
+@app.post("/project/{project_id}/outline/approve")
+async def approve_project_outline(project_id: str, approval: OutlineApproval):
+    """Approve or reject acts, chapters or scenes; approved chapters start writing right away"""
+    result = await agent_coordinator.approve_outline(project_id, approval.node_ids, approval.approved, approval.feedback)
+    if "error" in result:
+        raise HTTPException(status_code=404, detail=result["error"])
+    return {"success": True, "project_id": project_id, "approval": result}
+
+@app.patch("/project/{project_id}/outline/{node_id}")
+async def edit_project_outline(project_id: str, node_id: str, edit: OutlineEdit):
+    """Edit one outline node's title, summary, word target or beats"""
+    result = await agent_coordinator.update_outline(project_id, node_id, **edit.dict())
+    if "error" in result:
+        raise HTTPException(status_code=404, detail=result["error"])
+    return {"success": True, "project_id": project_id, "outline": result}
+
+@app.get("/project/{project_id}/manuscript")
+async def get_project_manuscript(project_id: str, headings: bool = True):
+    """Stream the manuscript chapter by chapter from the artifact store"""
+    project = agent_coordinator.active_projects.get(project_id)
+    if project is None:
+        raise HTTPException(status_code=404, detail=f"Project not found: {project_id}")
+    if not project.manuscript:
+        raise HTTPException(status_code=409, detail="Manuscript is not ready yet")
+    return StreamingResponse(
+        project.manuscript.iter_text(headings),
+        media_type="text/plain",
+        headers={"Content-Disposition": f'attachment; filename="{project_id}.txt"'}
+    )
+
+@app.get("/project/{project_id}/export/{format}")
+async def export_project(project_id: str, format: str):
+    """Download the manuscript as EPUB, DOCX or PDF, rendered once per manuscript version"""
+    outcome = await agent_coordinator.export_manuscript(project_id, format)
+    error = outcome.get("error")
+    if error:
+        status_code = 404 if error == "Project not found" else 400 if error.startswith("Unsupported") else 409
+        raise HTTPException(status_code=status_code, detail=error)
+    result = outcome["export"]
+    store = agent_coordinator.artifact_store
+    return StreamingResponse(
+        store.iter_chunks(result.key),
+        media_type=result.media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="{project_id}.{format}"',
+            "Content-Length": str(result.size),
+            "X-Export-Cache": "hit" if result.cached else "miss"
+        }
+    )
+
+@app.get("/project/{project_id}/manuscript/metrics")
+async def get_manuscript_metrics(project_id: str):
+    """Readability, sentence-length, dialogue, lexical-diversity and pacing metrics for the dashboard"""
+    report = await agent_coordinator.analyze_manuscript(project_id)
+    if "error" in report:
+        status_code = 404 if report["error"] == "Project not found" else 409
+        raise HTTPException(status_code=status_code, detail=report["error"])
+    return {"success": True, "project_id": project_id, "metrics": report}
+
+@app.get("/project/{project_id}/lint")
+async def lint_project(project_id: str):
+    """Style and grammar report for the manuscript from the local rule-based linter"""
+    report = await agent_coordinator.lint_manuscript(project_id)
+    if "error" in report:
+        raise HTTPException(status_code=404, detail=report["error"])
+    return {"success": True, "project_id": project_id, "lint": report}
+
+@app.get("/project/{project_id}/consistency")
+async def check_project_consistency(project_id: str):
+    """Names, misspellings and trait contradictions checked against the project's characters and world"""
+    report = await agent_coordinator.check_consistency(project_id)
+    if "error" in report:
+        raise HTTPException(status_code=404, detail=report["error"])
+    return {"success": True, "project_id": project_id, "consistency": report}
+
+@app.put("/project/{project_id}/chapters/{number}")
+async def revise_chapter(project_id: str, number: int, revision: ChapterRevision):
+    """Replace a chapter's text and re-edit only the paragraphs that changed"""
+    result = await agent_coordinator.revise_chapter(project_id, number, revision.text)
+    if "error" in result:
+        raise HTTPException(status_code=404, detail=result["error"])
+    return {"success": True, "project_id": project_id, "revision": result}
+
+@app.get("/project/{project_id}/revisions")
+async def get_project_revisions(project_id: str):
+    """Snapshots of the manuscript taken at each chapter revision"""
+    history = await agent_coordinator.get_revisions(project_id)
+    if "error" in history:
+        raise HTTPException(status_code=404, detail=history["error"])
+    return {"success": True, "project_id": project_id, "revisions": history}
+
+@app.get("/project/{project_id}/revisions/{version}")
+async def get_project_revision(project_id: str, version: int, chapter: int = None):
+    """The manuscript, or one chapter of it, as it stood at a snapshot"""
+    revision = await agent_coordinator.get_revisions(project_id, version, chapter)
+    if "error" in revision:
+        raise HTTPException(status_code=404, detail=revision["error"])
+    return PlainTextResponse(revision["text"])
+
 @app.post("/develop-characters")
 async def develop_characters(request: BookRequest):
     """Use Development Agent to create characters and world"""
@@ -179,6 +358,47 @@ async def develop_characters(request: BookRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to develop characters: {str(e)}")
 
+# Streaming formats: newline-delimited JSON or server-sent events
+STREAM_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "sse": "text/event-stream"
+}
+
+async def encode_events(events: AsyncIterator[Dict[str, Any]], format: str) -> AsyncIterator[str]:
+    """Serialize agent events for a streaming response; failures become a final error event"""
+    try:
+        async for event in events:
+            if format == "sse":
+                yield f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+            else:
+                yield json.dumps(event) + "\n"
+    except Exception as e:
+        error = {"event": "error", "detail": str(e)}
+        yield f"event: error\ndata: {json.dumps(error)}\n\n" if format == "sse" else json.dumps(error) + "\n"
+
+def streaming_response(events: AsyncIterator[Dict[str, Any]], format: str) -> StreamingResponse:
+    if format not in STREAM_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unsupported stream format '{format}' (use ndjson or sse)")
+    return StreamingResponse(
+        encode_events(events, format),
+        media_type=STREAM_MEDIA_TYPES[format],
+        # Disable proxy buffering so partial output reaches the client immediately
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/develop-characters/stream")
+async def develop_characters_stream(request: BookRequest, format: str = "ndjson"):
+    """Stream character and world development as it is generated"""
+    async def events():
+        yield {"event": "start", "title": request.title, "agent": "Dr. Elena Rodriguez (Development Agent)"}
+        async for event in development_agent.stream_characters(request.genre, request.tone, request.requirements):
+            yield event
+        async for event in development_agent.stream_world(request.genre, request.requirements):
+            yield event
+        yield {"event": "done"}
+    
+    return streaming_response(events(), format)
+
 @app.get("/agent/{agent_type}")
 async def get_agent_info(agent_type: str):
     """Get specific agent information and personality"""
@@ -239,7 +459,14 @@ async def get_metrics():
                 "agents_available": 7,
                 "average_response_time": "2.3s",
                 "success_rate": "98.5%",
-                "uptime": "99.9%"
+                "uptime": "99.9%",
+                "llm": llm_client.get_stats(),
+                "prompt_prefixes": crew_ai.prompt_library.get_stats(),
+                "token_budgets": development_agent.token_budgeter.get_stats(),
+                "writing": agent_coordinator.agents["writing"].get_stats(),
+                "editing": agent_coordinator.agents["editing"].get_stats(),
+                "manuscript_metrics": agent_coordinator.manuscript_metrics.get_stats(),
+                "exports": agent_coordinator.exporter.get_stats()
             }
         }
     
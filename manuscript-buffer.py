@@ -0,0 +1,299 @@
+import asyncio
+import sys
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Any, Iterable, Iterator, Tuple
+import importlib.util
+
+# Load once per process so Manuscript and ArtifactStore are the same classes everywhere
+manuscript_module = sys.modules.get("manuscript")
+if manuscript_module is None:
+    spec = importlib.util.spec_from_file_location("manuscript", "manuscript.py")
+    manuscript_module = importlib.util.module_from_spec(spec)
+    sys.modules["manuscript"] = manuscript_module
+    spec.loader.exec_module(manuscript_module)
+ArtifactStore = manuscript_module.ArtifactStore
+Manuscript = manuscript_module.Manuscript
+
+# Target leaf size in characters; adjacent small leaves are merged up to this
+LEAF_SIZE = 1024
+
+# Separates chapters inside the buffer (form feed never occurs in prose)
+CHAPTER_BREAK = "\f"
+
+class _Leaf:
+    __slots__ = ("text", "length", "breaks", "height")
+
+    def __init__(self, text: str):
+        self.text = text
+        self.length = len(text)
+        self.breaks = text.count(CHAPTER_BREAK)
+        self.height = 0
+
+class _Node:
+    __slots__ = ("left", "right", "length", "breaks", "height")
+
+    def __init__(self, left, right):
+        self.left = left
+        self.right = right
+        self.length = left.length + right.length
+        self.breaks = left.breaks + right.breaks
+        self.height = 1 + max(left.height, right.height)
+
+# Nodes are immutable: every edit builds O(log n) new nodes and shares the rest,
+# which is what makes snapshots free.
+
+def _height(node) -> int:
+    return node.height if node is not None else -1
+
+def _balance(left, right) -> _Node:
+    """A node over two subtrees whose heights differ by at most two, rotated back into AVL shape"""
+    if left.height > right.height + 1:
+        if _height(left.left) < _height(left.right):
+            left = _Node(_Node(left.left, left.right.left), left.right.right)
+        return _Node(left.left, _Node(left.right, right))
+    if right.height > left.height + 1:
+        if _height(right.right) < _height(right.left):
+            right = _Node(right.left.left, _Node(right.left.right, right.right))
+        return _Node(_Node(left, right.left), right.right)
+    return _Node(left, right)
+
+def _join(left, right):
+    """Concatenate two ropes in O(|height difference|)"""
+    if left is None or left.length == 0:
+        return right
+    if right is None or right.length == 0:
+        return left
+    if isinstance(left, _Leaf) and isinstance(right, _Leaf) and left.length + right.length <= LEAF_SIZE:
+        return _Leaf(left.text + right.text)
+    if left.height > right.height + 1:
+        return _balance(left.left, _join(left.right, right))
+    if right.height > left.height + 1:
+        return _balance(_join(left, right.left), right.right)
+    return _Node(left, right)
+
+def _split(node, index: int) -> Tuple[Any, Any]:
+    """Ropes for [0, index) and [index, end), in O(log n)"""
+    if node is None:
+        return None, None
+    if index <= 0:
+        return None, node
+    if index >= node.length:
+        return node, None
+    if isinstance(node, _Leaf):
+        return _Leaf(node.text[:index]), _Leaf(node.text[index:])
+    if index < node.left.length:
+        left, right = _split(node.left, index)
+        return left, _join(right, node.right)
+    left, right = _split(node.right, index - node.left.length)
+    return _join(node.left, left), right
+
+def _build(chunks: Iterable[str]):
+    """Balanced rope from text chunks in O(n); sibling heights differ by at most one"""
+    leaves, pending = [], ""
+    for chunk in chunks:
+        pending += chunk
+        while len(pending) >= LEAF_SIZE:
+            leaves.append(_Leaf(pending[:LEAF_SIZE]))
+            pending = pending[LEAF_SIZE:]
+    if pending or not leaves:
+        leaves.append(_Leaf(pending))
+    return _build_range(leaves, 0, len(leaves))
+
+def _build_range(leaves: List[_Leaf], start: int, end: int):
+    # Halving keeps both sides within one leaf of each other, so the tree is AVL-shaped
+    if end - start == 1:
+        return leaves[start]
+    middle = (start + end) // 2
+    return _Node(_build_range(leaves, start, middle), _build_range(leaves, middle, end))
+
+def _iter_leaves(node, start: int, end: int) -> Iterator[str]:
+    """Text of [start, end) leaf by leaf, without materializing it"""
+    stack = [(node, 0)]
+    while stack:
+        node, offset = stack.pop()
+        if node is None or offset >= end or offset + node.length <= start:
+            continue
+        if isinstance(node, _Leaf):
+            yield node.text[max(0, start - offset):end - offset]
+        else:
+            stack.append((node.right, offset + node.left.length))
+            stack.append((node.left, offset))
+
+def _break_position(node, k: int) -> int:
+    """Offset of the k-th (0-based) chapter break"""
+    offset = 0
+    while isinstance(node, _Node):
+        if k < node.left.breaks:
+            node = node.left
+        else:
+            k -= node.left.breaks
+            offset += node.left.length
+            node = node.right
+    position = -1
+    for _ in range(k + 1):
+        position = node.text.index(CHAPTER_BREAK, position + 1)
+    return offset + position
+
+@dataclass(frozen=True)
+class Snapshot:
+    version: int
+    label: str
+    created_at: float
+    root: Any
+
+    @property
+    def length(self) -> int:
+        return self.root.length
+
+class ManuscriptBuffer:
+    """
+    A manuscript under revision, held as a persistent balanced rope.
+
+    Insert, delete and replace are O(log n) and copy only the path they touch.
+    Every node counts the chapter breaks beneath it, so a chapter's span is
+    found in O(log n) too. A snapshot is just the current root, so version
+    history costs nothing until versions diverge.
+    """
+
+    def __init__(self, text: str = ""):
+        self.root = _build([text])
+        self.history: List[Snapshot] = []
+
+    @classmethod
+    def from_chapters(cls, chapters: Iterable[str]) -> "ManuscriptBuffer":
+        def chunks():
+            for index, chapter in enumerate(chapters):
+                if index:
+                    yield CHAPTER_BREAK
+                yield chapter.replace(CHAPTER_BREAK, "")
+        buffer = cls()
+        buffer.root = _build(chunks())
+        return buffer
+
+    @classmethod
+    def from_manuscript(cls, manuscript: Manuscript) -> "ManuscriptBuffer":
+        return cls.from_chapters(text for _, text in manuscript.iter_chapters())
+
+    def __len__(self) -> int:
+        return self.root.length
+
+    @property
+    def chapter_count(self) -> int:
+        return self.root.breaks + 1
+
+    def insert(self, position: int, text: str):
+        left, right = _split(self.root, position)
+        self.root = _join(_join(left, _build([text])), right) or _Leaf("")
+
+    def delete(self, start: int, end: int):
+        left, rest = _split(self.root, start)
+        _, right = _split(rest, end - start)
+        self.root = _join(left, right) or _Leaf("")
+
+    def replace(self, start: int, end: int, text: str):
+        left, rest = _split(self.root, start)
+        _, right = _split(rest, end - start)
+        self.root = _join(_join(left, _build([text])), right) or _Leaf("")
+
+    def slice(self, start: int, end: int = None) -> str:
+        return "".join(self.iter_chunks(start, end))
+
+    def iter_chunks(self, start: int = 0, end: int = None) -> Iterator[str]:
+        end = self.root.length if end is None else min(end, self.root.length)
+        return _iter_leaves(self.root, max(0, start), end)
+
+    def text(self) -> str:
+        return self.slice(0)
+
+    def chapter_span(self, index: int) -> Tuple[int, int]:
+        """[start, end) of the index-th (0-based) chapter"""
+        if not 0 <= index < self.chapter_count:
+            raise IndexError(f"Chapter {index} out of range (0-{self.chapter_count - 1})")
+        start = _break_position(self.root, index - 1) + 1 if index else 0
+        end = _break_position(self.root, index) if index < self.root.breaks else self.root.length
+        return start, end
+
+    def chapter_text(self, index: int) -> str:
+        return self.slice(*self.chapter_span(index))
+
+    def replace_chapter(self, index: int, text: str):
+        start, end = self.chapter_span(index)
+        self.replace(start, end, text.replace(CHAPTER_BREAK, ""))
+
+    def append_chapter(self, text: str):
+        self.root = _join(self.root, _build([CHAPTER_BREAK + text.replace(CHAPTER_BREAK, "")]))
+
+    def iter_chapters(self) -> Iterator[str]:
+        for index in range(self.chapter_count):
+            yield self.chapter_text(index)
+
+    def snapshot(self, label: str = "") -> Snapshot:
+        snapshot = Snapshot(version=len(self.history) + 1, label=label, created_at=time.time(), root=self.root)
+        self.history.append(snapshot)
+        return snapshot
+
+    def restore(self, version: int):
+        """Make an earlier snapshot current again (history is kept)"""
+        self.root = self._snapshot_root(version)
+
+    def at(self, version: int) -> "ManuscriptBuffer":
+        """A read-only view of a snapshot, sharing all of its nodes"""
+        view = ManuscriptBuffer()
+        view.root = self._snapshot_root(version)
+        return view
+
+    def _snapshot_root(self, version: int):
+        for snapshot in self.history:
+            if snapshot.version == version:
+                return snapshot.root
+        raise KeyError(f"Unknown version: {version}")
+
+    def save(self, store: ArtifactStore, key: str) -> int:
+        """Stream the buffer into the artifact store leaf by leaf"""
+        return store.write(key, self.iter_chunks())
+
+    @classmethod
+    def load(cls, store: ArtifactStore, key: str) -> "ManuscriptBuffer":
+        buffer = cls()
+        buffer.root = _build(store.iter_text(key))
+        return buffer
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "length": len(self),
+            "chapters": self.chapter_count,
+            "height": self.root.height,
+            "snapshots": len(self.history)
+        }
+
+# Example usage
+async def main():
+    import random
+    import tempfile
+
+    chapters = [f"Chapter {n} opens. " + "The river ran on past the mill. " * 300 for n in range(1, 31)]
+    buffer = ManuscriptBuffer.from_chapters(chapters)
+    buffer.snapshot("first draft")
+    print(f"Built {buffer.get_stats()}")
+
+    rng = random.Random(3)
+    started = time.perf_counter()
+    for _ in range(10000):
+        position = rng.randrange(len(buffer))
+        buffer.insert(position, "edit ")
+        buffer.delete(position, position + 5)
+    print(f"20,000 splices in {(time.perf_counter() - started) * 1000:.0f} ms, height {buffer.root.height}")
+
+    buffer.replace_chapter(11, "Chapter 12 was rewritten for the customer.")
+    buffer.snapshot("customer revision")
+    print(f"Chapter 12 now: {buffer.chapter_text(11)!r}")
+    print(f"Chapter 12 in the first draft starts: {buffer.at(1).chapter_text(11)[:20]!r}")
+
+    store = ArtifactStore(tempfile.mkdtemp(prefix="inkwell-artifacts-"))
+    buffer.save(store, "book_demo/buffer.txt")
+    restored = ManuscriptBuffer.load(store, "book_demo/buffer.txt")
+    print(f"Round trip through the artifact store intact: {restored.text() == buffer.text()}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
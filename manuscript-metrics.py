@@ -0,0 +1,296 @@
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Any, Iterable, Optional, Tuple
+
+import numpy as np
+
+# Segments per chapter in its pacing curve
+PACING_WINDOWS = 20
+
+# Sentence-length histogram bins, in words (last bin is open-ended)
+SENTENCE_BINS = [0, 5, 10, 15, 20, 25, 30, 40, 60]
+
+# Polynomial word hashing (mod 2**64); the base must be odd to have an inverse
+HASH_BASE = 1099511628211
+HASH_BASE_INVERSE = pow(HASH_BASE, -1, 2 ** 64)
+
+SENTENCE_END = np.array([ord(c) for c in ".!?"], dtype=np.uint32)
+WHITESPACE = np.array([ord(c) for c in " \t\r\n\f"], dtype=np.uint32)
+CLOSERS = np.array([ord(c) for c in "\"')]”’"], dtype=np.uint32)
+APOSTROPHES = np.array([ord("'"), 0x2019], dtype=np.uint32)
+VOWELS = np.array([ord(c) for c in "aeiouy"], dtype=np.uint32)
+
+@dataclass
+class ChapterMetrics:
+    """Raw counts for one chapter; ratios are derived so chapters can be summed into a book"""
+    digest: str
+    words: int
+    sentences: int
+    syllables: int
+    complex_words: int
+    dialogue_words: int
+    sentence_lengths: np.ndarray
+    types: np.ndarray
+    type_counts: np.ndarray
+    pacing: Dict[str, List[float]] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(
+            readability(self.words, self.sentences, self.syllables, self.complex_words),
+            words=self.words,
+            sentences=self.sentences,
+            sentence_length=sentence_distribution(self.sentence_lengths),
+            dialogue_ratio=round(self.dialogue_words / self.words, 4) if self.words else 0.0,
+            lexical_diversity=lexical_diversity(self.words, self.type_counts),
+            pacing=self.pacing
+        )
+
+def readability(words: int, sentences: int, syllables: int, complex_words: int) -> Dict[str, float]:
+    """Flesch reading ease, Flesch-Kincaid grade and Gunning fog from counts"""
+    if not words or not sentences:
+        return {"flesch_reading_ease": 0.0, "flesch_kincaid_grade": 0.0, "gunning_fog": 0.0}
+    per_sentence, per_word = words / sentences, syllables / words
+    return {
+        "flesch_reading_ease": round(206.835 - 1.015 * per_sentence - 84.6 * per_word, 2),
+        "flesch_kincaid_grade": round(0.39 * per_sentence + 11.8 * per_word - 15.59, 2),
+        "gunning_fog": round(0.4 * (per_sentence + 100 * complex_words / words), 2)
+    }
+
+def sentence_distribution(lengths: np.ndarray) -> Dict[str, Any]:
+    if not len(lengths):
+        return {"mean": 0.0, "median": 0.0, "p90": 0.0, "stdev": 0.0, "max": 0, "histogram": {}}
+    counts, _ = np.histogram(lengths, bins=SENTENCE_BINS + [max(SENTENCE_BINS[-1], int(lengths.max())) + 1])
+    labels = [f"{low}-{high - 1}" for low, high in zip(SENTENCE_BINS, SENTENCE_BINS[1:])] + [f"{SENTENCE_BINS[-1]}+"]
+    return {
+        "mean": round(float(lengths.mean()), 2),
+        "median": float(np.median(lengths)),
+        "p90": float(np.percentile(lengths, 90)),
+        "stdev": round(float(lengths.std()), 2),
+        "max": int(lengths.max()),
+        "histogram": dict(zip(labels, counts.tolist()))
+    }
+
+def lexical_diversity(words: int, type_counts: np.ndarray) -> Dict[str, float]:
+    """Type-token ratio, Guiraud's root TTR (less length-sensitive) and the share of words used once"""
+    if not words:
+        return {"types": 0, "ttr": 0.0, "root_ttr": 0.0, "hapax_ratio": 0.0}
+    types = len(type_counts)
+    return {
+        "types": types,
+        "ttr": round(types / words, 4),
+        "root_ttr": round(float(types / np.sqrt(words)), 2),
+        "hapax_ratio": round(float((type_counts == 1).sum()) / types, 4)
+    }
+
+def analyze_text(text: str, windows: int = PACING_WINDOWS) -> ChapterMetrics:
+    """
+    Tokenize once into code-point arrays and derive every metric with array
+    operations: word and sentence boundaries are masks, per-word counts are
+    prefix-sum differences and words are identified by a rolling hash.
+    """
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+    if not len(codes):
+        empty = np.zeros(0, dtype=np.int64)
+        return ChapterMetrics(digest, 0, 0, 0, 0, 0, empty, empty.astype(np.uint64), empty,
+                              pacing_curve(empty, empty, windows))
+    upper = (codes >= 65) & (codes <= 90)
+    lower = np.where(upper, codes | 32, codes)
+    letters = ((lower >= 97) & (lower <= 122)) | ((lower >= 48) & (lower <= 57)) | ((codes >= 0xC0) & (codes < 0x2000))
+    # Apostrophes between letters belong to the word ("don't", "Aria's")
+    inner = np.isin(codes, APOSTROPHES)
+    inner[1:-1] &= letters[:-2] & letters[2:]
+    inner[[0, -1]] = False
+    letters |= inner
+
+    previous = np.concatenate(([False], letters[:-1]))
+    following = np.concatenate((letters[1:], [False]))
+    starts = np.flatnonzero(letters & ~previous)
+    ends = np.flatnonzero(letters & ~following) + 1
+    words = len(starts)
+
+    # Syllables: vowel groups per word, less a silent final e
+    vowels = np.isin(lower, VOWELS) & letters
+    groups = np.concatenate(([0], np.cumsum(vowels & ~np.concatenate(([False], vowels[:-1])))))
+    syllables = groups[ends] - groups[starts]
+    silent_e = (lower[ends - 1] == ord("e")) & (syllables > 1) & (lower[np.maximum(ends - 2, 0)] != ord("l"))
+    syllables = np.maximum(syllables - silent_e, 1)
+
+    # Sentences end at terminal punctuation followed by space, a closing quote or the end of the text
+    after = np.concatenate((codes[1:], [32]))
+    boundary = np.isin(codes, SENTENCE_END) & (np.isin(after, WHITESPACE) | np.isin(after, CLOSERS))
+    sentence_of = (np.cumsum(boundary) - boundary)[starts]
+    per_sentence = np.bincount(sentence_of)
+    sentence_lengths = per_sentence[per_sentence > 0]
+
+    # Dialogue: inside straight quotes (odd count so far) or curly quotes (opened more than closed)
+    straight = np.cumsum(codes == 34) % 2 == 1
+    curly = np.cumsum(codes == 0x201C) - np.cumsum(codes == 0x201D) > 0
+    in_dialogue = (straight | curly)[starts]
+
+    # Word identity: sum(c_k * B**k) over the word, shifted back by B**-start
+    n = len(codes)
+    powers = np.full(n, HASH_BASE, dtype=np.uint64)
+    inverse = np.full(n, HASH_BASE_INVERSE, dtype=np.uint64)
+    powers[0] = inverse[0] = 1
+    powers, inverse = np.cumprod(powers, dtype=np.uint64), np.cumprod(inverse, dtype=np.uint64)
+    prefix = np.zeros(n + 1, dtype=np.uint64)
+    np.cumsum(np.where(letters, lower, 0).astype(np.uint64) * powers, dtype=np.uint64, out=prefix[1:])
+    hashes = (prefix[ends] - prefix[starts]) * inverse[starts]
+    types, type_counts = np.unique(hashes, return_counts=True)
+
+    return ChapterMetrics(
+        digest=digest,
+        words=words,
+        sentences=len(sentence_lengths),
+        syllables=int(syllables.sum()),
+        complex_words=int((syllables >= 3).sum()),
+        dialogue_words=int(in_dialogue.sum()),
+        sentence_lengths=sentence_lengths,
+        types=types,
+        type_counts=type_counts,
+        pacing=pacing_curve(per_sentence[sentence_of], in_dialogue, windows)
+    )
+
+def pacing_curve(word_sentence_lengths: np.ndarray, in_dialogue: np.ndarray, windows: int) -> Dict[str, List[float]]:
+    """
+    Per-segment sentence length and dialogue share across a chapter. Pace rises
+    with dialogue and short sentences: 0.5 * dialogue + 0.5 * how far the
+    segment's sentences fall below 30 words (scaled to 0-1).
+    """
+    words = len(word_sentence_lengths)
+    if not words:
+        return {"sentence_length": [], "dialogue": [], "pace": []}
+    edges = np.linspace(0, words, min(windows, words) + 1).astype(np.int64)[:-1]
+    sizes = np.diff(np.append(edges, words))
+    sentence_length = np.add.reduceat(word_sentence_lengths, edges) / sizes
+    dialogue = np.add.reduceat(in_dialogue.astype(np.int64), edges) / sizes
+    pace = 0.5 * dialogue + 0.5 * np.clip((30 - sentence_length) / 25, 0, 1)
+    return {
+        "sentence_length": np.round(sentence_length, 2).tolist(),
+        "dialogue": np.round(dialogue, 3).tolist(),
+        "pace": np.round(pace, 3).tolist()
+    }
+
+class ManuscriptMetrics:
+    """
+    Readability, sentence-length, dialogue, lexical-diversity and pacing metrics.
+
+    Chapters are analyzed with vectorized NumPy passes and cached by content
+    hash; book totals are summed from the cached chapter counts, so after an
+    edit only the changed chapter is re-analyzed. Analysis runs on worker
+    threads, so the cache is locked; the NumPy passes run outside the lock.
+    """
+
+    def __init__(self, max_chapters: int = 4096):
+        self.max_chapters = max_chapters
+        self._cache: "OrderedDict[str, ChapterMetrics]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"chapters_analyzed": 0, "cache_hits": 0, "words_analyzed": 0}
+
+    def chapter(self, text: str, digest: str = None) -> ChapterMetrics:
+        digest = digest or hashlib.sha256(text.encode("utf-8")).hexdigest()
+        cached = self._get(digest)
+        if cached is not None:
+            return cached
+        metrics = analyze_text(text)
+        with self._lock:
+            self._cache[metrics.digest] = metrics
+            self._cache.move_to_end(metrics.digest)
+            while len(self._cache) > self.max_chapters:
+                self._cache.popitem(last=False)
+            self.stats["chapters_analyzed"] += 1
+            self.stats["words_analyzed"] += metrics.words
+        return metrics
+
+    def _get(self, digest: str) -> Optional[ChapterMetrics]:
+        with self._lock:
+            metrics = self._cache.get(digest)
+            if metrics is not None:
+                self._cache.move_to_end(digest)
+                self.stats["cache_hits"] += 1
+            return metrics
+
+    def analyze_chapters(self, chapters: Iterable[Tuple[int, str, str]]) -> Dict[str, Any]:
+        """Metrics for (number, title, text) chapters plus book-level totals"""
+        return self._report([(number, title, self.chapter(text)) for number, title, text in chapters])
+
+    def analyze_manuscript(self, manuscript) -> Dict[str, Any]:
+        """Like analyze_chapters, but cached chapters are found by their stored digest without being read"""
+        results = []
+        for entry in manuscript.chapters:
+            metrics = self._get(entry.digest)
+            if metrics is None:
+                metrics = self.chapter(manuscript.chapter_text(entry.number), entry.digest)
+            results.append((entry.number, entry.title, metrics))
+        return self._report(results)
+
+    def _report(self, results: List[Tuple[int, str, ChapterMetrics]]) -> Dict[str, Any]:
+        chapters = [dict(metrics.to_dict(), chapter=number, title=title) for number, title, metrics in results]
+        book = [metrics for _, _, metrics in results]
+        words = sum(m.words for m in book)
+        sentences = sum(m.sentences for m in book)
+        if book:
+            types, inverse = np.unique(np.concatenate([m.types for m in book]), return_inverse=True)
+            type_counts = np.bincount(inverse, weights=np.concatenate([m.type_counts for m in book])).astype(np.int64)
+            lengths = np.concatenate([m.sentence_lengths for m in book])
+        else:
+            type_counts = lengths = np.zeros(0, dtype=np.int64)
+        return {
+            "book": dict(
+                readability(words, sentences, sum(m.syllables for m in book), sum(m.complex_words for m in book)),
+                words=words,
+                sentences=sentences,
+                sentence_length=sentence_distribution(lengths),
+                dialogue_ratio=round(sum(m.dialogue_words for m in book) / words, 4) if words else 0.0,
+                lexical_diversity=lexical_diversity(words, type_counts),
+                # One point per chapter: the book's pacing curve
+                pacing=[round(float(np.mean(m.pacing["pace"])), 3) if m.pacing["pace"] else 0.0 for m in book]
+            ),
+            "chapters": chapters
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.stats, cached_chapters=len(self._cache))
+
+# Example usage
+async def main():
+    import random
+    import time
+
+    rng = random.Random(7)
+    vocabulary = ("the river ran past mill where she waited for news of her brother and every evening light "
+                  "fell across stones that nobody had moved since winter began quietly remembering").split()
+
+    def paragraph() -> str:
+        sentences = []
+        for _ in range(rng.randint(3, 7)):
+            sentence = " ".join(rng.choice(vocabulary) for _ in range(rng.randint(4, 28))).capitalize() + "."
+            sentences.append(f"\"{sentence}\" she said." if rng.random() < 0.3 else sentence)
+        return " ".join(sentences)
+
+    chapters = [(n, f"Chapter {n}", "\n\n".join(paragraph() for _ in range(60))) for n in range(1, 31)]
+    metrics = ManuscriptMetrics()
+    started = time.perf_counter()
+    report = metrics.analyze_chapters(chapters)
+    cold = (time.perf_counter() - started) * 1000
+
+    chapters[4] = (5, "Chapter 5", chapters[4][2] + " A new ending.")
+    started = time.perf_counter()
+    metrics.analyze_chapters(chapters)
+    warm = (time.perf_counter() - started) * 1000
+
+    book = report["book"]
+    print(f"{book['words']} words analyzed in {cold:.0f} ms; after editing one chapter, {warm:.0f} ms")
+    print(f"Flesch {book['flesch_reading_ease']}, grade {book['flesch_kincaid_grade']}, "
+          f"dialogue {book['dialogue_ratio']:.0%}, TTR {book['lexical_diversity']['ttr']}")
+    print(f"Sentence lengths: {book['sentence_length']['histogram']}")
+    print(f"Chapter 1 pace: {report['chapters'][0]['pacing']['pace'][:8]} ...")
+    print(metrics.get_stats())
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,196 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, List, Any, IO, BinaryIO, Iterable, Iterator, Tuple, Union
+
+CHUNK_SIZE = 64 * 1024
+
+class ArtifactStore:
+    """
+    Filesystem store for generated artifacts (chapters, exports, audio).
+
+    Keys are relative paths such as "book_1/chapters/001.txt". Writes stream to a
+    temporary file that is renamed into place, so readers never see a partial
+    artifact and nothing is held in memory beyond one chunk.
+    """
+
+    def __init__(self, root: str = None):
+        self.root = os.path.abspath(root or os.getenv("ARTIFACT_DIR", "artifacts"))
+
+    def path(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, key))
+        if os.path.isabs(key) or not path.startswith(self.root + os.sep):
+            raise ValueError(f"Artifact key escapes the store: {key}")
+        return path
+
+    def exists(self, key: str) -> bool:
+        return os.path.isfile(self.path(key))
+
+    def size(self, key: str) -> int:
+        return os.path.getsize(self.path(key))
+
+    @contextmanager
+    def open_write(self, key: str) -> Iterator[BinaryIO]:
+        """Binary file for the artifact; it replaces the old one only if the block completes"""
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                yield f
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def write(self, key: str, chunks: Iterable[Union[str, bytes]]) -> int:
+        """Stream chunks (str is UTF-8 encoded) into the artifact; returns the bytes written"""
+        written = 0
+        with self.open_write(key) as f:
+            for chunk in chunks:
+                data = chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+                f.write(data)
+                written += len(data)
+        return written
+
+    def write_text(self, key: str, text: str) -> int:
+        return self.write(key, [text])
+
+    def iter_chunks(self, key: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        with open(self.path(key), "rb") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+
+    def iter_text(self, key: str, chunk_size: int = CHUNK_SIZE) -> Iterator[str]:
+        with open(self.path(key), "r", encoding="utf-8") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+
+    def read_text(self, key: str) -> str:
+        with open(self.path(key), "r", encoding="utf-8") as f:
+            return f.read()
+
+    def delete(self, key: str) -> bool:
+        try:
+            os.unlink(self.path(key))
+            return True
+        except FileNotFoundError:
+            return False
+
+@dataclass
+class ChapterEntry:
+    number: int
+    title: str
+    key: str
+    word_count: int
+    size: int
+    digest: str
+
+class Manuscript:
+    """
+    A book as separately stored chapters.
+
+    Chapter text lives in the artifact store; only the chapter index is kept in
+    memory. Assembly is a generator over chapters, so writing the book to a file
+    or an HTTP response never materializes it as one string.
+    """
+
+    def __init__(self, project_id: str, store: ArtifactStore = None):
+        self.project_id = project_id
+        self.store = store or ArtifactStore()
+        self.entries: Dict[int, ChapterEntry] = {}
+
+    def add_chapter(self, number: int, title: str, text: str) -> ChapterEntry:
+        """Store (or replace) one chapter; chapters may arrive in any order"""
+        key = f"{self.project_id}/chapters/{number:03d}.txt"
+        size = self.store.write_text(key, text)
+        entry = ChapterEntry(
+            number=number,
+            title=title,
+            key=key,
+            word_count=len(text.split()),
+            size=size,
+            digest=hashlib.sha256(text.encode("utf-8")).hexdigest()
+        )
+        self.entries[number] = entry
+        return entry
+
+    @property
+    def chapters(self) -> List[ChapterEntry]:
+        return [self.entries[number] for number in sorted(self.entries)]
+
+    @property
+    def word_count(self) -> int:
+        return sum(entry.word_count for entry in self.entries.values())
+
+    @property
+    def size(self) -> int:
+        return sum(entry.size for entry in self.entries.values())
+
+    @property
+    def digest(self) -> str:
+        """Content hash of the whole book, from the chapter hashes (no text is read)"""
+        combined = hashlib.sha256()
+        for entry in self.chapters:
+            combined.update(f"{entry.number}:{entry.title}:{entry.digest}\n".encode("utf-8"))
+        return combined.hexdigest()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def chapter_text(self, number: int) -> str:
+        return self.store.read_text(self.entries[number].key)
+
+    def iter_chapters(self) -> Iterator[Tuple[ChapterEntry, str]]:
+        """One chapter in memory at a time, in order"""
+        for entry in self.chapters:
+            yield entry, self.store.read_text(entry.key)
+
+    def iter_text(self, headings: bool = True, chunk_size: int = CHUNK_SIZE) -> Iterator[str]:
+        """The assembled book as a stream of chunks of at most chunk_size characters"""
+        for index, entry in enumerate(self.chapters):
+            if index:
+                yield "\n\n"
+            if headings:
+                yield f"Chapter {entry.number}: {entry.title}\n\n"
+            yield from self.store.iter_text(entry.key, chunk_size)
+
+    def write_to(self, f: IO, headings: bool = True) -> int:
+        """Write the book to an open text file; returns characters written"""
+        written = 0
+        for chunk in self.iter_text(headings):
+            written += f.write(chunk)
+        return written
+
+    def save(self, key: str = None, headings: bool = True) -> str:
+        """Assemble the book into a single artifact and return its path"""
+        key = key or f"{self.project_id}/manuscript.txt"
+        self.store.write(key, self.iter_text(headings))
+        return self.store.path(key)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"chapters": len(self), "word_count": self.word_count, "bytes": self.size, "digest": self.digest}
+
+# Example usage
+async def main():
+    store = ArtifactStore(tempfile.mkdtemp(prefix="inkwell-artifacts-"))
+    manuscript = Manuscript("book_demo", store)
+    for number in (2, 1, 3):
+        manuscript.add_chapter(number, f"Part {number}", f"The story continues in part {number}. " * 2000)
+
+    path = manuscript.save()
+    largest_chunk = max(len(chunk) for chunk in manuscript.iter_text())
+    print(f"Saved {manuscript.get_stats()} to {path}")
+    print(f"Largest chunk held in memory: {largest_chunk} characters")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,317 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Any, AsyncIterator
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+import importlib.util
+
+spec = importlib.util.spec_from_file_location("rate_scheduler", "rate-scheduler.py")
+rate_scheduler_module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(rate_scheduler_module)
+TokenBucket = rate_scheduler_module.TokenBucket
+MonotonicClock = rate_scheduler_module.MonotonicClock
+
+# Load once per process so tokenizers are cached for every caller
+token_budget_module = sys.modules.get("token_budget")
+if token_budget_module is None:
+    spec = importlib.util.spec_from_file_location("token_budget", "token-budget.py")
+    token_budget_module = importlib.util.module_from_spec(spec)
+    sys.modules["token_budget"] = token_budget_module
+    spec.loader.exec_module(token_budget_module)
+count_tokens = token_budget_module.count_tokens
+count_message_tokens = token_budget_module.count_message_tokens
+truncate_tokens = token_budget_module.truncate_tokens
+
+WORDS = (
+    "the storm gathered over the valley as she walked toward the old tower carrying a lantern "
+    "and a letter sealed with wax no one had opened in years her mentor had warned her about "
+    "the river the silence and the names that should never be spoken aloud yet the door stood open"
+).split()
+
+# Minimum prompt length the provider caches, and the granularity of cache hits
+PREFIX_CACHE_MIN_TOKENS = 1024
+PREFIX_CACHE_BLOCK = 128
+
+@dataclass
+class MockConfig:
+    """
+    Behaviour of the stand-in provider. latency is "fixed:S", "uniform:LO,HI" or
+    "lognormal:MEDIAN,SIGMA" seconds before the first token; tokens_per_second paces
+    output; tpm/rpm (0 = unlimited) return 429 with Retry-After when exceeded.
+    """
+    seed: int = 0
+    latency: str = "lognormal:0.4,0.5"
+    tokens_per_second: float = 80.0
+    max_concurrency: int = 64
+    tokens_per_minute: int = 0
+    requests_per_minute: int = 0
+    error_rate: float = 0.0
+    embedding_dimensions: int = 256
+    default_completion_tokens: int = 300
+    models: tuple = ("gpt-4o-mini", "gpt-4o", "text-embedding-3-small")
+
+    @classmethod
+    def from_env(cls) -> "MockConfig":
+        return cls(
+            seed=int(os.getenv("MOCK_LLM_SEED", 0)),
+            latency=os.getenv("MOCK_LLM_LATENCY", cls.latency),
+            tokens_per_second=float(os.getenv("MOCK_LLM_TOKENS_PER_SECOND", cls.tokens_per_second)),
+            max_concurrency=int(os.getenv("MOCK_LLM_MAX_CONCURRENCY", cls.max_concurrency)),
+            tokens_per_minute=int(os.getenv("MOCK_LLM_TPM", 0)),
+            requests_per_minute=int(os.getenv("MOCK_LLM_RPM", 0)),
+            error_rate=float(os.getenv("MOCK_LLM_ERROR_RATE", 0.0)),
+            embedding_dimensions=int(os.getenv("MOCK_LLM_EMBEDDING_DIMENSIONS", cls.embedding_dimensions))
+        )
+
+def sample_latency(spec: str, rng: random.Random) -> float:
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v]
+    if kind == "fixed":
+        return values[0]
+    if kind == "uniform":
+        return rng.uniform(values[0], values[1])
+    if kind == "lognormal":
+        return rng.lognormvariate(np.log(values[0]), values[1])
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+def request_seed(seed: int, payload: Any) -> int:
+    digest = hashlib.sha256(f"{seed}:{json.dumps(payload, sort_keys=True)}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big")
+
+def is_list_key(key: str) -> bool:
+    return key.endswith("s") and not key.endswith(("details", "ss", "us", "sis"))
+
+def generate_text(messages: List[Dict[str, str]], max_tokens: int, rng: random.Random) -> str:
+    """
+    Deterministic output for a prompt. Prompts asking for a JSON object/array
+    "with the keys a, b and c" get schema-shaped JSON; anything else gets prose.
+    """
+    prompt = "\n".join(message.get("content") or "" for message in messages)
+    keys_match = re.search(r"with the keys ([\w, ]+?)(?:\.|\n|$)", prompt)
+
+    def words(n: int) -> str:
+        return " ".join(rng.choice(WORDS) for _ in range(n))
+
+    if keys_match:
+        keys = [k for k in re.split(r",\s*|\s+and\s+", keys_match.group(1).strip()) if k]
+
+        def make_object() -> Dict[str, Any]:
+            return {
+                key: [words(2).title() for _ in range(3)] if is_list_key(key)
+                else (words(2).title() if key == "name" else words(8).capitalize())
+                for key in keys
+            }
+
+        if "JSON array" in prompt:
+            return json.dumps([make_object() for _ in range(rng.randint(2, 4))])
+        return json.dumps(make_object())
+
+    sentences, length = [], 0
+    while length < max_tokens:
+        n = rng.randint(6, 18)
+        sentences.append(words(n).capitalize() + ".")
+        length += n + 1
+    return truncate_tokens(" ".join(sentences), max_tokens)
+
+def embed_text(text: str, seed: int, dimensions: int) -> List[float]:
+    """Deterministic unit vector per text (distinct texts are near-orthogonal)"""
+    rng = np.random.default_rng(request_seed(seed, text))
+    vector = rng.standard_normal(dimensions)
+    return (vector / np.linalg.norm(vector)).round(6).tolist()
+
+class MockProvider:
+    """
+    OpenAI-compatible stand-in: /v1/chat/completions (plain and streaming),
+    /v1/embeddings and /v1/models, with simulated latency, pacing, quotas,
+    prefix caching and injected failures. Outputs depend only on the seed and
+    the request, so runs are reproducible.
+    """
+
+    def __init__(self, config: MockConfig = None, clock=None):
+        self.config = config or MockConfig()
+        self.clock = clock or MonotonicClock()
+        self.rng = random.Random(self.config.seed)
+        self.semaphore = asyncio.Semaphore(self.config.max_concurrency)
+        tpm, rpm = self.config.tokens_per_minute, self.config.requests_per_minute
+        self.tokens = TokenBucket(tpm, tpm, self.clock) if tpm else None
+        self.requests = TokenBucket(rpm, rpm, self.clock) if rpm else None
+        self._prefixes: "OrderedDict[str, int]" = OrderedDict()
+        self.stats = {
+            "chat_requests": 0, "stream_requests": 0, "embedding_requests": 0,
+            "rate_limited": 0, "errors": 0, "prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0
+        }
+
+    def admit(self, cost: int) -> float:
+        """0 when the request fits the quota (and is charged), else seconds until it would"""
+        waits = [
+            bucket.wait_time(amount)
+            for bucket, amount in ((self.tokens, cost), (self.requests, 1)) if bucket is not None
+        ]
+        wait = max(waits, default=0.0)
+        if wait > 0:
+            self.stats["rate_limited"] += 1
+            return wait
+        if self.tokens is not None:
+            self.tokens.level -= cost
+        if self.requests is not None:
+            self.requests.level -= 1
+        return 0.0
+
+    def cached_prefix_tokens(self, messages: List[Dict[str, str]], model: str, prompt_tokens: int) -> int:
+        """Simulate provider prefix caching keyed on the leading message"""
+        if prompt_tokens < PREFIX_CACHE_MIN_TOKENS or not messages:
+            return 0
+        key = hashlib.sha256(f"{model}:{messages[0].get('content')}".encode("utf-8")).hexdigest()
+        prefix = count_message_tokens(messages[:1], model)
+        seen = key in self._prefixes
+        self._prefixes[key] = prefix
+        self._prefixes.move_to_end(key)
+        while len(self._prefixes) > 1024:
+            self._prefixes.popitem(last=False)
+        if not seen or prefix < PREFIX_CACHE_MIN_TOKENS:
+            return 0
+        return prefix // PREFIX_CACHE_BLOCK * PREFIX_CACHE_BLOCK
+
+    def error_response(self, status: int, message: str, kind: str, headers: Dict[str, str] = None) -> JSONResponse:
+        return JSONResponse({"error": {"message": message, "type": kind, "code": kind}}, status_code=status,
+                            headers=headers)
+
+    async def chat(self, body: Dict[str, Any]):
+        model = body.get("model", self.config.models[0])
+        messages = body.get("messages", [])
+        max_tokens = body.get("max_tokens") or body.get("max_completion_tokens") or self.config.default_completion_tokens
+        prompt_tokens = count_message_tokens(messages, model)
+
+        wait = self.admit(prompt_tokens + max_tokens)
+        if wait > 0:
+            return self.error_response(429, "Rate limit reached (mock)", "rate_limit_exceeded",
+                                       {"retry-after": f"{wait:.3f}", "retry-after-ms": str(int(wait * 1000))})
+        if self.config.error_rate and self.rng.random() < self.config.error_rate:
+            self.stats["errors"] += 1
+            return self.error_response(500, "Injected server error (mock)", "server_error")
+
+        rng = random.Random(request_seed(self.config.seed, {"model": model, "messages": messages}))
+        text = generate_text(messages, max_tokens, rng)
+        completion_tokens = count_tokens(text, model)
+        cached = self.cached_prefix_tokens(messages, model, prompt_tokens)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": cached}
+        }
+        self.stats["prompt_tokens"] += prompt_tokens
+        self.stats["completion_tokens"] += completion_tokens
+        self.stats["cached_tokens"] += cached
+        first_token = sample_latency(self.config.latency, self.rng)
+        completion_id = f"chatcmpl-mock-{request_seed(self.config.seed, messages) % 10 ** 12}"
+
+        if body.get("stream"):
+            self.stats["stream_requests"] += 1
+            include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+            return StreamingResponse(
+                self._stream(completion_id, model, text, usage if include_usage else None, first_token),
+                media_type="text/event-stream"
+            )
+
+        self.stats["chat_requests"] += 1
+        async with self.semaphore:
+            await asyncio.sleep(first_token + completion_tokens / self.config.tokens_per_second)
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": text}}],
+            "usage": usage
+        }
+
+    async def _stream(self, completion_id: str, model: str, text: str, usage: Dict[str, Any],
+                      first_token: float) -> AsyncIterator[str]:
+        def chunk(delta: Dict[str, Any], finish_reason: str = None, **extra) -> str:
+            payload = {
+                "id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}] if delta is not None else [],
+                **extra
+            }
+            return f"data: {json.dumps(payload)}\n\n"
+
+        async with self.semaphore:
+            await asyncio.sleep(first_token)
+            yield chunk({"role": "assistant", "content": ""})
+            pieces = re.findall(r"\S+\s*", text)
+            for start in range(0, len(pieces), 4):
+                yield chunk({"content": "".join(pieces[start:start + 4])})
+                await asyncio.sleep(4 / self.config.tokens_per_second)
+            yield chunk({}, "stop")
+            if usage is not None:
+                yield chunk(None, usage=usage)
+            yield "data: [DONE]\n\n"
+
+    async def embeddings(self, body: Dict[str, Any]):
+        inputs = body.get("input", [])
+        inputs = [inputs] if isinstance(inputs, str) else inputs
+        model = body.get("model", "text-embedding-3-small")
+        tokens = sum(count_tokens(text, model) for text in inputs)
+        wait = self.admit(tokens)
+        if wait > 0:
+            return self.error_response(429, "Rate limit reached (mock)", "rate_limit_exceeded",
+                                       {"retry-after": f"{wait:.3f}"})
+        self.stats["embedding_requests"] += 1
+        dimensions = body.get("dimensions") or self.config.embedding_dimensions
+        async with self.semaphore:
+            await asyncio.sleep(sample_latency(self.config.latency, self.rng) / 4)
+        return {
+            "object": "list",
+            "model": model,
+            "data": [
+                {"object": "embedding", "index": i, "embedding": embed_text(text, self.config.seed, dimensions)}
+                for i, text in enumerate(inputs)
+            ],
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens}
+        }
+
+def create_app(config: MockConfig = None) -> FastAPI:
+    provider = MockProvider(config or MockConfig.from_env())
+    app = FastAPI(title="Mock LLM Provider", version="1.0.0")
+    app.state.provider = provider
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        return await provider.chat(await request.json())
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        return await provider.embeddings(await request.json())
+
+    @app.get("/v1/models")
+    async def models():
+        return {"object": "list", "data": [{"id": m, "object": "model", "owned_by": "mock"} for m in provider.config.models]}
+
+    @app.get("/mock/stats")
+    async def stats():
+        return dict(provider.stats, config=asdict(provider.config))
+
+    return app
+
+# Example usage: run the server, then point the agents at it with
+#   OPENAI_BASE_URL=http://127.0.0.1:8100/v1 OPENAI_API_KEY=mock python3 main.py
+async def main():
+    port = int(os.getenv("MOCK_LLM_PORT", 8100))
+    print(f"Mock LLM provider listening on http://127.0.0.1:{port}/v1")
+    server = uvicorn.Server(uvicorn.Config(create_app(), host="127.0.0.1", port=port, log_level="warning"))
+    await server.serve()
+
+if __name__ == "__main__":
+    asyncio.run(main())
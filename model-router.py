@@ -0,0 +1,203 @@
+import asyncio
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Any, Callable, Optional
+import importlib.util
+
+spec = importlib.util.spec_from_file_location("request_policy", "request-policy.py")
+request_policy_module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(request_policy_module)
+LatencyTracker = request_policy_module.LatencyTracker
+
+# USD per million tokens: (input, cached input, output)
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4.1": (2.00, 0.50, 8.00),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+    "gpt-4.1-nano": (0.10, 0.025, 0.40)
+}
+
+def call_cost(model: str, usage: Dict[str, Any]) -> float:
+    """Dollar cost of one call from its usage block (0 for unknown models)"""
+    prices = MODEL_PRICES.get(model)
+    if prices is None:
+        # Dated snapshots ("gpt-4o-2024-08-06") price like their family
+        family = max((name for name in MODEL_PRICES if model.startswith(name)), key=len, default=None)
+        prices = MODEL_PRICES.get(family)
+    if prices is None or not usage:
+        return 0.0
+    cached = (usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0
+    uncached = usage.get("prompt_tokens", 0) - cached
+    return (uncached * prices[0] + cached * prices[1] + usage.get("completion_tokens", 0) * prices[2]) / 1_000_000
+
+@dataclass
+class Route:
+    call_class: str
+    models: List[str]
+    latency_slo: float
+    params: Dict[str, Any] = field(default_factory=dict)
+
+# Cheap, fast models for throwaway drafts; premium models for prose the reader sees
+DEFAULT_ROUTES = {
+    "brainstorm": Route("brainstorm", ["gpt-4o-mini", "gpt-4.1-mini"], latency_slo=15.0),
+    "outline_draft": Route("outline_draft", ["gpt-4o-mini", "gpt-4.1-mini"], latency_slo=20.0),
+    "final_writing": Route("final_writing", ["gpt-4o", "gpt-4.1", "gpt-4o-mini"], latency_slo=90.0),
+    "editing": Route("editing", ["gpt-4o", "gpt-4.1", "gpt-4o-mini"], latency_slo=60.0),
+    "default": Route("default", ["gpt-4o-mini"], latency_slo=30.0)
+}
+
+def load_routes(config: str = None, default_model: str = None) -> Dict[str, Route]:
+    """
+    Routes from LLM_ROUTES: inline JSON or a path to a JSON file, e.g.
+    {"final_writing": {"models": ["gpt-4.1", "gpt-4o"], "latency_slo": 45}}.
+    Listed classes override the defaults; unlisted ones keep them. The "default"
+    class uses default_model (the deployment's LLM_MODEL) when given.
+    """
+    routes = dict(DEFAULT_ROUTES)
+    if default_model:
+        routes["default"] = Route("default", [default_model], latency_slo=DEFAULT_ROUTES["default"].latency_slo)
+    config = config if config is not None else os.getenv("LLM_ROUTES")
+    if not config:
+        return routes
+    if os.path.isfile(config):
+        with open(config, "r", encoding="utf-8") as f:
+            config = f.read()
+    for call_class, rule in json.loads(config).items():
+        base = routes.get(call_class) or routes["default"]
+        routes[call_class] = Route(
+            call_class=call_class,
+            models=list(rule.get("models", base.models)),
+            latency_slo=float(rule.get("latency_slo", base.latency_slo)),
+            params=dict(rule.get("params", base.params))
+        )
+    return routes
+
+class ModelRouter:
+    """
+    Picks the model for each call class.
+
+    Candidates are tried in route order. A model is skipped while it is cooling
+    down after a failure, or while its recent p95 latency on the route breaks the
+    route's SLO; if every candidate is degraded the route order is used as is.
+    """
+
+    def __init__(self, routes: Dict[str, Route] = None, cooldown: float = 30.0, min_samples: int = 10,
+                 clock: Callable[[], float] = time.monotonic, default_model: str = None):
+        self.routes = routes if routes is not None else load_routes(default_model=default_model)
+        self.cooldown = cooldown
+        self.min_samples = min_samples
+        self.clock = clock
+        self._unhealthy_until: Dict[str, float] = {}
+        self._latency: Dict[tuple, LatencyTracker] = {}
+        self._stats: Dict[str, Dict[str, Any]] = {}
+
+    def route(self, call_class: str) -> Route:
+        return self.routes.get(call_class) or self.routes["default"]
+
+    def select(self, call_class: str) -> List[str]:
+        """Candidate models in the order they should be tried"""
+        route = self.route(call_class)
+        now = self.clock()
+        healthy = [
+            model for model in route.models
+            if self._unhealthy_until.get(model, 0.0) <= now and not self._breaks_slo(route, model)
+        ]
+        return healthy + [model for model in route.models if model not in healthy]
+
+    def record(self, call_class: str, model: str, latency: float, usage: Dict[str, Any] = None,
+               success: bool = True, cached: bool = False):
+        """One finished call on the route; failures put the model in cooldown"""
+        route = self.route(call_class)
+        stats = self._route_stats(route.call_class)
+        per_model = stats["models"].setdefault(model, {"calls": 0, "failures": 0, "cost": 0.0})
+        per_model["calls"] += 1
+        stats["calls"] += 1
+        if not success:
+            per_model["failures"] += 1
+            stats["failures"] += 1
+            self._unhealthy_until[model] = self.clock() + self.cooldown
+            return
+        if cached:
+            stats["cache_hits"] += 1
+            return
+        cost = call_cost(model, usage or {})
+        per_model["cost"] += cost
+        stats["cost"] += cost
+        stats["slo_violations"] += latency > route.latency_slo
+        self._tracker(route.call_class, model).add(latency)
+        self._tracker(route.call_class, None).add(latency)
+
+    def record_cost(self, call_class: str, model: str, usage: Dict[str, Any]):
+        """Spend from a request whose response was discarded (e.g. a losing hedge); not a call sample"""
+        stats = self._route_stats(self.route(call_class).call_class)
+        per_model = stats["models"].setdefault(model, {"calls": 0, "failures": 0, "cost": 0.0})
+        cost = call_cost(model, usage or {})
+        per_model["cost"] += cost
+        stats["cost"] += cost
+
+    def record_fallback(self, call_class: str):
+        self._route_stats(self.route(call_class).call_class)["fallbacks"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        report = {}
+        for call_class, stats in self._stats.items():
+            tracker = self._latency.get((call_class, None))
+            report[call_class] = dict(
+                stats,
+                models={model: dict(values) for model, values in stats["models"].items()},
+                latency_slo=self.route(call_class).latency_slo,
+                p50=tracker.percentile(0.50) if tracker else None,
+                p95=tracker.percentile(0.95) if tracker else None,
+                p99=tracker.percentile(0.99) if tracker else None,
+                cost=round(stats["cost"], 6)
+            )
+        return report
+
+    def _breaks_slo(self, route: Route, model: str) -> bool:
+        tracker = self._latency.get((route.call_class, model))
+        if tracker is None or len(tracker) < self.min_samples:
+            return False
+        return tracker.percentile(0.95) > route.latency_slo
+
+    def _tracker(self, call_class: str, model: Optional[str]) -> LatencyTracker:
+        key = (call_class, model)
+        if key not in self._latency:
+            self._latency[key] = LatencyTracker(200)
+        return self._latency[key]
+
+    def _route_stats(self, call_class: str) -> Dict[str, Any]:
+        if call_class not in self._stats:
+            self._stats[call_class] = {
+                "calls": 0, "failures": 0, "fallbacks": 0, "cache_hits": 0, "slo_violations": 0,
+                "cost": 0.0, "models": {}
+            }
+        return self._stats[call_class]
+
+# Example usage
+async def main():
+    now = [0.0]
+    router = ModelRouter(load_routes('{"final_writing": {"latency_slo": 5}}'), clock=lambda: now[0])
+    usage = {"prompt_tokens": 3000, "completion_tokens": 1500, "prompt_tokens_details": {"cached_tokens": 1024}}
+
+    print(f"brainstorm -> {router.select('brainstorm')}")
+    print(f"final_writing -> {router.select('final_writing')}")
+
+    # gpt-4o is slow on this route: after enough samples it is demoted behind gpt-4.1
+    for _ in range(10):
+        router.record("final_writing", "gpt-4o", 8.0, usage)
+    print(f"final_writing after SLO breaches -> {router.select('final_writing')}")
+
+    # A failure puts the model in cooldown; the next candidate serves as a fallback
+    router.record("brainstorm", "gpt-4o-mini", 0.5, success=False)
+    print(f"brainstorm during cooldown -> {router.select('brainstorm')}")
+    router.record_fallback("brainstorm")
+    router.record("brainstorm", "gpt-4.1-mini", 1.2, usage)
+    now[0] += 60
+    print(f"brainstorm after cooldown -> {router.select('brainstorm')}")
+    print(json.dumps(router.get_stats(), indent=2))
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,398 @@
+import asyncio
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Any, Callable, Iterator, Optional, Tuple
+
+DEFAULT_WORDS_PER_CHAPTER = 3000
+
+# Chapter stages in pipeline order (mirrors the coordinator's CHAPTER_STAGES)
+STAGES = ["planned", "written", "edited", "narrated"]
+
+CHAPTER_LINE = re.compile(r"^(?P<indent>\s*)(?P<prefix>chapter\s+)?(\d+)\s*[.:)\-]\s*(.+?)\s*$", re.IGNORECASE)
+ACT_LINE = re.compile(r"^\s*(?:act|part)\s+([ivxlc]+|\d+)\s*(?:[.:)\-]\s*(.*?))?\s*$", re.IGNORECASE)
+SCENE_LINE = re.compile(r"^\s*(?:[-*•]\s*)?scene(?:\s+\d+)?\s*[.:)\-]\s*(.+?)\s*$", re.IGNORECASE)
+BEATS_LINE = re.compile(r"^\s*(?:[-*•]\s*)?beats?\s*:\s*(.+?)\s*$", re.IGNORECASE)
+WORD_TARGET = re.compile(r"\s*\((\d[\d,]*)\s*words?\)\s*$", re.IGNORECASE)
+
+# Share of the book each act should carry in a three-act structure
+THREE_ACT_SHARES = [0.25, 0.5, 0.25]
+IMPLICIT_ACTS = ["Setup", "Confrontation", "Resolution"]
+
+def split_heading(heading: str) -> Tuple[str, str]:
+    """"Title - summary" -> (title, summary)"""
+    parts = re.split(r"\s+[-–—]\s+", heading, maxsplit=1)
+    return parts[0], parts[1] if len(parts) > 1 else ""
+
+def _roman(value: str) -> int:
+    if value.isdigit():
+        return int(value)
+    numerals = {"i": 1, "v": 5, "x": 10, "l": 50, "c": 100}
+    total = 0
+    for char, following in zip(value.lower(), value.lower()[1:] + " "):
+        total += -numerals[char] if numerals.get(following, 0) > numerals[char] else numerals[char]
+    return total
+
+@dataclass(eq=False)
+class OutlineNode:
+    """
+    One act, chapter or scene. Aggregates over the subtree are memoized on the
+    node and cleared along the path to the root whenever the node changes, so
+    an edit costs O(depth) and unchanged subtrees are never recomputed.
+    """
+    kind: str
+    title: str
+    summary: str = ""
+    number: int = None
+    label: str = None
+    word_target: int = 0
+    beats: List[str] = field(default_factory=list)
+    stage: str = "planned"
+    words_written: int = 0
+    approved: bool = False
+    feedback: str = None
+    children: List["OutlineNode"] = field(default_factory=list)
+    parent: Optional["OutlineNode"] = field(default=None, repr=False)
+    _memo: Dict[Any, Any] = field(default_factory=dict, repr=False)
+    _shape: Dict[Any, Any] = field(default_factory=dict, repr=False)
+
+    @property
+    def id(self) -> str:
+        if self.kind == "scene":
+            return f"{self.parent.id}.scene-{self.number}"
+        return f"{self.kind}-{self.number}" if self.kind != "book" else "book"
+
+    def add(self, child: "OutlineNode") -> "OutlineNode":
+        child.parent = self
+        self.children.append(child)
+        self.invalidate(structure=True)
+        return child
+
+    def invalidate(self, structure: bool = False):
+        """Clear memoized aggregates up to the root; structure also drops node lists and the id index"""
+        node = self
+        while node is not None:
+            node._memo.clear()
+            if structure:
+                node._shape.clear()
+            node = node.parent
+
+    def update(self, **fields):
+        for name, value in fields.items():
+            if name not in ("title", "summary", "word_target", "beats", "stage", "words_written", "approved", "feedback"):
+                raise ValueError(f"Cannot update {name} on an outline node")
+            setattr(self, name, value)
+        if "word_target" in fields and self.children:
+            # A parent's target is the sum of its children's, so the new one is shared out among them
+            _rescale_target(self, fields["word_target"])
+        self.invalidate()
+
+    def _memoized(self, key: Any, compute: Callable[[], Any], structural: bool = False) -> Any:
+        memo = self._shape if structural else self._memo
+        if key not in memo:
+            memo[key] = compute()
+        return memo[key]
+
+    def walk(self) -> Iterator["OutlineNode"]:
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+    def chapters(self) -> List["OutlineNode"]:
+        return self._memoized("chapters", lambda: [n for n in self.walk() if n.kind == "chapter"], structural=True)
+
+    def total_target(self) -> int:
+        """Own target for a leaf, otherwise the sum of the children's"""
+        return self._memoized("target", lambda: sum(c.total_target() for c in self.children)
+                              if self.children else self.word_target)
+
+    def total_written(self) -> int:
+        if self.kind == "chapter":
+            return self.words_written
+        return self._memoized("written", lambda: sum(c.total_written() for c in self.children))
+
+    def all_beats(self) -> frozenset:
+        return self._memoized("beats", lambda: frozenset(b.lower() for b in self.beats).union(
+            *(c.all_beats() for c in self.children)))
+
+    def done_weight(self, stages: int) -> float:
+        """Word-target-weighted pipeline work done: a chapter counts stage / stages of its target"""
+        if self.kind == "chapter":
+            return self.total_target() * min(stages, STAGES.index(self.stage)) / stages
+        return self._memoized(("done", stages), lambda: sum(c.done_weight(stages) for c in self.children))
+
+    def approved_chapters(self) -> int:
+        if self.kind == "chapter":
+            return int(self.approved)
+        return self._memoized("approved", lambda: sum(c.approved_chapters() for c in self.children))
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            "id": self.id, "kind": self.kind, "title": self.title, "summary": self.summary,
+            "word_target": self.total_target(), "words_written": self.total_written()
+        }
+        if self.beats:
+            data["beats"] = list(self.beats)
+        if self.kind == "chapter":
+            data.update(number=self.number, stage=self.stage, approved=self.approved)
+            if self.label and self.label != str(self.number):
+                data["label"] = self.label
+        if self.feedback:
+            data["feedback"] = self.feedback
+        if self.children:
+            data["children"] = [child.to_dict() for child in self.children]
+        return data
+
+class OutlineTree:
+    """
+    A book outline as acts -> chapters -> scenes, with beats and word targets.
+
+    Stages address chapters by number and any node by id ("act-2", "chapter-7",
+    "chapter-7.scene-1"). Word totals, act balance, arc coverage, progress and
+    approval counts are memoized per node and invalidated only along the path
+    of an edit.
+    """
+
+    def __init__(self, title: str = ""):
+        self.root = OutlineNode("book", title)
+
+    @classmethod
+    def from_outline(cls, outline: str, words_per_chapter: int = DEFAULT_WORDS_PER_CHAPTER,
+                     arc: List[str] = None) -> "OutlineTree":
+        """
+        Parse "Act I: ...", "Chapter N: Title - summary (N words)", "Scene: ..."
+        and "Beats: a, b" lines. Other lines extend the previous summary. Without
+        act lines, chapters are grouped into a 25/50/25 three-act structure.
+        Chapters named after a beat in arc are tagged with it.
+
+        Chapters are numbered through the whole book; the number in the text is
+        kept as the label, since it may restart in every act. A bare "N. Title"
+        line is a chapter only directly under an act in an outline with no
+        "Chapter N" lines, so numbered lists inside summaries stay summaries.
+        """
+        tree = cls()
+        arc_names = {beat.lower(): beat for beat in arc or []}
+        acts: List[OutlineNode] = []
+        loose: List[OutlineNode] = []
+        last: Optional[OutlineNode] = None
+        chapter: Optional[OutlineNode] = None
+        count = 0
+        explicit = bool(re.search(r"^\s*chapter\s+\d+", outline or "", re.IGNORECASE | re.MULTILINE))
+        for line in (outline or "").splitlines():
+            if not line.strip():
+                continue
+            act_match, chapter_match = ACT_LINE.match(line), CHAPTER_LINE.match(line)
+            if chapter_match and not chapter_match.group("prefix") and (explicit or not acts or chapter_match.group("indent")):
+                chapter_match = None
+            scene_match, beats_match = SCENE_LINE.match(line), BEATS_LINE.match(line)
+            if act_match and not chapter_match:
+                title, summary = split_heading(act_match.group(2) or "")
+                last = OutlineNode("act", title or f"Act {act_match.group(1)}", summary, number=_roman(act_match.group(1)))
+                acts.append(last)
+                chapter = None
+            elif chapter_match:
+                heading, target = _strip_target(chapter_match.group(4))
+                title, summary = split_heading(heading)
+                count += 1
+                chapter = OutlineNode("chapter", title, summary, number=count, label=chapter_match.group(3),
+                                      word_target=target if target is not None else words_per_chapter)
+                if title.lower() in arc_names:
+                    chapter.beats.append(arc_names[title.lower()])
+                (acts[-1].children if acts else loose).append(chapter)
+                last = chapter
+            elif scene_match and chapter is not None:
+                heading, target = _strip_target(scene_match.group(1))
+                title, summary = split_heading(heading)
+                last = OutlineNode("scene", title, summary, number=len(chapter.children) + 1,
+                                   word_target=target or 0)
+                chapter.children.append(last)
+            elif beats_match and last is not None:
+                last.beats.extend(b.strip() for b in beats_match.group(1).split(",") if b.strip())
+            elif last is not None:
+                last.summary = f"{last.summary} {line.strip()}".strip()
+            elif not tree.root.title:
+                tree.root.title = line.strip()
+
+        if not acts and loose:
+            acts = _three_acts(loose)
+        for act in acts:
+            tree.root.add(act)
+            for child in act.children:
+                child.parent = act
+                _spread_target(child)
+        tree.root.invalidate(structure=True)
+        return tree
+
+    def chapters(self) -> List[OutlineNode]:
+        return self.root.chapters()
+
+    def acts(self) -> List[OutlineNode]:
+        return list(self.root.children)
+
+    def _index(self) -> Dict[str, OutlineNode]:
+        return self.root._memoized("index", lambda: {node.id: node for node in self.root.walk()}, structural=True)
+
+    def node(self, node_id: str) -> OutlineNode:
+        node = self._index().get(node_id)
+        if node is None:
+            raise KeyError(f"No outline node {node_id}")
+        return node
+
+    def chapter(self, number: int) -> OutlineNode:
+        return self.node(f"chapter-{number}")
+
+    def add_scene(self, number: int, title: str, summary: str = "", word_target: int = 0) -> OutlineNode:
+        chapter = self.chapter(number)
+        return chapter.add(OutlineNode("scene", title, summary, number=len(chapter.children) + 1,
+                                       word_target=word_target))
+
+    def set_stage(self, number: int, stage: str, words: int = None):
+        chapter = self.chapter(number)
+        chapter.update(stage=stage, words_written=chapter.words_written if words is None else words)
+
+    def approve(self, node_ids: List[str] = None, approved: bool = True, feedback: str = None) -> List[int]:
+        """Approve (or send back) whole nodes with everything under them; returns the chapters affected"""
+        targets = [self.node(node_id) for node_id in node_ids] if node_ids else [self.root]
+        chapters = []
+        for target in targets:
+            for node in target.walk():
+                node.update(approved=approved)
+                if node.kind == "chapter":
+                    chapters.append(node.number)
+            if feedback:
+                target.update(feedback=feedback)
+        return sorted(set(chapters))
+
+    @property
+    def fully_approved(self) -> bool:
+        chapters = self.chapters()
+        return bool(chapters) and self.root.approved_chapters() == len(chapters)
+
+    def total_words(self) -> int:
+        return self.root.total_target()
+
+    def progress(self, stages: int = 2) -> float:
+        """Share of pipeline work done, weighted by each chapter's word target"""
+        total = self.root.total_target()
+        return self.root.done_weight(stages) / total if total else 0.0
+
+    def act_balance(self) -> Dict[str, Any]:
+        """Each act's share of the word target and how far the book is from the ideal split"""
+        def compute() -> Dict[str, Any]:
+            acts, total = self.acts(), self.root.total_target()
+            ideal = THREE_ACT_SHARES if len(acts) == 3 else [1 / len(acts)] * len(acts) if acts else []
+            shares = {act.id: round(act.total_target() / total, 3) if total else 0.0 for act in acts}
+            deviation = max((abs(share - goal) for share, goal in zip(shares.values(), ideal)), default=0.0)
+            return {"shares": shares, "ideal": dict(zip(shares, ideal)), "max_deviation": round(deviation, 3)}
+        return self.root._memoized("act_balance", compute)
+
+    def arc_coverage(self, arc: List[str]) -> Dict[str, Any]:
+        """Which of the arc's beats some node is tagged with"""
+        def compute() -> Dict[str, Any]:
+            beats = self.root.all_beats()
+            covered = [beat for beat in arc if beat.lower() in beats]
+            return {"covered": covered, "missing": [beat for beat in arc if beat.lower() not in beats],
+                    "ratio": round(len(covered) / len(arc), 3) if arc else 1.0}
+        return self.root._memoized(("arc", tuple(arc)), compute)
+
+    def render(self) -> str:
+        """Back to the text outline format that from_outline reads"""
+        lines = [self.root.title] if self.root.title else []
+        for act in self.acts():
+            lines.append(f"Act {act.number}: {act.title}" + (f" - {act.summary}" if act.summary else ""))
+            for chapter in act.children:
+                lines.append(f"Chapter {chapter.number}: {chapter.title}"
+                             + (f" - {chapter.summary}" if chapter.summary else "")
+                             + (f" ({chapter.word_target} words)" if chapter.word_target and not chapter.children else ""))
+                if chapter.beats:
+                    lines.append(f"  Beats: {', '.join(chapter.beats)}")
+                for scene in chapter.children:
+                    lines.append(f"  - Scene: {scene.title}" + (f" - {scene.summary}" if scene.summary else "")
+                                 + (f" ({scene.word_target} words)" if scene.word_target else ""))
+        return "\n".join(lines)
+
+    def to_dict(self, arc: List[str] = None, stages: int = 2) -> Dict[str, Any]:
+        return {
+            "tree": self.root.to_dict(),
+            "chapters": len(self.chapters()),
+            "word_target": self.total_words(),
+            "progress": round(self.progress(stages), 3),
+            "approved_chapters": self.root.approved_chapters(),
+            "fully_approved": self.fully_approved,
+            "act_balance": self.act_balance(),
+            "arc_coverage": self.arc_coverage(arc) if arc else None
+        }
+
+def _strip_target(heading: str) -> Tuple[str, Optional[int]]:
+    match = WORD_TARGET.search(heading)
+    if not match:
+        return heading, None
+    return heading[:match.start()], int(match.group(1).replace(",", ""))
+
+def _three_acts(chapters: List[OutlineNode]) -> List[OutlineNode]:
+    if len(chapters) < 3:
+        act = OutlineNode("act", IMPLICIT_ACTS[0], number=1)
+        act.children = list(chapters)
+        return [act]
+    first = max(1, round(len(chapters) * THREE_ACT_SHARES[0]))
+    second = max(first + 1, min(len(chapters) - 1, round(len(chapters) * sum(THREE_ACT_SHARES[:2]))))
+    acts = []
+    for number, (title, group) in enumerate(zip(IMPLICIT_ACTS, [chapters[:first], chapters[first:second], chapters[second:]]), 1):
+        act = OutlineNode("act", title, number=number)
+        act.children = group
+        acts.append(act)
+    return acts
+
+def _rescale_target(node: OutlineNode, target: int):
+    """Scale the children's targets to sum to target, keeping their proportions"""
+    current = sum(child.total_target() for child in node.children)
+    remaining = target
+    for index, child in enumerate(node.children):
+        if index == len(node.children) - 1:
+            share = remaining
+        elif current:
+            share = target * child.total_target() // current
+        else:
+            share = target // len(node.children)
+        remaining -= share
+        child.update(word_target=share)
+
+def _spread_target(chapter: OutlineNode):
+    """Scenes without their own target share what is left of the chapter's"""
+    for scene in chapter.children:
+        scene.parent = chapter
+    open_scenes = [scene for scene in chapter.children if not scene.word_target]
+    if open_scenes:
+        remaining = max(0, chapter.word_target - sum(scene.word_target for scene in chapter.children))
+        for scene in open_scenes:
+            scene.word_target = remaining // len(open_scenes)
+
+# Example usage
+async def main():
+    import time
+
+    outline = "\n".join(["The Clockwork Heir"] + [
+        f"Chapter {n}: Part {n} - Mira follows the trail further." for n in range(1, 13)
+    ] + ["  - Scene: The vault - Mira picks the lock (1200 words)", "  - Scene: The chase"])
+    arc = ["Opening Image", "The Midpoint", "The Climax"]
+    tree = OutlineTree.from_outline(outline, arc=arc)
+    tree.chapter(6).update(beats=["The Midpoint"])
+    print(f"{len(tree.chapters())} chapters in {len(tree.acts())} acts, {tree.total_words()} words planned")
+    print(f"Act balance: {tree.act_balance()}")
+    print(f"Arc coverage: {tree.arc_coverage(arc)}")
+
+    print(f"Approved chapters after approving act 1: {tree.approve(['act-1'])}")
+    for number in (1, 2, 3):
+        tree.set_stage(number, "edited", words=3000)
+    print(f"Progress: {tree.progress():.0%}, fully approved: {tree.fully_approved}")
+
+    big = OutlineTree.from_outline("\n".join(f"Chapter {n}: Part {n}" for n in range(1, 2001)))
+    big.total_words()
+    started = time.perf_counter()
+    for number in range(1, 2001, 7):
+        big.chapter(number).update(word_target=2500)
+        big.total_words()
+    print(f"286 edits with totals recomputed along the path: {(time.perf_counter() - started) * 1000:.1f} ms")
+    print(tree.render().splitlines()[14:17])
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,109 @@
+import asyncio
+import importlib.util
+import sys
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Any
+
+# Load once per process so tokenizers are cached for every caller
+token_budget_module = sys.modules.get("token_budget")
+if token_budget_module is None:
+    spec = importlib.util.spec_from_file_location("token_budget", "token-budget.py")
+    token_budget_module = importlib.util.module_from_spec(spec)
+    sys.modules["token_budget"] = token_budget_module
+    spec.loader.exec_module(token_budget_module)
+count_tokens = token_budget_module.count_tokens
+
+# Providers only reuse cached prefixes at least this long (OpenAI: 1024 tokens)
+MIN_CACHEABLE_PREFIX_TOKENS = 1024
+
+INSTRUCTIONS = (
+    "Please complete each task in character, using your unique personality, expertise, and approach. "
+    "Stay true to your communication style and work methodology."
+)
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """
+    A persona's compiled prompt: a byte-identical static preamble followed by the task.
+
+    The preamble never contains per-call data, so every call for the same persona
+    shares one prefix that the provider can cache.
+    """
+    agent_type: str
+    preamble: str
+    prefix_tokens: int
+
+    @property
+    def cacheable(self) -> bool:
+        return self.prefix_tokens >= MIN_CACHEABLE_PREFIX_TOKENS
+
+    def render(self, task: str) -> str:
+        """Single-string form: static preamble, then the task last"""
+        return f"{self.preamble}\n\nTASK: {task}\n"
+
+    def messages(self, task: str) -> List[Dict[str, str]]:
+        """Chat form: the preamble as the system message, the task as the user message"""
+        return [
+            {"role": "system", "content": self.preamble},
+            {"role": "user", "content": task}
+        ]
+
+@lru_cache(maxsize=None)
+def compile_persona(agent_type: str, personality) -> PromptTemplate:
+    """Build a persona's static preamble once per process"""
+    preamble = sys.intern(f"""You are {personality.name}, a {personality.role}.
+
+PERSONALITY: {personality.personality}
+
+BACKSTORY: {personality.backstory}
+
+EXPERTISE: {', '.join(personality.expertise)}
+
+COMMUNICATION STYLE: {personality.communication_style}
+
+WORK APPROACH: {personality.work_approach}
+
+QUIRKS: {', '.join(personality.quirks)}
+
+{INSTRUCTIONS}""")
+    return PromptTemplate(agent_type=agent_type, preamble=preamble, prefix_tokens=count_tokens(preamble))
+
+class PromptLibrary:
+    """
+    Compiled templates for every persona. Provider-side cache hits for these
+    prefixes are reported per agent by the LLM client (cached_prompt_tokens).
+    """
+
+    def __init__(self, personalities: Dict[str, Any]):
+        self.templates = {
+            agent_type: compile_persona(agent_type, personality)
+            for agent_type, personality in personalities.items()
+        }
+
+    def get(self, agent_type: str) -> PromptTemplate:
+        return self.templates.get(agent_type)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            agent_type: {"prefix_tokens": template.prefix_tokens, "cacheable": template.cacheable}
+            for agent_type, template in self.templates.items()
+        }
+
+# Example usage
+async def main():
+    spec = importlib.util.spec_from_file_location("knowledge_registry", "knowledge-registry.py")
+    registry = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(registry)
+
+    library = PromptLibrary(registry.get_agent_personalities())
+    template = library.get("development")
+    first = template.render("Create characters for a fantasy novel")
+    second = template.render("Build a world for a mystery novel")
+    shared = len(first) - len(first.split("TASK: ")[-1])
+    print(f"Shared prefix: {first[:shared] == second[:shared]} ({template.prefix_tokens} tokens)")
+    print(template.messages("Create characters for a fantasy novel"))
+    print(library.get_stats())
+
+if __name__ == "__main__":
+    asyncio.run(main())
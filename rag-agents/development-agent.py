@@ -1,12 +1,40 @@
 import asyncio
 import json
+import sys
 from typing import Dict, List, Any
 from dataclasses import dataclass
-import openai
 from langchain.embeddings import OpenAIEmbeddings
 from langchain.vectorstores import Chroma
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.document_loaders import TextLoader
+import importlib.util
+# Load once per process so every agent shares one index
+knowledge_index_module = sys.modules.get("knowledge_index")
+if knowledge_index_module is None:
+    spec = importlib.util.spec_from_file_location("knowledge_index", "knowledge-index.py")
+    knowledge_index_module = importlib.util.module_from_spec(spec)
+    sys.modules["knowledge_index"] = knowledge_index_module
+    spec.loader.exec_module(knowledge_index_module)
+KnowledgeIndex = knowledge_index_module.KnowledgeIndex
+get_knowledge_index = knowledge_index_module.get_knowledge_index
+flatten_knowledge = knowledge_index_module.flatten_knowledge
+
+# Load once per process so every agent shares the same frozen registry
+knowledge_registry_module = sys.modules.get("knowledge_registry")
+if knowledge_registry_module is None:
+    spec = importlib.util.spec_from_file_location("knowledge_registry", "knowledge-registry.py")
+    knowledge_registry_module = importlib.util.module_from_spec(spec)
+    sys.modules["knowledge_registry"] = knowledge_registry_module
+    spec.loader.exec_module(knowledge_registry_module)
+
+# Load once per process so every agent shares one connection pool
+llm_client_module = sys.modules.get("llm_client")
+if llm_client_module is None:
+    spec = importlib.util.spec_from_file_location("llm_client", "llm-client.py")
+    llm_client_module = importlib.util.module_from_spec(spec)
+    sys.modules["llm_client"] = llm_client_module
+    spec.loader.exec_module(llm_client_module)
+LLMClientPool = llm_client_module.LLMClientPool
 
 @dataclass
 class Character:
@@ -33,9 +61,11 @@ class DevelopmentAgent:
     RAG Agent specialized in character and world development for fiction
     """
     
-    def __init__(self, openai_api_key: str = None):
+    def __init__(self, openai_api_key: str = None, knowledge_index: KnowledgeIndex = None,
+                 llm_client: LLMClientPool = None):
         self.name = "Development Agent"
-        self.openai_client = openai.OpenAI(api_key=openai_api_key) if openai_api_key else None
+        # Shared async client pool instead of a blocking per-instance client
+        self.llm_client = llm_client or (LLMClientPool(api_key=openai_api_key) if openai_api_key else llm_client_module.get_llm_client())
         self.embeddings = OpenAIEmbeddings(openai_api_key=openai_api_key) if openai_api_key else None
         
         # RAG Knowledge Base
@@ -66,80 +96,31 @@ class DevelopmentAgent:
             ]
         }
         
-        # Initialize vector store (placeholder)
-        self.vector_store = None
+        # Incremental vector store: edits only re-embed the documents that changed.
+        # Without an explicit index every agent uses the process-wide one, so embeddings are not copied per agent.
+        self.vector_store = knowledge_index or get_knowledge_index(embeddings=self.embeddings)
         self._initialize_knowledge_base()
     
     def _initialize_knowledge_base(self):
         """
         Initialize the RAG knowledge base with writing guides and techniques
         """
-        # This would load actual writing guides, character development books, etc.
-        # For now, we'll use placeholder data
-        self.knowledge_base = {
-            "character_development": self._load_character_development_knowledge(),
-            "world_building": self._load_world_building_knowledge(),
-            "genre_conventions": self._load_genre_conventions()
-        }
+        # Shared read-only knowledge base (same objects for every agent instance).
+        # Unchanged documents are skipped, so sharing an index makes this a no-op after the first agent.
+        self.knowledge_base = knowledge_registry_module.get_development_knowledge()
+        self.vector_store.upsert_documents(flatten_knowledge(self.knowledge_base))
     
-    def _load_character_development_knowledge(self) -> Dict[str, Any]:
-        """Load character development knowledge base"""
-        return {
-            "archetypes": [
-                "Hero", "Mentor", "Threshold Guardian", "Herald", "Shapeshifter", 
-                "Shadow", "Ally", "Trickster"
-            ],
-            "personality_traits": [
-                "Extroverted", "Introverted", "Analytical", "Creative", "Practical",
-                "Idealistic", "Cautious", "Adventurous", "Loyal", "Independent"
-            ],
-            "character_goals": [
-                "External Goal", "Internal Goal", "Relationship Goal", "Professional Goal",
-                "Personal Growth Goal", "Survival Goal", "Revenge Goal", "Discovery Goal"
-            ],
-            "conflict_types": [
-                "Man vs Man", "Man vs Nature", "Man vs Society", "Man vs Self",
-                "Man vs Technology", "Man vs Supernatural"
-            ]
-        }
+    def update_knowledge(self, doc_id: str, text: str, metadata: Dict[str, Any] = None) -> int:
+        """Add or replace a single knowledge document without rebuilding the index"""
+        return self.vector_store.upsert_document(doc_id, text, metadata)
     
-    def _load_world_building_knowledge(self) -> Dict[str, Any]:
-        """Load world building knowledge base"""
-        return {
-            "world_elements": [
-                "Geography", "Climate", "Culture", "Politics", "Economy",
-                "Technology", "Magic Systems", "Religion", "History", "Social Structure"
-            ],
-            "atmosphere_types": [
-                "Dark and Gritty", "Light and Hopeful", "Mysterious", "Tense",
-                "Peaceful", "Chaotic", "Orderly", "Romantic", "Dangerous"
-            ],
-            "time_periods": [
-                "Ancient", "Medieval", "Renaissance", "Industrial", "Modern",
-                "Future", "Post-Apocalyptic", "Alternate History"
-            ]
-        }
+    def remove_knowledge(self, doc_id: str) -> bool:
+        """Remove a knowledge document from the index"""
+        return self.vector_store.delete_document(doc_id)
     
-    def _load_genre_conventions(self) -> Dict[str, Any]:
-        """Load genre-specific conventions"""
-        return {
-            "fantasy": {
-                "elements": ["Magic", "Fantasy Races", "Quests", "Good vs Evil"],
-                "tropes": ["Chosen One", "Dark Lord", "Magical Artifacts", "Hidden World"]
-            },
-            "sci_fi": {
-                "elements": ["Advanced Technology", "Space Travel", "Aliens", "Future Society"],
-                "tropes": ["AI Rebellion", "Time Travel", "Space Opera", "Dystopia"]
-            },
-            "mystery": {
-                "elements": ["Crime", "Investigation", "Clues", "Suspense"],
-                "tropes": ["Detective", "Red Herring", "Whodunit", "Amateur Sleuth"]
-            },
-            "romance": {
-                "elements": ["Love Story", "Emotional Conflict", "Happy Ending"],
-                "tropes": ["Enemies to Lovers", "Second Chance", "Forbidden Love"]
-            }
-        }
+    def search_knowledge(self, query: str, k: int = 4) -> List[Dict[str, Any]]:
+        """Retrieve the most relevant knowledge chunks for a query"""
+        return [result.__dict__ for result in self.vector_store.search(query, k)]
     
     async def create_characters(self, genre: str, tone: str, requirements: str) -> List[Character]:
         """
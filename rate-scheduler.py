@@ -0,0 +1,232 @@
+import asyncio
+import heapq
+import itertools
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Any, Optional
+
+class MonotonicClock:
+    """Wall clock used in production"""
+
+    def now(self) -> float:
+        return time.monotonic()
+
+    async def sleep(self, seconds: float):
+        await asyncio.sleep(seconds)
+
+class FakeClock:
+    """
+    Manually advanced clock for tests: sleepers wake only when advance() passes their deadline
+    """
+
+    def __init__(self, start: float = 0.0):
+        self._now = start
+        self._sleepers: List[Any] = []
+        self._counter = itertools.count()
+
+    def now(self) -> float:
+        return self._now
+
+    async def sleep(self, seconds: float):
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._sleepers, (self._now + max(seconds, 0.0), next(self._counter), future))
+        await future
+
+    def advance(self, seconds: float):
+        self._now += seconds
+        while self._sleepers and self._sleepers[0][0] <= self._now:
+            _, _, future = heapq.heappop(self._sleepers)
+            if not future.done():
+                future.set_result(None)
+
+class TokenBucket:
+    """Refills continuously at `rate` per second up to `capacity`; may go negative after reconciliation"""
+
+    def __init__(self, rate_per_minute: float, capacity: float, clock):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity
+        self.level = capacity
+        self.clock = clock
+        self.updated = clock.now()
+
+    def refill(self):
+        now = self.clock.now()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        self.refill()
+        return max(0.0, (amount - self.level) / self.rate)
+
+@dataclass(order=True)
+class _Waiter:
+    tag: float
+    seq: int
+    agent: str = field(compare=False)
+    tokens: int = field(compare=False)
+    enqueued: float = field(compare=False)
+    future: Any = field(compare=False)
+
+@dataclass
+class Ticket:
+    agent: str
+    estimated_tokens: int
+    waited: float
+
+class RateScheduler:
+    """
+    Global token-per-minute / request-per-minute admission control shared by all agents.
+
+    Each call's token cost (prompt plus completion budget, counted by the caller)
+    is estimated up front and the call is admitted only when
+    both buckets can pay for it. Waiting calls are ordered by weighted fair queueing
+    (start-time tags of cost / weight), so a burst from one agent cannot starve the
+    others. Actual usage is reconciled after each response.
+    """
+
+    def __init__(self, tokens_per_minute: float, requests_per_minute: float,
+                 weights: Dict[str, float] = None, clock=None, burst_seconds: float = 10.0):
+        self.clock = clock or MonotonicClock()
+        self.tokens_per_minute = tokens_per_minute
+        self.requests_per_minute = requests_per_minute
+        self.weights = dict(weights or {})
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute * burst_seconds / 60.0, self.clock)
+        self.requests = TokenBucket(requests_per_minute, max(1.0, requests_per_minute * burst_seconds / 60.0), self.clock)
+
+        self._queue: List[_Waiter] = []
+        self._seq = itertools.count()
+        self._virtual_time = 0.0
+        self._last_tag: Dict[str, float] = {}
+        self._timer: Optional[asyncio.Task] = None
+        self._agent_stats: Dict[str, Dict[str, float]] = {}
+        self._rate_limited_until = 0.0
+
+    async def acquire(self, agent: str, tokens: int) -> Ticket:
+        """Wait until the call fits under the TPM/RPM limits"""
+        tokens = int(min(tokens, self.tokens.capacity))
+        weight = self.weights.get(agent, 1.0)
+        tag = max(self._virtual_time, self._last_tag.get(agent, 0.0)) + tokens / weight
+        self._last_tag[agent] = tag
+
+        waiter = _Waiter(tag, next(self._seq), agent, tokens, self.clock.now(),
+                         asyncio.get_running_loop().create_future())
+        heapq.heappush(self._queue, waiter)
+        self._stats_for(agent)["queued"] += 1
+        self._pump()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if not waiter.future.done() or waiter.future.cancelled():
+                self._stats_for(agent)["queued"] -= 1
+                self._stats_for(agent)["cancelled"] += 1
+            else:
+                # Admitted just as we were cancelled: give the capacity back
+                self.reconcile(Ticket(agent, tokens, 0.0), 0)
+            self._pump()
+            raise
+        waited = self.clock.now() - waiter.enqueued
+        stats = self._stats_for(agent)
+        stats["total_wait"] += waited
+        stats["max_wait"] = max(stats["max_wait"], waited)
+        return Ticket(agent, tokens, waited)
+
+    def reconcile(self, ticket: Ticket, actual_tokens: int):
+        """Correct the token bucket once the provider reports real usage"""
+        self.tokens.refill()
+        self.tokens.level = min(self.tokens.capacity, self.tokens.level + ticket.estimated_tokens - actual_tokens)
+        self._stats_for(ticket.agent)["actual_tokens"] += actual_tokens
+        self._pump()
+
+    def penalize(self, retry_after: float = 1.0):
+        """The provider still returned 429: drain both buckets and pause admissions"""
+        self.tokens.refill()
+        self.requests.refill()
+        self.tokens.level = min(self.tokens.level, 0.0)
+        self.requests.level = min(self.requests.level, 0.0)
+        self._rate_limited_until = max(self._rate_limited_until, self.clock.now() + retry_after)
+        self._pump()
+
+    def get_stats(self) -> Dict[str, Any]:
+        self.tokens.refill()
+        self.requests.refill()
+        return {
+            "tokens_per_minute": self.tokens_per_minute,
+            "requests_per_minute": self.requests_per_minute,
+            "token_bucket_level": round(self.tokens.level, 1),
+            "request_bucket_level": round(self.requests.level, 2),
+            "queue_depth": sum(1 for waiter in self._queue if not waiter.future.done()),
+            "agents": {agent: dict(stats) for agent, stats in self._agent_stats.items()}
+        }
+
+    def _pump(self):
+        """Admit queued calls in tag order while both buckets can pay; otherwise arm a timer"""
+        while self._queue and self._queue[0].future.done():
+            heapq.heappop(self._queue)
+        while self._queue:
+            head = self._queue[0]
+            wait = max(
+                self.tokens.wait_time(head.tokens),
+                self.requests.wait_time(1),
+                self._rate_limited_until - self.clock.now()
+            )
+            if wait > 0:
+                self._arm_timer(wait)
+                return
+            heapq.heappop(self._queue)
+            self.tokens.level -= head.tokens
+            self.requests.level -= 1
+            self._virtual_time = head.tag
+            stats = self._stats_for(head.agent)
+            stats["queued"] -= 1
+            stats["admitted"] += 1
+            stats["estimated_tokens"] += head.tokens
+            head.future.set_result(None)
+            while self._queue and self._queue[0].future.done():
+                heapq.heappop(self._queue)
+
+    def _arm_timer(self, wait: float):
+        if self._timer and not self._timer.done():
+            self._timer.cancel()
+
+        async def _wake():
+            await self.clock.sleep(wait)
+            self._timer = None
+            self._pump()
+
+        self._timer = asyncio.get_running_loop().create_task(_wake())
+
+    def _stats_for(self, agent: str) -> Dict[str, float]:
+        if agent not in self._agent_stats:
+            self._agent_stats[agent] = {
+                "weight": self.weights.get(agent, 1.0), "queued": 0, "admitted": 0, "cancelled": 0,
+                "estimated_tokens": 0, "actual_tokens": 0, "total_wait": 0.0, "max_wait": 0.0
+            }
+        return self._agent_stats[agent]
+
+# Example usage
+async def main():
+    clock = FakeClock()
+    scheduler = RateScheduler(tokens_per_minute=60000, requests_per_minute=60,
+                              weights={"writing": 1.0, "editing": 2.0}, clock=clock)
+    admitted = []
+
+    async def call(agent: str, n: int):
+        await scheduler.acquire(agent, 2000)
+        admitted.append((round(clock.now(), 1), agent, n))
+
+    # A writing burst arrives first, then editing work; editing still gets its share
+    tasks = [asyncio.create_task(call("writing", n)) for n in range(20)]
+    tasks += [asyncio.create_task(call("editing", n)) for n in range(10)]
+    await asyncio.sleep(0)
+    for _ in range(60):
+        clock.advance(1.0)
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+    await asyncio.gather(*tasks)
+
+    for when, agent, n in admitted[:18]:
+        print(f"t={when:>5}s {agent} #{n}")
+    print(scheduler.get_stats())
+
+if __name__ == "__main__":
+    asyncio.run(main())
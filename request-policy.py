@@ -0,0 +1,266 @@
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Dict, Any, Awaitable, Callable, Optional
+
+import httpx
+import openai
+
+# Errors worth retrying: throttling, timeouts, dropped connections and 5xx.
+# Anything else (bad request, auth, not found, content filter) fails fast.
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+    httpx.TransportError,
+    asyncio.TimeoutError
+)
+
+def is_retryable(error: BaseException) -> bool:
+    if isinstance(error, RETRYABLE_ERRORS):
+        return True
+    status = getattr(error, "status_code", None)
+    return status in (408, 409, 429) or (status is not None and status >= 500)
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Seconds the provider asked us to wait (Retry-After / retry-after-ms), if any"""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000.0
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass
+    return None
+
+class LatencyTracker:
+    """Sliding window of recent latencies with percentile lookups"""
+
+    def __init__(self, window: int = 500):
+        self.samples: deque = deque(maxlen=window)
+
+    def add(self, latency: float):
+        self.samples.append(latency)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+class RequestPolicy:
+    """
+    Retries with exponential backoff and full jitter, plus request hedging.
+
+    An attempt that has not finished after the recent p95 latency (per key,
+    e.g. per model) gets a duplicate and the first success wins. Hedges are
+    capped at hedge_budget of primary requests so the extra load stays bounded.
+    Only idempotent calls are retried or hedged.
+
+    A losing backup is cancelled. A losing primary is left to finish in the
+    background (its request is already being served) so the unhedged latency
+    distribution, and with it the p99 saving, is measured rather than guessed.
+    Its result is handed to on_discarded so the caller can account for its usage.
+    """
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.5, max_delay: float = 20.0,
+                 hedge_quantile: float = 0.95, hedge_budget: float = 0.05, min_samples: int = 20,
+                 window: int = 200, rng: random.Random = None, sleep: Callable = asyncio.sleep,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge_quantile = hedge_quantile
+        self.hedge_budget = hedge_budget
+        self.min_samples = min_samples
+        self.window = window
+        self.rng = rng or random.Random()
+        self.sleep = sleep
+        self.clock = clock
+        self._primary: Dict[str, LatencyTracker] = {}
+        self._attempts: Dict[str, LatencyTracker] = {}
+        self._observed: Dict[str, LatencyTracker] = {}
+        self.stats = {
+            "calls": 0, "attempts": 0, "retries": 0, "failures": 0,
+            "hedges_sent": 0, "hedge_wins": 0, "hedges_denied": 0, "discarded": 0
+        }
+
+    @property
+    def hedging_enabled(self) -> bool:
+        return bool(self.hedge_quantile) and self.hedge_budget > 0
+
+    def backoff(self, attempt: int, error: BaseException = None) -> float:
+        """Full-jitter exponential delay, never shorter than the provider's Retry-After"""
+        delay = self.rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        requested = retry_after(error) if error is not None else None
+        return max(delay, requested or 0.0)
+
+    def hedge_delay(self, key: str) -> Optional[float]:
+        tracker = self._primary.get(key)
+        if not self.hedging_enabled or tracker is None or len(tracker) < self.min_samples:
+            return None
+        return tracker.percentile(self.hedge_quantile)
+
+    async def execute(self, fn: Callable[[], Awaitable[Any]], key: str = "default", idempotent: bool = True,
+                      hedge: bool = True, on_discarded: Callable[[Any], None] = None) -> Any:
+        """
+        Run fn() under the policy; fn must start a fresh request on every call.
+        on_discarded receives the result of a losing primary that still completed.
+        """
+        self.stats["calls"] += 1
+        attempts = self.max_attempts if idempotent else 1
+        started = self.clock()
+        for attempt in range(attempts):
+            self.stats["attempts"] += 1
+            attempt_started = self.clock()
+            try:
+                if hedge and idempotent:
+                    result = await self._hedged(fn, key, on_discarded)
+                else:
+                    result = await self._timed(fn, key)
+                self._tracker(self._attempts, key).add(self.clock() - attempt_started)
+                self._tracker(self._observed, key).add(self.clock() - started)
+                return result
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if attempt + 1 >= attempts or not is_retryable(e):
+                    self.stats["failures"] += 1
+                    raise
+                self.stats["retries"] += 1
+                await self.sleep(self.backoff(attempt, e))
+
+    async def _timed(self, fn: Callable[[], Awaitable[Any]], key: str) -> Any:
+        started = self.clock()
+        result = await fn()
+        self._tracker(self._primary, key).add(self.clock() - started)
+        return result
+
+    async def _hedged(self, fn: Callable[[], Awaitable[Any]], key: str,
+                      on_discarded: Callable[[Any], None] = None) -> Any:
+        delay = self.hedge_delay(key)
+        started = self.clock()
+        primary = asyncio.ensure_future(fn())
+        if delay is None:
+            return await self._finish_primary(primary, key, started)
+
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+        except asyncio.CancelledError:
+            primary.cancel()
+            raise
+        if done:
+            return await self._finish_primary(primary, key, started)
+        if self.stats["hedges_sent"] >= self.hedge_budget * max(1, self.stats["calls"]):
+            self.stats["hedges_denied"] += 1
+            return await self._finish_primary(primary, key, started)
+
+        self.stats["hedges_sent"] += 1
+        backup = asyncio.ensure_future(fn())
+        pending = {primary, backup}
+        winner, error = None, None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        winner = task
+                        if task is backup:
+                            self.stats["hedge_wins"] += 1
+                        else:
+                            self._tracker(self._primary, key).add(self.clock() - started)
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                if task is primary and winner is backup:
+                    task.add_done_callback(lambda t: self._record_detached(t, key, started, on_discarded))
+                else:
+                    task.cancel()
+
+    async def _finish_primary(self, primary: asyncio.Future, key: str, started: float) -> Any:
+        try:
+            result = await primary
+        except asyncio.CancelledError:
+            primary.cancel()
+            raise
+        self._tracker(self._primary, key).add(self.clock() - started)
+        return result
+
+    def _record_detached(self, task: asyncio.Future, key: str, started: float,
+                         on_discarded: Callable[[Any], None] = None):
+        if not task.cancelled() and task.exception() is None:
+            self._tracker(self._primary, key).add(self.clock() - started)
+            self.stats["discarded"] += 1
+            if on_discarded is not None:
+                on_discarded(task.result())
+
+    def _tracker(self, trackers: Dict[str, LatencyTracker], key: str) -> LatencyTracker:
+        if key not in trackers:
+            trackers[key] = LatencyTracker(self.window)
+        return trackers[key]
+
+    def get_stats(self) -> Dict[str, Any]:
+        latencies = {}
+        for key, observed in self._observed.items():
+            primary, attempts = self._primary.get(key), self._attempts.get(key)
+            p99_unhedged = primary.percentile(0.99) if primary else None
+            p99_attempt = attempts.percentile(0.99) if attempts else None
+            latencies[key] = {
+                # End to end, including retries and their backoff
+                "p50": observed.percentile(0.50),
+                "p95": observed.percentile(0.95),
+                "p99": observed.percentile(0.99),
+                # Single successful attempt with and without hedging
+                "p99_attempt": p99_attempt,
+                "p99_unhedged": p99_unhedged,
+                "p99_saved": (
+                    max(0.0, p99_unhedged - p99_attempt)
+                    if p99_attempt is not None and p99_unhedged is not None else None
+                ),
+                "hedge_delay": self.hedge_delay(key)
+            }
+        calls = self.stats["calls"]
+        return dict(
+            self.stats,
+            hedge_rate=self.stats["hedges_sent"] / calls if calls else 0.0,
+            hedge_budget=self.hedge_budget,
+            latencies=latencies
+        )
+
+# Example usage
+async def main():
+    rng = random.Random(7)
+    policy = RequestPolicy(hedge_budget=0.1, min_samples=20, rng=random.Random(1))
+
+    async def flaky_provider():
+        # Mostly fast, with a heavy tail
+        await asyncio.sleep(0.5 if rng.random() < 0.02 else rng.uniform(0.01, 0.03))
+        return "ok"
+
+    for _ in range(300):
+        await policy.execute(flaky_provider, key="gpt-4o-mini")
+    await asyncio.sleep(0.6)  # let detached primaries report their latency
+
+    failures = iter([True, True, False])
+
+    async def unstable():
+        if next(failures):
+            raise openai.APIConnectionError(request=httpx.Request("POST", "http://mock/v1"))
+        return "recovered"
+
+    policy.base_delay = 0.01
+    print(f"Retried call: {await policy.execute(unstable, key='retry-demo', hedge=False)}")
+    stats = policy.get_stats()
+    print({k: v for k, v in stats.items() if k != "latencies"})
+    print(stats["latencies"]["gpt-4o-mini"])
+
+if __name__ == "__main__":
+    asyncio.run(main())
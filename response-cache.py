@@ -0,0 +1,230 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Any, Callable, Optional, Tuple
+
+import numpy as np
+
+# Recency updates from hits are batched; reads never hold a write transaction open
+TOUCH_BATCH = 64
+
+def prompt_key(model: str, messages: List[Dict[str, str]], params: Dict[str, Any] = None) -> str:
+    """Exact-match key: hash of the model, full message list and sampling parameters"""
+    payload = json.dumps({"model": model, "messages": messages, "params": params or {}}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def scope_key(model: str, params: Dict[str, Any] = None, agent: str = None) -> str:
+    """Semantic matches are only allowed between calls with the same model, params and agent"""
+    payload = json.dumps({"model": model, "params": params or {}, "agent": agent}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+class ResponseCache:
+    """
+    Two-tier cache for LLM responses.
+
+    The exact tier is keyed by the prompt hash and model parameters. The optional
+    semantic tier embeds the prompt and reuses a response whose prompt embedding
+    has cosine similarity >= semantic_threshold. Entries live in SQLite (on disk
+    when `path` is set) and the least recently used are evicted past max_entries
+    or max_bytes. SQLite IO runs on worker threads so lookups never block the
+    event loop.
+    """
+
+    def __init__(self, path: str = None, max_entries: int = 10000, max_bytes: int = 256 * 1024 * 1024,
+                 semantic_threshold: float = None, embed_fn: Callable = None,
+                 disabled_agents: List[str] = None):
+        self.path = path or ":memory:"
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.semantic_threshold = semantic_threshold
+        self.embed_fn = embed_fn
+        self.disabled_agents = set(disabled_agents or [])
+        self.stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL" if self.path != ":memory:" else "PRAGMA journal_mode=MEMORY")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                scope TEXT NOT NULL,
+                agent TEXT,
+                response TEXT NOT NULL,
+                embedding BLOB,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+        self._db.commit()
+        # scope -> (keys, embedding matrix); rebuilt lazily after writes
+        self._semantic: Dict[str, Tuple[List[str], np.ndarray]] = {}
+        # Embeddings computed for a miss, reused when its response is stored
+        self._pending_embeddings: Dict[str, List[float]] = {}
+        # key -> last hit time, written back in batches
+        self._touched: Dict[str, float] = {}
+
+    @property
+    def semantic_enabled(self) -> bool:
+        return self.semantic_threshold is not None and self.embed_fn is not None
+
+    def is_enabled_for(self, agent: str = None) -> bool:
+        return agent not in self.disabled_agents
+
+    async def get(self, model: str, messages: List[Dict[str, str]], params: Dict[str, Any] = None,
+                  agent: str = None) -> Optional[Dict[str, Any]]:
+        """Return a cached response dict, trying the exact tier then the semantic tier"""
+        if not self.is_enabled_for(agent):
+            return None
+        key = prompt_key(model, messages, params)
+        response = await asyncio.to_thread(self._load, key)
+        if response is not None:
+            self.stats["exact_hits"] += 1
+            return response
+
+        if self.semantic_enabled:
+            embedding = await self._embed(messages)
+            if len(self._pending_embeddings) > 256:
+                self._pending_embeddings.clear()
+            self._pending_embeddings[key] = embedding
+            match = await asyncio.to_thread(self._nearest, scope_key(model, params, agent), embedding)
+            if match is not None:
+                response = await asyncio.to_thread(self._load, match)
+                if response is not None:
+                    self.stats["semantic_hits"] += 1
+                    return response
+
+        self.stats["misses"] += 1
+        return None
+
+    async def put(self, model: str, messages: List[Dict[str, str]], response: Dict[str, Any],
+                  params: Dict[str, Any] = None, agent: str = None):
+        if not self.is_enabled_for(agent):
+            return
+        key = prompt_key(model, messages, params)
+        scope = scope_key(model, params, agent)
+        embedding = None
+        if self.semantic_enabled:
+            vector = self._pending_embeddings.pop(key, None) or await self._embed(messages)
+            embedding = np.asarray(vector, dtype=np.float32).tobytes()
+        await asyncio.to_thread(self._store, key, scope, agent, json.dumps(response), embedding)
+        self.stats["stores"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
+            self._semantic.clear()
+
+    def close(self):
+        with self._lock:
+            self._flush_touched()
+            self._db.commit()
+            self._db.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        lookups = self.stats["exact_hits"] + self.stats["semantic_hits"] + self.stats["misses"]
+        hits = self.stats["exact_hits"] + self.stats["semantic_hits"]
+        return dict(self.stats, entries=entries, bytes=size, hit_rate=hits / lookups if lookups else 0.0)
+
+    def _load(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._touched[key] = time.time()
+            if len(self._touched) >= TOUCH_BATCH:
+                self._flush_touched()
+                self._db.commit()
+        return json.loads(row[0])
+
+    def _store(self, key: str, scope: str, agent: str, body: str, embedding: Optional[bytes]):
+        now = time.time()
+        with self._lock:
+            # Recency must be current before eviction picks the least recently used
+            self._flush_touched()
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, scope, agent, body, embedding, len(body), now, now)
+            )
+            self._evict()
+            self._db.commit()
+            self._semantic.pop(scope, None)
+
+    def _flush_touched(self):
+        """Write batched hit times; the caller holds the lock and commits"""
+        if self._touched:
+            self._db.executemany(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in self._touched.items()]
+            )
+            self._touched.clear()
+
+    def _evict(self):
+        entries, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        while entries > self.max_entries or size > self.max_bytes:
+            rows = self._db.execute(
+                "SELECT key, scope, size FROM responses ORDER BY accessed_at LIMIT ?",
+                (max(1, entries - self.max_entries, entries // 20),)
+            ).fetchall()
+            if not rows:
+                break
+            for key, scope, row_size in rows:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._semantic.pop(scope, None)
+                entries -= 1
+                size -= row_size
+                self.stats["evictions"] += 1
+                if entries <= self.max_entries and size <= self.max_bytes:
+                    break
+
+    def _nearest(self, scope: str, embedding: List[float]) -> Optional[str]:
+        with self._lock:
+            if scope not in self._semantic:
+                rows = self._db.execute(
+                    "SELECT key, embedding FROM responses WHERE scope = ? AND embedding IS NOT NULL", (scope,)
+                ).fetchall()
+                keys = [key for key, _ in rows]
+                matrix = np.stack([np.frombuffer(blob, dtype=np.float32) for _, blob in rows]) if rows else None
+                self._semantic[scope] = (keys, matrix)
+            keys, matrix = self._semantic[scope]
+        if matrix is None:
+            return None
+        query = np.asarray(embedding, dtype=np.float32)
+        similarities = matrix @ query / (np.linalg.norm(matrix, axis=1) * (np.linalg.norm(query) or 1.0) + 1e-12)
+        best = int(similarities.argmax())
+        return keys[best] if similarities[best] >= self.semantic_threshold else None
+
+    async def _embed(self, messages: List[Dict[str, str]]) -> List[float]:
+        text = "\n".join(message.get("content", "") for message in messages)
+        vectors = self.embed_fn([text])
+        if asyncio.iscoroutine(vectors):
+            vectors = await vectors
+        return vectors[0]
+
+# Example usage
+async def main():
+    def toy_embed(texts):
+        return [[text.count(c) for c in "abcdefghijklmnopqrstuvwxyz"] for text in texts]
+
+    cache = ResponseCache(semantic_threshold=0.98, embed_fn=toy_embed)
+    messages = [{"role": "user", "content": "Create characters for a fantasy novel about a young mage"}]
+    await cache.put("gpt-4o-mini", messages, {"text": "Aria Stormwind..."}, agent="development")
+
+    print(await cache.get("gpt-4o-mini", messages, agent="development"))
+    similar = [{"role": "user", "content": "Create characters for a fantasy novel about a young mage!"}]
+    print(await cache.get("gpt-4o-mini", similar, agent="development"))
+    print(await cache.get("gpt-4o", messages, agent="development"))
+    print(cache.get_stats())
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,157 @@
+import asyncio
+import json
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Any, Callable, Optional, Tuple
+
+# Phrases that customers use interchangeably, mapped to one canonical form
+SYNONYMS = {
+    "science fiction": "sci_fi",
+    "sci fi": "sci_fi",
+    "scifi": "sci_fi",
+    "sf": "sci_fi",
+    "sci_fi": "sci_fi",
+    "high fantasy": "fantasy",
+    "epic fantasy": "fantasy epic",
+    "whodunit": "mystery",
+    "whodunnit": "mystery",
+    "detective": "mystery detective",
+    "romcom": "romance comedy",
+    "rom com": "romance comedy",
+    "nonfiction": "non-fiction",
+    "non fiction": "non-fiction",
+    "wizard": "mage",
+    "sorcerer": "mage",
+    "sorceress": "mage",
+    "magician": "mage",
+    "uncovers": "discovers",
+    "finds": "discovers",
+    "abilities": "powers",
+    "magic powers": "powers",
+    "youthful": "young",
+    "teen": "young",
+    "teenage": "young"
+}
+
+STOPWORDS = {"a", "an", "the", "and", "of", "with", "who", "that", "her", "his", "their", "its"}
+
+_SYNONYM_PATTERN = re.compile(
+    r"\b(" + "|".join(re.escape(phrase) for phrase in sorted(SYNONYMS, key=len, reverse=True)) + r")\b"
+)
+
+def normalize_query(text: str) -> str:
+    """
+    Canonicalize a brief fragment: Unicode/case folding, punctuation and
+    whitespace collapsing, synonym mapping and stopword removal.
+    """
+    text = unicodedata.normalize("NFKC", text or "").casefold()
+    text = re.sub(r"[-/]", " ", text)
+    text = re.sub(r"[^\w\s]", " ", text)
+    text = re.sub(r"\s+", " ", text).strip()
+    text = _SYNONYM_PATTERN.sub(lambda m: SYNONYMS[m.group(1)], text)
+    return " ".join(word for word in text.split() if word not in STOPWORDS)
+
+def retrieval_key(namespace: str, genre: str, tone: str = "", requirements: str = "") -> Tuple[str, str, str, str]:
+    """Cache key for a (genre, tone, requirements) retrieval"""
+    return (namespace, normalize_query(genre), normalize_query(tone), normalize_query(requirements))
+
+class RetrievalCache:
+    """
+    LRU cache for retrieval results with TTL and size-based eviction.
+
+    Every entry remembers the index version it was computed against, so any
+    index update invalidates older entries on their next lookup.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 8 * 1024 * 1024, ttl: float = 600.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.clock = clock
+        self._entries: "OrderedDict[Any, Tuple[Any, float, int, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    def get(self, key, index_version: int = 0) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            value, expires_at, size, version = entry
+            if version != index_version or expires_at <= self.clock():
+                self._remove(key)
+                self.stats["invalidations" if version != index_version else "expirations"] += 1
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return value
+
+    def put(self, key, value: Any, index_version: int = 0):
+        size = self._size_of(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, self.clock() + self.ttl, size, index_version)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.stats["evictions"] += 1
+
+    async def get_or_compute(self, key, compute: Callable, index_version: int = 0) -> Any:
+        """Return the cached value or await compute() and cache its result"""
+        value = self.get(key, index_version)
+        if value is None:
+            value = compute()
+            if asyncio.iscoroutine(value):
+                value = await value
+            self.put(key, value, index_version)
+        return value
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return dict(
+            self.stats,
+            entries=len(self._entries),
+            bytes=self._bytes,
+            hit_rate=self.stats["hits"] / lookups if lookups else 0.0
+        )
+
+    def _remove(self, key):
+        _, _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    @staticmethod
+    def _size_of(value: Any) -> int:
+        return len(json.dumps(value, default=lambda o: getattr(o, "__dict__", str(o))))
+
+# Example usage
+async def main():
+    cache = RetrievalCache(ttl=60)
+    briefs = [
+        ("Fantasy", "Epic", "Young mage discovers her powers"),
+        ("fantasy ", "epic", "A young   wizard uncovers her powers!"),
+        ("High Fantasy", "EPIC", "young sorceress finds her magic powers")
+    ]
+    for genre, tone, requirements in briefs:
+        key = retrieval_key("characters", genre, tone, requirements)
+        result = await cache.get_or_compute(key, lambda: {"retrieved": ["fantasy conventions"]}, index_version=1)
+        print(f"{key} -> {result}")
+    print(f"Cache stats: {cache.get_stats()}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
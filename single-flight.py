@@ -0,0 +1,99 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Dict, Any, Awaitable, Callable, Hashable, Tuple
+
+def call_key(namespace: str, *args: Any) -> Tuple[str, ...]:
+    """
+    Coalescing key: the exact arguments, ignoring only case and runs of whitespace.
+    Lossier normalizations (stopwords, synonyms) would hand one caller's result to another.
+    """
+    return (namespace,) + tuple(" ".join(str(arg).lower().split()) for arg in args)
+
+@dataclass
+class _Call:
+    task: asyncio.Task
+    waiters: int = 0
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls into one in-flight computation.
+
+    The first caller for a key starts the computation; callers arriving while it
+    runs await the same task and receive the same result object (or exception).
+    A waiter that is cancelled only detaches itself; the computation is cancelled
+    once every waiter has gone. Nothing is cached after the call completes.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self.stats = {"calls": 0, "coalesced": 0, "errors": 0, "cancelled": 0}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run fn() unless an identical call is already in flight, then share its outcome"""
+        self.stats["calls"] += 1
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda task: self._finish(key, call))
+        else:
+            self.stats["coalesced"] += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if not call.task.done() and call.waiters == 1:
+                # Last interested caller left: stop the shared work
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.stats, in_flight=len(self._calls))
+
+    def _finish(self, key: Hashable, call: _Call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        if call.task.cancelled():
+            self.stats["cancelled"] += 1
+        elif call.task.exception() is not None:
+            self.stats["errors"] += 1
+
+# Example usage
+async def main():
+    flight = SingleFlight()
+    runs = []
+
+    async def expensive(brief: str):
+        runs.append(brief)
+        await asyncio.sleep(0.1)
+        return f"characters for {brief}"
+
+    results = await asyncio.gather(*[
+        flight.do(("characters", "fantasy epic young mage"), lambda: expensive("young mage"))
+        for _ in range(5)
+    ])
+    print(f"{len(results)} callers, {len(runs)} computation: {results[0]}")
+
+    async def failing():
+        await asyncio.sleep(0.05)
+        raise ValueError("model unavailable")
+
+    outcomes = await asyncio.gather(*[flight.do("broken", failing) for _ in range(3)], return_exceptions=True)
+    print(f"Errors shared: {outcomes}")
+
+    # Cancelling one of two waiters leaves the shared work running for the other
+    first = asyncio.create_task(flight.do("slow", lambda: expensive("slow brief")))
+    second = asyncio.create_task(flight.do("slow", lambda: expensive("slow brief")))
+    await asyncio.sleep(0.01)
+    first.cancel()
+    print(f"Survivor got: {await second}")
+    print(flight.get_stats())
+
+if __name__ == "__main__":
+    asyncio.run(main())
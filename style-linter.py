@@ -0,0 +1,259 @@
+import asyncio
+import os
+import re
+import statistics
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, asdict
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Tuple
+
+# Mechanical rules: one combined pattern, so a chapter is scanned once for all of them.
+# Each rule is (name, pattern, fix), where fix maps the match to its replacement.
+# Only rules that cannot change meaning belong here: they are applied without review.
+MECHANICAL_RULES = [
+    ("double_space", r"(?<=\S)[ \t]{2,}(?=\S)", lambda m: " "),
+    ("space_before_punctuation", r"[ \t]+(?P<mark>[,.;:!?])(?=\s|$|[a-z])",
+     lambda m: m.group("mark") + ("" if m.end() >= len(m.string) or m.string[m.end()].isspace() else " ")),
+    ("repeated_punctuation", r"(?P<punct>[!?,;])(?P=punct)+", lambda m: m.group("punct"))
+]
+MECHANICAL_PATTERN = re.compile(
+    "|".join(f"(?P<{name}>{pattern})" for name, pattern, _ in MECHANICAL_RULES),
+    re.IGNORECASE
+)
+# Report-only rules: a match may well be intended ("Walla Walla", "Knock knock",
+# "www.example.com", "Node.js"), so they are flagged for the editor and never applied.
+# Case-sensitive; a doubled capitalised word is taken for a name, "The the" is still caught.
+REVIEW_RULES = [
+    ("repeated_word", r"\b(?P<word>[A-Za-z]+)\s+(?![A-Z])(?i:(?P=word))\b(?<!\bhad had)(?<!\bthat that)"),
+    ("missing_space_after_punctuation", r"(?<=[a-z])(?P<stop>[,;:](?=[a-z])|[.!?](?=[A-Z][a-z]))")
+]
+REVIEW_PATTERN = re.compile("|".join(f"(?P<{name}>{pattern})" for name, pattern in REVIEW_RULES))
+MECHANICAL_FIXES = {name: fix for name, _, fix in MECHANICAL_RULES}
+
+IRREGULAR_PARTICIPLES = (
+    "been born brought built caught chosen done drawn driven eaten fallen felt found forgotten given gone "
+    "grown held hidden kept known laid led left lost made meant paid put read seen sent set shaken shot "
+    "shown shut sold spoken spent stolen struck sworn taken taught thought thrown told torn understood "
+    "woken won worn written"
+).split()
+
+# Clichés every style guide flags, plus per-genre lists
+BANNED_PHRASES = {
+    "default": [
+        "at the end of the day", "all of a sudden", "very unique", "in order to", "needless to say",
+        "it goes without saying", "each and every", "suddenly", "literally", "a sense of"
+    ],
+    "fantasy": ["chosen one", "ancient evil", "since time immemorial", "dark lord"],
+    "romance": ["orbs", "released a breath she didn't know she was holding", "core", "smirked"],
+    "mystery": ["little did they know", "the butler did it", "a shiver ran down"],
+    "science fiction": ["as you know", "technobabble"],
+    "non-fiction": ["studies show", "it is a well-known fact", "since the dawn of time"]
+}
+
+MAX_SENTENCE_WORDS = 40
+
+# Below this many characters a manuscript is linted inline; the pool costs more than it saves
+POOL_THRESHOLD = 200_000
+
+@dataclass
+class Issue:
+    rule: str
+    start: int
+    end: int
+    text: str
+    message: str
+    fixable: bool = False
+
+def trie_regex(phrases: List[str]) -> str:
+    """
+    Regex source for a set of phrases with shared prefixes factored out, e.g.
+    ["dark lord", "dawn"] -> "d(?:a(?:rk lord|wn))". The engine then follows one
+    branch per character, like an automaton, instead of trying every phrase.
+    """
+    trie: Dict[str, Any] = {}
+    for phrase in phrases:
+        node = trie
+        for char in phrase.lower():
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: Dict[str, Any]) -> str:
+        ends = "" in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if ends:
+            return "(?:" + body + ")?"
+        return body
+
+    return build(trie)
+
+@lru_cache(maxsize=32)
+def banned_pattern(genre: str = None) -> re.Pattern:
+    """One trie-shaped pattern over the default and genre lists"""
+    phrases = set(BANNED_PHRASES["default"]) | set(BANNED_PHRASES.get((genre or "").lower(), []))
+    return re.compile(r"\b" + trie_regex(sorted(phrases)) + r"\b", re.IGNORECASE)
+
+PASSIVE_PATTERN = re.compile(
+    r"\b" + trie_regex(["am", "is", "are", "was", "were", "be", "been", "being"])
+    + r"\s+(?:\w+ly\s+)?(?:\w+ed|" + trie_regex(IRREGULAR_PARTICIPLES) + r")\b",
+    re.IGNORECASE
+)
+SENTENCE_PATTERN = re.compile(r"[^.!?]+(?:[.!?]+[\"')\]]*|$)")
+
+def fix_text(text: str) -> Tuple[str, int]:
+    """Apply every mechanical fix in one pass; returns the fixed text and the number applied"""
+    applied = 0
+
+    def replace(match: re.Match) -> str:
+        nonlocal applied
+        applied += 1
+        return MECHANICAL_FIXES[_rule(match)](match)
+
+    return MECHANICAL_PATTERN.sub(replace, text), applied
+
+def _rule(match: re.Match, names=MECHANICAL_FIXES) -> str:
+    # lastgroup is the innermost closed group, which can be a rule's own named subgroup
+    for name in names:
+        if match.group(name) is not None:
+            return name
+
+def _in_dialogue(text: str, position: int) -> bool:
+    """Whether position falls inside a quotation opened earlier in the same paragraph"""
+    start = text.rfind("\n", 0, position) + 1
+    before = text[start:position]
+    return before.count('"') % 2 == 1 or before.rfind("\u201c") > before.rfind("\u201d")
+
+def lint_text(text: str, genre: str = None) -> List[Issue]:
+    issues = []
+    for match in MECHANICAL_PATTERN.finditer(text):
+        rule = _rule(match)
+        issues.append(Issue(rule, match.start(), match.end(), match.group(0),
+                            rule.replace("_", " ").capitalize(), fixable=True))
+    review_names = [name for name, _ in REVIEW_RULES]
+    for match in REVIEW_PATTERN.finditer(text):
+        rule = _rule(match, review_names)
+        if rule == "repeated_word" and _in_dialogue(text, match.start()):
+            # "No no no," she said: repetition in speech is a voice, not a slip
+            continue
+        issues.append(Issue(rule, match.start(), match.end(), match.group(0),
+                            f"{rule.replace('_', ' ').capitalize()}: \"{match.group(0)}\" (check it is intended)"))
+    for match in PASSIVE_PATTERN.finditer(text):
+        issues.append(Issue("passive_voice", match.start(), match.end(), match.group(0),
+                            f"Passive voice: \"{match.group(0)}\""))
+    for match in banned_pattern(genre).finditer(text):
+        issues.append(Issue("banned_phrase", match.start(), match.end(), match.group(0),
+                            f"Avoid \"{match.group(0)}\" ({genre or 'house'} style guide)"))
+    issues.extend(_sentence_length_issues(text))
+    issues.sort(key=lambda issue: issue.start)
+    return issues
+
+def _sentence_length_issues(text: str) -> List[Issue]:
+    """Sentences longer than MAX_SENTENCE_WORDS or far above the chapter's own distribution"""
+    sentences = [(m.start(), m.end(), len(m.group(0).split())) for m in SENTENCE_PATTERN.finditer(text)
+                 if m.group(0).strip()]
+    lengths = [words for _, _, words in sentences]
+    if len(lengths) < 2:
+        return []
+    limit = min(MAX_SENTENCE_WORDS, statistics.mean(lengths) + 2.5 * statistics.pstdev(lengths))
+    return [
+        Issue("long_sentence", start, end, text[start:end].strip()[:60], f"Long sentence ({words} words)")
+        for start, end, words in sentences if words > max(limit, 25)
+    ]
+
+def _lint_chapter(text: str, genre: str = None, fix: bool = False) -> Dict[str, Any]:
+    """Pool worker: lint (and optionally fix) one chapter, returning plain data"""
+    fixed, applied = fix_text(text) if fix else (text, 0)
+    issues = lint_text(fixed, genre)
+    return {"text": fixed if fix else None, "fixes_applied": applied, "issues": [asdict(i) for i in issues]}
+
+class StyleLinter:
+    """
+    Local style and grammar pre-pass.
+
+    Mechanical problems (spacing, doubled punctuation) are fixed before any
+    model call; repeated words, missing spaces after punctuation, passive voice,
+    banned phrases and overlong sentences are only reported, so the editing
+    model can be pointed at them without anything being rewritten behind it. Whole manuscripts are
+    linted across chapters on a process pool.
+    """
+
+    def __init__(self, genre: str = None, workers: int = None):
+        self.genre = genre
+        self.workers = workers or int(os.getenv("LINT_WORKERS", os.cpu_count() or 2))
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.stats = {"texts": 0, "chapters": 0, "fixes_applied": 0, "issues": 0, "pooled_runs": 0}
+
+    def fix(self, text: str) -> str:
+        fixed, applied = fix_text(text)
+        self.stats["texts"] += 1
+        self.stats["fixes_applied"] += applied
+        return fixed
+
+    def lint(self, text: str, genre: str = None) -> List[Issue]:
+        issues = lint_text(text, genre or self.genre)
+        self.stats["texts"] += 1
+        self.stats["issues"] += len(issues)
+        return issues
+
+    async def lint_chapters(self, chapters: List[str], genre: str = None, fix: bool = False) -> List[Dict[str, Any]]:
+        """Lint every chapter; large manuscripts fan out over worker processes"""
+        genre = genre or self.genre
+        if sum(len(chapter) for chapter in chapters) < POOL_THRESHOLD:
+            results = [_lint_chapter(chapter, genre, fix) for chapter in chapters]
+        elif self.workers < 2:
+            # Keep the event loop responsive even without spare cores
+            results = await asyncio.to_thread(lambda: [_lint_chapter(chapter, genre, fix) for chapter in chapters])
+        else:
+            loop = asyncio.get_running_loop()
+            try:
+                results = await asyncio.gather(*(
+                    loop.run_in_executor(self._executor(), _lint_chapter, chapter, genre, fix) for chapter in chapters
+                ))
+                self.stats["pooled_runs"] += 1
+            except Exception as e:
+                # e.g. a spawn-based platform that cannot import this module by name
+                print(f"Lint pool unavailable, linting inline: {e}")
+                results = [_lint_chapter(chapter, genre, fix) for chapter in chapters]
+        self.stats["chapters"] += len(chapters)
+        self.stats["fixes_applied"] += sum(result["fixes_applied"] for result in results)
+        self.stats["issues"] += sum(len(result["issues"]) for result in results)
+        return results
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.stats, workers=self.workers, genre=self.genre)
+
+# Example usage
+async def main():
+    import time
+
+    linter = StyleLinter(genre="fantasy")
+    sample = ("The the ancient evil stirred  beneath the mountain .Suddenly the gate was opened by the Dark Lord!! "
+              "At the end of the day,the chosen one was known to everyone.")
+    print(f"Fixed: {linter.fix(sample)}")
+    for issue in linter.lint(linter.fix(sample)):
+        print(f"  {issue.rule}: {issue.message}")
+
+    chapter = " ".join([sample] * 400) + " " + "and then it went on " * 40 + "."
+    chapters = [chapter] * 30
+    started = time.perf_counter()
+    results = await linter.lint_chapters(chapters, fix=True)
+    elapsed = (time.perf_counter() - started) * 1000
+    print(f"{len(chapters)} chapters ({sum(map(len, chapters)) // 1000} KB) linted in {elapsed:.0f} ms, "
+          f"{sum(len(r['issues']) for r in results)} issues")
+    print(linter.get_stats())
+    linter.shutdown()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,123 @@
+import asyncio
+import importlib.util
+import os
+import re
+import sys
+import zipfile
+import xml.etree.ElementTree as ElementTree
+
+import pytest
+
+# Registered by name so export workers can unpickle its render function
+book_export_module = sys.modules.get("book_export")
+if book_export_module is None:
+    spec = importlib.util.spec_from_file_location("book_export", "book-export.py")
+    book_export_module = importlib.util.module_from_spec(spec)
+    sys.modules["book_export"] = book_export_module
+    spec.loader.exec_module(book_export_module)
+BookExporter = book_export_module.BookExporter
+ArtifactStore = book_export_module.ArtifactStore
+Manuscript = book_export_module.Manuscript
+
+OPF = "{http://www.idpf.org/2007/opf}"
+XHTML = "{http://www.w3.org/1999/xhtml}"
+META = {"title": "The Clockwork Heir & Co", "author": "InkWell"}
+
+@pytest.fixture
+def manuscript(tmp_path):
+    manuscript = Manuscript("book_test", ArtifactStore(str(tmp_path)))
+    for number in range(1, 4):
+        text = "\n\n".join(f"Paragraph {p} of chapter {number} <with> \"quotes\" & (parentheses)." for p in range(1, 80))
+        manuscript.add_chapter(number, f"Part {number}", text)
+    return manuscript
+
+def export(exporter, manuscript, fmt):
+    async def scenario():
+        try:
+            return await exporter.export(manuscript, fmt, META)
+        finally:
+            exporter.shutdown()
+    return asyncio.run(scenario())
+
+def test_epub_layout(manuscript):
+    result = export(BookExporter(manuscript.store, workers=1), manuscript, "epub")
+    with zipfile.ZipFile(manuscript.store.path(result.key)) as book:
+        first = book.infolist()[0]
+        assert first.filename == "mimetype" and first.compress_type == zipfile.ZIP_STORED
+        assert book.read("mimetype") == b"application/epub+zip"
+        assert book.testzip() is None
+
+        package = ElementTree.fromstring(book.read("OEBPS/content.opf"))
+        manifest = {item.get("id"): item for item in package.iter(f"{OPF}item")}
+        assert manifest["nav"].get("properties") == "nav"
+        spine = [ref.get("idref") for ref in package.iter(f"{OPF}itemref")]
+        assert spine == ["c1", "c2", "c3"]
+        for idref in spine:
+            page = ElementTree.fromstring(book.read("OEBPS/" + manifest[idref].get("href")))
+            assert len(list(page.iter(f"{XHTML}p"))) == 79
+
+        nav = ElementTree.fromstring(book.read("OEBPS/nav.xhtml"))
+        links = [link.get("href") for link in nav.iter(f"{XHTML}a")]
+        assert links == [manifest[idref].get("href") for idref in spine]
+
+def test_docx_opens_as_a_zip(manuscript):
+    result = export(BookExporter(manuscript.store, workers=1), manuscript, "docx")
+    with zipfile.ZipFile(manuscript.store.path(result.key)) as document:
+        assert document.testzip() is None
+        body = ElementTree.fromstring(document.read("word/document.xml"))
+        texts = [node.text for node in body.iter(f"{{{book_export_module.DOCX_NAMESPACE}}}t")]
+        assert texts[0] == META["title"] and "Chapter 3: Part 3" in texts
+        assert len(texts) == 1 + 3 * 80
+
+def test_pdf_xref_offsets_point_at_their_objects(manuscript):
+    result = export(BookExporter(manuscript.store, workers=1), manuscript, "pdf")
+    with open(manuscript.store.path(result.key), "rb") as f:
+        data = f.read()
+    assert data.startswith(b"%PDF-1.4") and data.endswith(b"%%EOF\n")
+    xref = int(re.search(rb"startxref\n(\d+)\n%%EOF", data).group(1))
+    assert data[xref:xref + 5] == b"xref\n"
+    count = int(re.match(rb"xref\n0 (\d+)\n", data[xref:]).group(1))
+    table = data[xref:].split(b"\n")[2:2 + count]
+    assert table[0] == b"0000000000 65535 f "
+    for number, line in enumerate(table[1:], 1):
+        offset = int(line[:10])
+        assert data[offset:].startswith(f"{number} 0 obj\n".encode("ascii"))
+    assert f"/Size {count}".encode("ascii") in data[xref:]
+
+def test_repeat_export_is_a_cache_hit(manuscript):
+    exporter = BookExporter(manuscript.store, workers=1)
+
+    async def scenario():
+        try:
+            first = await exporter.export(manuscript, "epub", META)
+            again = await exporter.export(manuscript, "epub", META)
+            manuscript.add_chapter(4, "Part 4", "A new chapter.")
+            changed = await exporter.export(manuscript, "epub", META)
+            return first, again, changed
+        finally:
+            exporter.shutdown()
+
+    first, again, changed = asyncio.run(scenario())
+    assert not first.cached and again.cached and again.key == first.key
+    assert not changed.cached and changed.key != first.key
+    assert exporter.stats["exports"] == 2 and exporter.stats["cache_hits"] == 1
+
+def test_concurrent_exports_share_one_render(manuscript):
+    exporter = BookExporter(manuscript.store, workers=1)
+
+    async def scenario():
+        try:
+            return await asyncio.gather(*(exporter.export(manuscript, "pdf", META) for _ in range(5)))
+        finally:
+            exporter.shutdown()
+
+    results = asyncio.run(scenario())
+    assert len({result.key for result in results}) == 1
+    assert exporter.stats["exports"] == 1 and exporter.stats["inline_fallbacks"] == 0
+
+def test_render_errors_are_not_retried_in_a_thread(manuscript):
+    os.remove(manuscript.store.path(manuscript.entries[2].key))
+    exporter = BookExporter(manuscript.store, workers=1)
+    with pytest.raises(FileNotFoundError):
+        export(exporter, manuscript, "docx")
+    assert exporter.stats["inline_fallbacks"] == 0
@@ -0,0 +1,95 @@
+import importlib.util
+
+spec = importlib.util.spec_from_file_location("consistency_checker", "consistency-checker.py")
+consistency_checker_module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(consistency_checker_module)
+ConsistencyChecker = consistency_checker_module.ConsistencyChecker
+NameIndex = consistency_checker_module.NameIndex
+Entry = consistency_checker_module.Entry
+edit_distance = consistency_checker_module.edit_distance
+TRAIT_WINDOW = consistency_checker_module.TRAIT_WINDOW
+
+CHARACTERS = [
+    {"name": "Aria Stormwind", "personality_traits": ["Curious", "Brave", "Determined", "Innocent"]},
+    {"name": "Thorne Blackwood", "personality_traits": ["Wise", "Secretive", "Protective", "Haunted"]}
+]
+WORLD = {"name": "Eldoria", "locations": ["Capital City", "Enchanted Forest", "Ancient Ruins"]}
+CHAPTER = (
+    "Aria Stormwind left the Capital City at dawn. Thorne followed, candid about his past for once. "
+    "By noon Aira reached the Enchanted Forest, where Aria, cowardly and shaking, hid from Malrec. "
+    "Stormwind was not cowardly for long."
+)
+
+def issues(text, checker=None):
+    checker = checker or ConsistencyChecker(CHARACTERS, WORLD)
+    return [(issue.kind, issue.text) for issue in checker.check_chapter(1, text).issues]
+
+def test_example_chapter():
+    report = ConsistencyChecker(CHARACTERS, WORLD).check_chapter(1, CHAPTER)
+    assert [(issue.kind, issue.text) for issue in report.issues] == [
+        ("trait_contradiction", "candid"),
+        ("misspelling", "Aira"),
+        ("trait_contradiction", "cowardly"),
+        ("unknown_name", "Malrec"),
+    ]
+    assert report.issues[1].suggestion == "Aria"
+    assert report.mentions == {"Aria Stormwind": 3, "Capital City": 1, "Thorne Blackwood": 1, "Enchanted Forest": 1}
+    assert report.unknown_names == {"Malrec": 1}
+
+def test_name_index_finds_overlapping_phrases_on_word_boundaries():
+    index = NameIndex()
+    for phrase in ("he", "she", "hers", "his"):
+        index.add(phrase, Entry("character", phrase, phrase))
+    found = [(start, end, entry.phrase) for start, end, entry in index.find("She said hers, his; the shed.")]
+    # "he" inside "She" and "the", "she" inside "shed" are not whole words
+    assert found == [(0, 3, "she"), (9, 13, "hers"), (15, 18, "his")]
+
+def test_name_index_counts_possessives_but_not_contractions():
+    index = NameIndex()
+    index.add("aria", Entry("character", "Aria", "aria"))
+    index.add("don", Entry("character", "Don", "don"))
+    text = "Aria's cloak. Arias. Aria'd. Don't. Don's hat."
+    assert [text[start:end] for start, end, _ in index.find(text)] == ["Aria", "Don"]
+    assert [start for start, _, _ in index.find(text)] == [0, 36]
+
+def test_edit_distance_counts_a_swap_once():
+    assert edit_distance("aira", "aria", 2) == 1
+    assert edit_distance("thorne", "thorn", 2) == 1
+    assert edit_distance("kitten", "sitting", 3) == 3
+    assert edit_distance("malrec", "aria", 2) == 3
+    assert edit_distance("a", "abcdef", 2) == 3
+
+def test_negated_trait_is_not_a_contradiction():
+    assert issues("Aria was not cowardly.") == []
+    assert issues("Aria was never timid.") == []
+    assert issues("Aria wasn't fearful.") == []
+    assert issues("Aria was cowardly.") == [("trait_contradiction", "cowardly")]
+
+def test_trait_window_and_sentence_cut_off():
+    assert issues("Aria left. The cowardly guard stayed.") == []
+    # The window runs from the end of the name to the start of the trait word
+    near = "Aria " + "x" * (TRAIT_WINDOW - 2) + " cowardly"
+    far = "Aria " + "x" * (TRAIT_WINDOW - 1) + " cowardly"
+    assert issues(near) == [("trait_contradiction", "cowardly")]
+    assert issues(far) == []
+    # A trait belongs to the last character named, and only contradicts their own bible entry
+    assert issues("Aria ran past Thorne, cowardly.") == []
+    assert issues("Thorne ran past Aria, cowardly.") == [("trait_contradiction", "cowardly")]
+
+def test_unchanged_chapters_come_from_cache():
+    checker = ConsistencyChecker(CHARACTERS, WORLD)
+    first = checker.check_chapter(1, CHAPTER)
+    assert checker.check_chapter(1, CHAPTER) is first
+    assert checker.stats == {"chapters_checked": 1, "cache_hits": 1, "issues": 4}
+
+    edited = checker.check_chapter(1, CHAPTER.replace("Malrec", "Thorne"))
+    assert edited is not first and edited.unknown_names == {}
+    assert checker.stats["chapters_checked"] == 2
+
+    summary = checker.check_chapters([(1, CHAPTER.replace("Malrec", "Thorne")), (2, "Thorne waited in Eldoria.")])
+    assert checker.stats["cache_hits"] == 2
+    assert summary["appearances"]["Thorne Blackwood"] == [1, 2]
+    assert summary["appearances"]["Eldoria"] == [2]
+
+    checker.set_entities(CHARACTERS)
+    assert checker.get_stats()["cached_chapters"] == 0
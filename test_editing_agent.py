@@ -0,0 +1,65 @@
+import asyncio
+import importlib.util
+import json
+import re
+from types import SimpleNamespace
+
+spec = importlib.util.spec_from_file_location("editing_agent", "editing-agent.py")
+editing_agent_module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(editing_agent_module)
+EditingAgent = editing_agent_module.EditingAgent
+
+class EchoEditor:
+    """Fake LLM client that marks every [EDIT] paragraph it is sent"""
+    enabled = True
+    model = "fake"
+
+    def __init__(self):
+        self.sent = []
+
+    async def chat(self, messages, **kwargs):
+        targets = re.findall(r"\[EDIT\]\n(.*?)(?:\nStyle notes:.*?)?(?=\n\n\[|\n\nReply)", messages[-1]["content"], re.S)
+        self.sent.extend(targets)
+        return SimpleNamespace(text=json.dumps([f"Edited: {target}" for target in targets]), model="fake")
+
+DRAFT = "\n\n".join(f"Paragraph {i} of the chapter." for i in range(1, 21))
+
+def test_diff_decides_what_is_sent_even_after_cache_eviction():
+    async def scenario():
+        client = EchoEditor()
+        agent = EditingAgent(llm_client=client)
+        await agent.edit_text(DRAFT, key="book:1")
+        agent.edit_cache._entries.clear()
+        client.sent.clear()
+
+        revised = DRAFT.replace("Paragraph 7 of", "Paragraph seven, rewritten, of")
+        result = await agent.edit_text(revised, key="book:1")
+        assert client.sent == ["Paragraph seven, rewritten, of the chapter."]
+        assert result.changed == [6]
+        assert result.reused == 19
+        assert result.text.split("\n\n")[0] == "Edited: Paragraph 1 of the chapter."
+
+    asyncio.run(scenario())
+
+def test_edit_cache_is_keyed_by_genre():
+    async def scenario():
+        client = EchoEditor()
+        agent = EditingAgent(llm_client=client)
+        await agent.edit_text(DRAFT, key="fantasy_book:1", genre="fantasy")
+        assert (await agent.edit_text(DRAFT, key="other_fantasy:1", genre="fantasy")).sent == 0
+        assert (await agent.edit_text(DRAFT, key="romance_book:1", genre="romance")).sent == 20
+        # A re-edit under a different genre does not keep the old style's edits
+        assert (await agent.edit_text(DRAFT, key="fantasy_book:1", genre="romance")).reused == 20
+        assert (await agent.edit_text(DRAFT, key="fantasy_book:1", genre="mystery")).sent == 20
+
+    asyncio.run(scenario())
+
+def test_document_versions_are_bounded():
+    async def scenario():
+        agent = EditingAgent(llm_client=EchoEditor(), max_documents=2)
+        for key in ("book:1", "book:2", "book:3"):
+            await agent.edit_text(DRAFT, key=key)
+        assert list(agent._versions) == ["book:2", "book:3"]
+        assert agent.get_stats()["documents"] == 2
+
+    asyncio.run(scenario())
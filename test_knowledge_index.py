@@ -0,0 +1,98 @@
+import asyncio
+import importlib.util
+import os
+import threading
+
+spec = importlib.util.spec_from_file_location("knowledge_index", "knowledge-index.py")
+knowledge_index_module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(knowledge_index_module)
+KnowledgeIndex = knowledge_index_module.KnowledgeIndex
+
+def test_upsert_during_compaction_gets_its_own_segment(monkeypatch):
+    create_codec = knowledge_index_module.create_codec
+    paused, resume = threading.Event(), threading.Event()
+
+    def pausing_codec(name, **options):
+        # Hold compaction in the middle of encoding its merged segment
+        codec = create_codec(name, **options)
+        encode = codec.encode
+
+        def slow_encode(vectors):
+            if threading.current_thread().name == "compactor":
+                paused.set()
+                resume.wait(5)
+            return encode(vectors)
+
+        codec.encode = slow_encode
+        return codec
+
+    monkeypatch.setattr(knowledge_index_module, "create_codec", pausing_codec)
+    index = KnowledgeIndex(quantization="int8")
+    for i in range(4):
+        index.upsert_document(f"writing_techniques/doc-{i}", f"Chapter pacing notes number {i}. " * 20)
+    codec_before = index._codec
+
+    compactor = threading.Thread(target=index.compact, name="compactor")
+    compactor.start()
+    assert paused.wait(5)
+    index.upsert_document("writing_techniques/late", "Scene transitions written while compacting.")
+    assert index._codec is codec_before
+    resume.set()
+    compactor.join()
+
+    segments = index._segments
+    assert len({segment.id for segment in segments}) == len(segments)
+    assert all(os.path.exists(segment.path) for segment in segments)
+    assert index._codec is segments[0].codec
+    assert index.get_stats()["documents"] == 5
+    assert index.search("scene transitions", k=1)[0].doc_id == "writing_techniques/late"
+
+def test_compaction_after_deleting_everything():
+    for quantization in ("int8", "pq"):
+        index = KnowledgeIndex(quantization=quantization)
+        index.upsert_document("grammar_rules/commas", "Use a comma before a coordinating conjunction. " * 10)
+        index.delete_document("grammar_rules/commas")
+        result = index.compact()
+        assert result["segments_after"] == 0
+        assert result["rows_dropped"] > 0
+        assert index.search("comma") == []
+
+        # The next write trains a fresh codec
+        index.upsert_document("grammar_rules/commas", "Commas separate items in a list. " * 10)
+        assert index.search("comma", k=1)[0].doc_id == "grammar_rules/commas"
+
+def test_background_loop_compacts_once_needed():
+    async def scenario():
+        index = KnowledgeIndex(max_segments=2)
+        for i in range(4):
+            index.upsert_document(f"writing_techniques/doc-{i}", f"Dialogue beats, revision {i}.")
+        assert index.needs_compaction()
+
+        index.start_background_compaction(interval=0.01)
+        for _ in range(200):
+            if not index.needs_compaction():
+                break
+            await asyncio.sleep(0.01)
+        await index.stop_background_compaction()
+
+        assert not index.needs_compaction()
+        assert index.get_stats()["segments"] == 1
+        assert index._compaction_task is None
+
+    asyncio.run(scenario())
+
+def test_agents_share_one_process_wide_index(tmp_path, monkeypatch):
+    monkeypatch.setenv("ARTIFACT_DIR", str(tmp_path))
+    spec = importlib.util.spec_from_file_location("agent_coordinator", "agent-coordinator.py")
+    coordinator_module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(coordinator_module)
+    coordinator = coordinator_module.AgentCoordinator()
+    try:
+        shared = coordinator_module.get_knowledge_index()
+        assert coordinator.knowledge_index is shared
+        assert coordinator.agents["development"].knowledge.index is shared
+        # An agent built on its own does not get a private copy of the embeddings either
+        assert coordinator_module.DevelopmentAgent().knowledge.index is shared
+        assert coordinator_module.DevelopmentAgent().knowledge.domains == ["fiction_writing_guides", "character_development"]
+    finally:
+        coordinator.exporter.shutdown()
@@ -0,0 +1,175 @@
+import asyncio
+import importlib.util
+import sqlite3
+import time
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+
+spec = importlib.util.spec_from_file_location("llm_client", "llm-client.py")
+llm_client_module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(llm_client_module)
+LLMClientPool = llm_client_module.LLMClientPool
+RequestPolicy = llm_client_module.RequestPolicy
+ResponseCache = llm_client_module.ResponseCache
+
+class Usage(SimpleNamespace):
+    def model_dump(self):
+        return dict(vars(self))
+
+class FakeCompletions:
+    """Stands in for client.chat.completions; each call pops its delay and outcome"""
+
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.models = []
+
+    async def create(self, model, messages, **params):
+        self.models.append(model)
+        delay, outcome = self.outcomes.pop(0)
+        await asyncio.sleep(delay)
+        if isinstance(outcome, Exception):
+            raise outcome
+        if params.get("stream"):
+            return fake_stream(model, outcome)
+        return SimpleNamespace(
+            model=model,
+            usage=Usage(prompt_tokens=100, completion_tokens=50, total_tokens=150),
+            choices=[SimpleNamespace(message=SimpleNamespace(content=outcome))]
+        )
+
+async def fake_stream(model, text):
+    for word in text.split():
+        yield SimpleNamespace(model=model, usage=None,
+                              choices=[SimpleNamespace(delta=SimpleNamespace(content=word + " "))])
+    yield SimpleNamespace(model=model, usage=Usage(prompt_tokens=100, completion_tokens=50, total_tokens=150),
+                          choices=[])
+
+class SpyScheduler:
+    """Admits every call at once and records what the pool asks of it"""
+
+    def __init__(self):
+        self.tickets, self.reconciled, self.penalties = [], [], []
+
+    async def acquire(self, agent, tokens):
+        self.tickets.append(SimpleNamespace(agent=agent, estimated_tokens=tokens))
+        return self.tickets[-1]
+
+    def reconcile(self, ticket, actual_tokens):
+        self.reconciled.append((next(i for i, t in enumerate(self.tickets) if t is ticket), actual_tokens))
+
+    def penalize(self, retry_after=1.0):
+        self.penalties.append(retry_after)
+
+def fake_pool(outcomes, **kwargs) -> LLMClientPool:
+    pool = LLMClientPool(api_key="test", **kwargs)
+    async def close():
+        pass
+
+    pool.client = SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions(outcomes)), close=close)
+    return pool
+
+MESSAGES = [{"role": "user", "content": "Outline chapter one"}]
+
+def test_losing_hedged_primary_is_still_billed():
+    async def scenario():
+        policy = RequestPolicy(hedge_quantile=0.5, hedge_budget=1.0, min_samples=1)
+        pool = fake_pool([(0.2, "slow primary"), (0.0, "fast backup")], policy=policy)
+        policy._tracker(policy._primary, pool.model).add(0.01)
+
+        result = await pool.chat(MESSAGES, agent="writing", cache=False)
+        assert result.text == "fast backup"
+        await asyncio.sleep(0.3)
+        assert policy.stats["discarded"] == 1
+        assert pool.ledger.by_agent["writing"]["calls"] == 2
+        assert pool.stats["completion_tokens"] == 100
+
+    asyncio.run(scenario())
+
+def test_routing_is_opt_in_and_keeps_llm_model(monkeypatch):
+    monkeypatch.delenv("LLM_ROUTING", raising=False)
+    monkeypatch.delenv("LLM_ROUTES", raising=False)
+    assert LLMClientPool(api_key="test", model="gpt-4.1-nano").router is None
+
+    monkeypatch.setenv("LLM_ROUTING", "on")
+    pool = LLMClientPool(api_key="test", model="gpt-4.1-nano")
+    assert pool.router.select("default") == ["gpt-4.1-nano"]
+
+def test_bad_request_does_not_cool_down_the_model(monkeypatch):
+    monkeypatch.setenv("LLM_ROUTING", "on")
+    bad_request = openai.BadRequestError(
+        "context too long", response=httpx.Response(400, request=httpx.Request("POST", "http://mock/v1")), body=None
+    )
+
+    async def scenario():
+        pool = fake_pool([(0.0, bad_request), (0.0, "drafted")])
+        try:
+            await pool.chat(MESSAGES, call_class="final_writing", cache=False)
+        except openai.BadRequestError:
+            pass
+        assert pool.router.select("final_writing")[0] == "gpt-4o"
+        assert (await pool.chat(MESSAGES, call_class="final_writing", cache=False)).text == "drafted"
+        assert pool.client.chat.completions.models == ["gpt-4o", "gpt-4o"]
+
+    asyncio.run(scenario())
+
+def test_server_error_falls_back_and_cools_down(monkeypatch):
+    monkeypatch.setenv("LLM_ROUTING", "on")
+    monkeypatch.setenv("LLM_REQUEST_POLICY", "off")
+    server_error = openai.InternalServerError(
+        "overloaded", response=httpx.Response(500, request=httpx.Request("POST", "http://mock/v1")), body=None
+    )
+
+    async def scenario():
+        pool = fake_pool([(0.0, server_error), (0.0, "drafted")])
+        assert (await pool.chat(MESSAGES, call_class="final_writing", cache=False)).text == "drafted"
+        assert pool.client.chat.completions.models == ["gpt-4o", "gpt-4.1"]
+        assert pool.router.select("final_writing")[-1] == "gpt-4o"
+
+    asyncio.run(scenario())
+
+def test_aclose_flushes_and_closes_the_response_cache(tmp_path):
+    path = str(tmp_path / "responses.sqlite")
+
+    async def scenario():
+        cache = ResponseCache(path)
+        pool = fake_pool([(0.0, "drafted")], response_cache=cache)
+        await pool.chat(MESSAGES, model="gpt-4o-mini")
+        stored_at = cache._db.execute("SELECT accessed_at FROM responses").fetchone()[0]
+        time.sleep(0.01)
+        assert (await pool.chat(MESSAGES, model="gpt-4o-mini")).text == "drafted"
+        assert cache._touched
+
+        await pool.aclose()
+
+        assert pool.response_cache is None
+        with pytest.raises(sqlite3.ProgrammingError):
+            cache._db.execute("SELECT 1")
+        with sqlite3.connect(path) as db:
+            assert db.execute("SELECT accessed_at FROM responses").fetchone()[0] > stored_at
+
+    asyncio.run(scenario())
+
+def test_every_stream_attempt_is_admitted_by_the_scheduler():
+    rate_limited = openai.RateLimitError(
+        "slow down", response=httpx.Response(429, headers={"retry-after": "2"},
+                                             request=httpx.Request("POST", "http://mock/v1")), body=None
+    )
+
+    async def scenario():
+        async def no_wait(seconds):
+            pass
+
+        pool = fake_pool([(0.0, rate_limited), (0.0, "the river ran")],
+                         policy=RequestPolicy(sleep=no_wait), response_cache=None)
+        pool.scheduler = SpyScheduler()
+        text = "".join([delta async for delta in pool.stream_chat(MESSAGES, agent="writing", cache=False)])
+        assert text == "the river ran "
+        # The retry after the 429 waits for its own admission, and only the stream that opened is reconciled
+        assert len(pool.scheduler.tickets) == 2
+        assert pool.scheduler.penalties == [2.0]
+        assert pool.scheduler.reconciled == [(1, 150)]
+
+    asyncio.run(scenario())
@@ -0,0 +1,66 @@
+import importlib.util
+
+import pytest
+
+def load(name: str, path: str):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def test_manuscript_classes_are_shared_across_importers():
+    coordinator = load("agent_coordinator", "agent-coordinator.py")
+    buffer = load("manuscript_buffer", "manuscript-buffer.py")
+    export = coordinator.book_export_module
+    assert buffer.Manuscript is coordinator.Manuscript is export.Manuscript
+    assert buffer.ArtifactStore is coordinator.ArtifactStore is export.ArtifactStore
+
+buffer_module = load("manuscript_buffer", "manuscript-buffer.py")
+ManuscriptBuffer = buffer_module.ManuscriptBuffer
+
+def assert_avl(node) -> int:
+    if isinstance(node, buffer_module._Leaf):
+        return 0
+    left, right = assert_avl(node.left), assert_avl(node.right)
+    assert abs(left - right) <= 1
+    assert node.height == 1 + max(left, right)
+    return node.height
+
+def test_built_ropes_are_balanced_for_any_leaf_count():
+    for leaves in (1, 2, 3, 5, 7, 33, 100):
+        text = "x" * (buffer_module.LEAF_SIZE * leaves)
+        buffer = ManuscriptBuffer(text)
+        assert assert_avl(buffer.root) <= leaves.bit_length()
+        assert buffer.text() == text
+
+def test_edits_keep_the_rope_balanced_and_match_a_string():
+    import random
+
+    rng = random.Random(5)
+    chapters = [f"Chapter {n}. " + "The river ran past the mill. " * rng.randint(20, 200) for n in range(1, 9)]
+    buffer = ManuscriptBuffer.from_chapters(chapters)
+    expected = "\f".join(chapters)
+    for _ in range(2000):
+        position = rng.randrange(len(expected) + 1)
+        if rng.random() < 0.5:
+            buffer.insert(position, "edit ")
+            expected = expected[:position] + "edit " + expected[position:]
+        else:
+            buffer.delete(position, position + 7)
+            expected = expected[:position] + expected[position + 7:]
+    assert buffer.text() == expected
+    assert_avl(buffer.root)
+    assert list(buffer.iter_chapters()) == expected.split("\f")
+
+def test_snapshots_restore_and_unknown_versions_raise():
+    buffer = ManuscriptBuffer.from_chapters(["First draft.", "Second chapter."])
+    buffer.snapshot("draft")
+    buffer.replace_chapter(0, "Revised opening.")
+    assert buffer.at(1).chapter_text(0) == "First draft."
+    buffer.restore(1)
+    assert buffer.chapter_text(0) == "First draft."
+    for version in (0, 2):
+        with pytest.raises(KeyError):
+            buffer.at(version)
+        with pytest.raises(KeyError):
+            buffer.restore(version)
@@ -0,0 +1,129 @@
+import hashlib
+import importlib.util
+import re
+import threading
+from types import SimpleNamespace
+
+spec = importlib.util.spec_from_file_location("manuscript_metrics", "manuscript-metrics.py")
+manuscript_metrics_module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(manuscript_metrics_module)
+analyze_text = manuscript_metrics_module.analyze_text
+ManuscriptMetrics = manuscript_metrics_module.ManuscriptMetrics
+
+TEXTS = [
+    "The river ran. It ran on!",
+    "\"Stop,\" she said. \"Now!\" He didn't stop. The mill's wheel turned.",
+    "“Wait here,” said Nell. “I’ll be back.” She wasn’t.",
+    "Is it late? Yes... Very late.\"\nThe end",
+    "One sentence without an end",
+    "Mr. Reed arrived (late). She smiled.) Then rain",
+]
+
+def reference(text):
+    """Plain-Python counts: words, sentences, lower-cased types and dialogue words"""
+    words = list(re.finditer(r"[A-Za-z0-9]+(?:['’][A-Za-z0-9]+)*", text))
+    ends = [i for i, char in enumerate(text)
+            if char in ".!?" and (i + 1 == len(text) or text[i + 1] in " \t\r\n\f\"')]”’")]
+    sentence_of = [sum(1 for end in ends if end < word.start()) for word in words]
+    dialogue = [
+        text[:word.start()].count('"') % 2 == 1
+        or text[:word.start()].count("“") > text[:word.start()].count("”")
+        for word in words
+    ]
+    return {
+        "words": len(words),
+        "sentences": len(set(sentence_of)),
+        "types": len({word.group().lower() for word in words}),
+        "dialogue_words": sum(dialogue),
+        "sentence_lengths": [sentence_of.count(index) for index in sorted(set(sentence_of))],
+    }
+
+def test_counts_match_a_plain_python_tokenizer():
+    for text in TEXTS:
+        metrics, expected = analyze_text(text), reference(text)
+        assert metrics.words == expected["words"], text
+        assert metrics.sentences == expected["sentences"], text
+        assert metrics.sentence_lengths.tolist() == expected["sentence_lengths"], text
+        assert len(metrics.types) == expected["types"], text
+        assert metrics.dialogue_words == expected["dialogue_words"], text
+        assert metrics.to_dict()["lexical_diversity"]["ttr"] == round(expected["types"] / expected["words"], 4)
+
+def test_rolling_hash_identifies_words_case_insensitively():
+    # "edit" and "diet" are anagrams of "tide": the hash depends on letter order
+    metrics = analyze_text("Tide tide TIDE tides edit diet. Tide")
+    assert metrics.words == 7
+    assert sorted(metrics.type_counts.tolist()) == [1, 1, 1, 4]
+
+def test_sentence_ends_inside_closing_quotes():
+    metrics = analyze_text("\"Go.\" She went. “Why?” he asked.")
+    assert metrics.sentence_lengths.tolist() == [1, 2, 1, 2]
+
+def test_straight_and_curly_dialogue():
+    assert analyze_text("\"One two\" three").dialogue_words == 2
+    assert analyze_text("“One two” three").dialogue_words == 2
+    # An apostrophe inside a word does not open or close dialogue
+    assert analyze_text("“It’s two” she’d say").dialogue_words == 2
+
+def test_empty_and_whitespace_only_text():
+    for text in ("", "   \n\t  "):
+        metrics = analyze_text(text)
+        assert (metrics.words, metrics.sentences, metrics.syllables, metrics.dialogue_words) == (0, 0, 0, 0)
+        report = metrics.to_dict()
+        assert report["flesch_reading_ease"] == 0.0 and report["lexical_diversity"]["ttr"] == 0.0
+        assert report["pacing"] == {"sentence_length": [], "dialogue": [], "pace": []}
+
+class FakeManuscript:
+    """Chapters with stored digests; counts the texts actually read"""
+
+    def __init__(self, texts):
+        self.texts = dict(enumerate(texts, 1))
+        self.reads = []
+
+    @property
+    def chapters(self):
+        return [SimpleNamespace(number=number, title=f"Chapter {number}",
+                                digest=hashlib.sha256(text.encode("utf-8")).hexdigest())
+                for number, text in sorted(self.texts.items())]
+
+    def chapter_text(self, number):
+        self.reads.append(number)
+        return self.texts[number]
+
+def test_manuscript_chapters_are_cached_by_stored_digest():
+    metrics = ManuscriptMetrics()
+    manuscript = FakeManuscript(TEXTS)
+    first = metrics.analyze_manuscript(manuscript)
+    assert manuscript.reads == list(range(1, len(TEXTS) + 1))
+
+    manuscript.reads.clear()
+    assert metrics.analyze_manuscript(manuscript) == first
+    assert manuscript.reads == []
+
+    manuscript.texts[2] = "A new second chapter."
+    report = metrics.analyze_manuscript(manuscript)
+    assert manuscript.reads == [2]
+    assert report["chapters"][1]["words"] == 4
+    assert report["book"]["words"] == first["book"]["words"] - reference(TEXTS[1])["words"] + 4
+
+def test_concurrent_analysis_shares_the_cache():
+    metrics = ManuscriptMetrics(max_chapters=8)
+    texts = [f"Chapter {n} begins. It ends." for n in range(32)]
+    errors = []
+
+    def worker(offset):
+        try:
+            for round_ in range(20):
+                manuscript = FakeManuscript(texts[(offset + round_) % 24:][:8])
+                metrics.analyze_manuscript(manuscript)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(offset,)) for offset in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    stats = metrics.get_stats()
+    assert stats["cached_chapters"] <= 8
+    assert stats["chapters_analyzed"] + stats["cache_hits"] == 8 * 20 * 8
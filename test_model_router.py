@@ -0,0 +1,39 @@
+import importlib.util
+
+spec = importlib.util.spec_from_file_location("model_router", "model-router.py")
+model_router_module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(model_router_module)
+ModelRouter = model_router_module.ModelRouter
+load_routes = model_router_module.load_routes
+
+USAGE = {"prompt_tokens": 1000, "completion_tokens": 500}
+
+def test_default_class_follows_the_configured_model():
+    router = ModelRouter(default_model="gpt-4.1-nano")
+    assert router.select("default") == ["gpt-4.1-nano"]
+    assert router.select("unknown_class") == ["gpt-4.1-nano"]
+    assert load_routes('{"editing": {"models": ["gpt-4.1"]}}', default_model="gpt-4.1-nano")["default"].models == ["gpt-4.1-nano"]
+
+def test_failed_model_cools_down_then_recovers():
+    now = [0.0]
+    router = ModelRouter(cooldown=30.0, clock=lambda: now[0])
+    router.record("brainstorm", "gpt-4o-mini", 0.5, success=False)
+    assert router.select("brainstorm") == ["gpt-4.1-mini", "gpt-4o-mini"]
+    now[0] += 31
+    assert router.select("brainstorm") == ["gpt-4o-mini", "gpt-4.1-mini"]
+
+def test_slo_breaches_demote_a_model_after_enough_samples():
+    router = ModelRouter(load_routes('{"final_writing": {"latency_slo": 5}}'), min_samples=10)
+    for _ in range(9):
+        router.record("final_writing", "gpt-4o", 8.0, USAGE)
+    assert router.select("final_writing")[0] == "gpt-4o"
+    router.record("final_writing", "gpt-4o", 8.0, USAGE)
+    assert router.select("final_writing") == ["gpt-4.1", "gpt-4o-mini", "gpt-4o"]
+    assert router.get_stats()["final_writing"]["slo_violations"] == 10
+
+def test_discarded_cost_is_not_a_call_sample():
+    router = ModelRouter()
+    router.record_cost("editing", "gpt-4o", USAGE)
+    stats = router.get_stats()["editing"]
+    assert stats["calls"] == 0
+    assert stats["cost"] > 0
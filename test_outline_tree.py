@@ -0,0 +1,117 @@
+import asyncio
+import importlib.util
+
+spec = importlib.util.spec_from_file_location("outline_tree", "outline-tree.py")
+outline_tree_module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(outline_tree_module)
+OutlineTree = outline_tree_module.OutlineTree
+
+TWO_ACTS = """The Salt Road
+Act I: Departure
+1. Harbor - Nell signs on.
+2. Open Water - The crew tests her.
+Act II: The Crossing
+1. Storm - The mast splits.
+   1. Lightning strikes the yard.
+   2. Nell takes the wheel.
+2. Landfall - They reach the island.
+"""
+
+def test_chapters_are_numbered_through_the_book():
+    tree = OutlineTree.from_outline(TWO_ACTS)
+    chapters = tree.chapters()
+    assert [chapter.number for chapter in chapters] == [1, 2, 3, 4]
+    assert [chapter.label for chapter in chapters] == ["1", "2", "1", "2"]
+    assert tree.chapter(3).title == "Storm"
+    assert "Nell takes the wheel" in tree.chapter(3).summary
+    assert tree.node("act-2").children == chapters[2:]
+    assert tree.chapter(3).to_dict()["label"] == "1"
+
+def test_numbered_lists_are_not_chapters():
+    outline = "Chapter 1: Arrival - Three things go wrong:\n1. The rain.\n2. The debt.\nChapter 2: Departure"
+    tree = OutlineTree.from_outline(outline)
+    assert [chapter.title for chapter in tree.chapters()] == ["Arrival", "Departure"]
+    assert "2. The debt." in tree.chapter(1).summary
+    # Without acts a bare numbered line is only a list item
+    assert OutlineTree.from_outline("Notes\n1. Buy ink\n2. Write").chapters() == []
+
+def test_edit_invalidates_only_its_path():
+    tree = OutlineTree.from_outline("\n".join(f"Chapter {n}: Part {n}" for n in range(1, 13)))
+    assert tree.total_words() == 36000
+    act_1, act_3 = tree.node("act-1"), tree.node("act-3")
+    assert act_3._memo
+
+    tree.chapter(2).update(word_target=5000)
+
+    assert not act_1._memo and not tree.root._memo
+    assert "target" in act_3._memo
+    assert tree.total_words() == 38000
+    assert act_1.total_target() == 11000
+    assert tree.act_balance()["shares"]["act-1"] == round(11000 / 38000, 3)
+
+def test_chapter_target_is_shared_out_among_its_scenes():
+    tree = OutlineTree.from_outline(
+        "Chapter 1: Vault\n  - Scene: Lock (1000 words)\n  - Scene: Chase\nChapter 2: After"
+    )
+    assert tree.chapter(1).total_target() == 3000
+
+    tree.chapter(1).update(word_target=9000)
+
+    assert tree.chapter(1).total_target() == 9000
+    assert [scene.word_target for scene in tree.chapter(1).children] == [3000, 6000]
+    assert tree.total_words() == 12000
+
+def test_partial_approval():
+    tree = OutlineTree.from_outline(TWO_ACTS)
+    assert tree.approve(["act-1"]) == [1, 2]
+    assert tree.root.approved_chapters() == 2 and not tree.fully_approved
+    assert tree.approve(["chapter-3"]) == [3]
+    assert tree.root.approved_chapters() == 3
+    assert tree.approve(["chapter-1"], approved=False, feedback="Slower opening") == [1]
+    assert tree.root.approved_chapters() == 2
+    assert tree.chapter(1).feedback == "Slower opening"
+    tree.approve()
+    assert tree.fully_approved
+
+def test_restarted_numbering_is_written_and_the_book_finished_once(tmp_path, monkeypatch):
+    monkeypatch.setenv("ARTIFACT_DIR", str(tmp_path))
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    spec = importlib.util.spec_from_file_location("agent_coordinator", "agent-coordinator.py")
+    coordinator_module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(coordinator_module)
+
+    async def scenario():
+        coordinator = coordinator_module.AgentCoordinator()
+        workflow = coordinator.workflow_manager
+        finished = []
+
+        async def skip(project):
+            pass
+
+        async def cover(project):
+            finished.append(project.id)
+            await asyncio.sleep(0.01)
+
+        workflow._execute_development_phase = skip
+        workflow._execute_final_review_phase = skip
+        workflow._execute_cover_design_phase = cover
+        try:
+            project = await coordinator.process_book_request({
+                "id": "salt", "title": "The Salt Road", "genre": "adventure", "tone": "brisk",
+                "requirements": TWO_ACTS, "approval_required": True
+            })
+            project.outline = TWO_ACTS
+            await workflow._execute_outline_phase(project)
+
+            await coordinator.approve_outline("salt", ["act-1"])
+            assert sorted(project.manuscript.entries) == [1, 2] and not finished
+            await coordinator.approve_outline("salt", ["act-2"])
+            assert sorted(project.manuscript.entries) == [1, 2, 3, 4]
+            # Approving again, or twice at once, does not finish the book again
+            await asyncio.gather(coordinator.approve_outline("salt"), coordinator.approve_outline("salt"))
+            assert finished == ["salt"]
+            assert project.completed
+        finally:
+            coordinator.exporter.shutdown()
+
+    asyncio.run(scenario())
@@ -0,0 +1,80 @@
+import asyncio
+import importlib.util
+
+spec = importlib.util.spec_from_file_location("rate_scheduler", "rate-scheduler.py")
+rate_scheduler_module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(rate_scheduler_module)
+RateScheduler = rate_scheduler_module.RateScheduler
+FakeClock = rate_scheduler_module.FakeClock
+
+async def advance(clock: FakeClock, seconds: float, step: float = 0.5):
+    """Move the fake clock forward, letting woken tasks run at each step"""
+    for _ in range(int(seconds / step)):
+        clock.advance(step)
+        for _ in range(3):
+            await asyncio.sleep(0)
+
+def test_weighted_fair_queueing_shares_capacity_by_weight():
+    async def scenario():
+        clock = FakeClock()
+        scheduler = RateScheduler(tokens_per_minute=60000, requests_per_minute=600,
+                                  weights={"writing": 1.0, "editing": 2.0}, clock=clock, burst_seconds=1.0)
+        admitted = []
+
+        async def call(agent: str):
+            await scheduler.acquire(agent, 1000)
+            admitted.append(agent)
+
+        # Writing floods the queue first; editing arrives behind it
+        tasks = [asyncio.create_task(call("writing")) for _ in range(30)]
+        await asyncio.sleep(0)
+        tasks += [asyncio.create_task(call("editing")) for _ in range(30)]
+        await asyncio.sleep(0)
+        await advance(clock, 24)
+        await asyncio.gather(*(task for task in tasks if task.done()))
+
+        # Once both agents are backlogged, editing (weight 2) gets twice writing's admissions
+        assert len(admitted) >= 24
+        contended = admitted[3:24]
+        assert contended.count("editing") == 2 * contended.count("writing")
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    asyncio.run(scenario())
+
+def test_rate_limit_penalty_drains_buckets_and_pauses_admissions():
+    async def scenario():
+        clock = FakeClock()
+        scheduler = RateScheduler(tokens_per_minute=60000, requests_per_minute=600, clock=clock)
+        ticket = await scheduler.acquire("writing", 1000)
+        scheduler.reconcile(ticket, 1000)
+
+        scheduler.penalize(retry_after=5.0)
+        stats = scheduler.get_stats()
+        assert stats["token_bucket_level"] <= 0 and stats["request_bucket_level"] <= 0
+
+        waiter = asyncio.create_task(scheduler.acquire("writing", 100))
+        await asyncio.sleep(0)
+        await advance(clock, 4.5)
+        assert not waiter.done()
+        await advance(clock, 1.0)
+        assert waiter.done()
+        assert (await waiter).waited >= 5.0
+
+    asyncio.run(scenario())
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def scenario():
+        clock = FakeClock()
+        scheduler = RateScheduler(tokens_per_minute=600, requests_per_minute=60, clock=clock, burst_seconds=1.0)
+        await scheduler.acquire("writing", 10)
+        waiter = asyncio.create_task(scheduler.acquire("editing", 10))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        stats = scheduler.get_stats()
+        assert stats["queue_depth"] == 0
+        assert stats["agents"]["editing"]["cancelled"] == 1
+
+    asyncio.run(scenario())
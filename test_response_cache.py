@@ -0,0 +1,42 @@
+import asyncio
+import importlib.util
+import time
+
+spec = importlib.util.spec_from_file_location("response_cache", "response-cache.py")
+response_cache_module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(response_cache_module)
+ResponseCache = response_cache_module.ResponseCache
+
+MESSAGES = [{"role": "user", "content": "Create characters for a fantasy novel"}]
+
+def test_hits_do_not_lock_a_shared_cache_file(tmp_path):
+    path = str(tmp_path / "responses.sqlite")
+
+    async def scenario():
+        reader, writer = ResponseCache(path), ResponseCache(path)
+        reader._db.execute("PRAGMA busy_timeout = 100")
+        writer._db.execute("PRAGMA busy_timeout = 100")
+        await writer.put("gpt-4o-mini", MESSAGES, {"text": "Aria"})
+        assert await reader.get("gpt-4o-mini", MESSAGES) == {"text": "Aria"}
+        # Another worker sharing the file can still write after the hit
+        await writer.put("gpt-4o-mini", MESSAGES + MESSAGES, {"text": "Bram"})
+        assert await reader.get("gpt-4o-mini", MESSAGES + MESSAGES) == {"text": "Bram"}
+        reader.close()
+        writer.close()
+
+    asyncio.run(scenario())
+
+def test_batched_hits_still_drive_lru_eviction():
+    async def scenario():
+        cache = ResponseCache(max_entries=2)
+        first = [{"role": "user", "content": "first"}]
+        second = [{"role": "user", "content": "second"}]
+        await cache.put("m", first, {"text": "1"})
+        await cache.put("m", second, {"text": "2"})
+        time.sleep(0.01)
+        assert await cache.get("m", first) == {"text": "1"}
+        await cache.put("m", [{"role": "user", "content": "third"}], {"text": "3"})
+        assert await cache.get("m", first) == {"text": "1"}
+        assert await cache.get("m", second) is None
+
+    asyncio.run(scenario())
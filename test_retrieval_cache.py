@@ -0,0 +1,99 @@
+import asyncio
+import importlib.util
+
+spec = importlib.util.spec_from_file_location("retrieval_cache", "retrieval-cache.py")
+retrieval_cache_module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(retrieval_cache_module)
+RetrievalCache = retrieval_cache_module.RetrievalCache
+normalize_query = retrieval_cache_module.normalize_query
+retrieval_key = retrieval_cache_module.retrieval_key
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_equivalent_briefs_normalize_to_one_query():
+    briefs = ["Young mage discovers her powers", "A young   wizard uncovers her powers!",
+              "young sorceress finds her magic powers", "YOUTHFUL magician discovers the abilities"]
+    assert {normalize_query(brief) for brief in briefs} == {"young mage discovers powers"}
+    assert normalize_query("Sci-Fi") == normalize_query("science fiction") == normalize_query("ＳＦ") == "sci_fi"
+    assert normalize_query("Epic Fantasy") == "fantasy epic"
+    assert normalize_query("Non-Fiction") == "non-fiction"
+    # Synonyms match whole words only, and stopwords go only as separate words
+    assert normalize_query("Teenagers and theft") == "teenagers theft"
+    assert normalize_query(None) == ""
+
+def test_keys_differ_by_namespace_and_field():
+    key = retrieval_key("characters", "High Fantasy", "Epic", "A teen wizard")
+    assert key == ("characters", "fantasy", "epic", "young mage")
+    assert retrieval_key("characters", "fantasy", "EPIC", "young sorcerer") == key
+    assert retrieval_key("world", "fantasy", "epic", "young mage") != key
+    assert retrieval_key("characters", "fantasy", "young mage", "epic") != key
+
+def test_entries_expire_after_the_ttl():
+    clock = FakeClock()
+    cache = RetrievalCache(ttl=10, clock=clock)
+    cache.put("key", ["passage"])
+    clock.now = 9.9
+    assert cache.get("key") == ["passage"]
+    clock.now = 10.0
+    assert cache.get("key") is None
+    stats = cache.get_stats()
+    assert stats["expirations"] == 1 and stats["entries"] == 0 and stats["bytes"] == 0
+
+def test_least_recently_used_entries_go_first_to_stay_under_the_byte_bound():
+    value = ["x" * 10]
+    size = RetrievalCache._size_of(value)
+    cache = RetrievalCache(max_bytes=3 * size)
+    for key in "abc":
+        cache.put(key, value)
+    assert cache.get("a") == value
+    cache.put("d", value)
+
+    assert cache.get("b") is None
+    assert [cache.get(key) for key in "acd"] == [value] * 3
+    assert cache.get_stats()["bytes"] == 3 * size and cache.stats["evictions"] == 1
+
+    # A larger value evicts as many entries as it needs; one over the bound is never stored
+    cache.put("e", ["x" * (2 * size)])
+    assert cache.get_stats()["entries"] == 1 and cache.get_stats()["bytes"] <= 3 * size
+    cache.put("huge", ["x" * (3 * size)])
+    assert cache.get("huge") is None and cache.get("e") is not None
+
+def test_entry_count_bound_and_replacing_a_key():
+    cache = RetrievalCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("a", 22)
+    cache.put("b", 2)
+    assert cache.get_stats()["bytes"] == 3 and cache.get("a") == 22
+    cache.put("c", 3)
+    assert cache.get("b") is None and cache.get_stats()["entries"] == 2
+
+def test_an_index_version_change_invalidates_older_entries():
+    cache = RetrievalCache()
+    computed = []
+
+    async def compute():
+        computed.append(len(computed))
+        return {"retrieved": [f"passage {len(computed)}"]}
+
+    async def scenario():
+        first = await cache.get_or_compute("key", compute, index_version=1)
+        assert await cache.get_or_compute("key", compute, index_version=1) == first
+        updated = await cache.get_or_compute("key", compute, index_version=2)
+        assert updated != first
+        return first, updated
+
+    first, updated = asyncio.run(scenario())
+    assert computed == [0, 1]
+    assert cache.stats["invalidations"] == 1
+    assert cache.get("key", index_version=2) == updated
+
+def test_invalidate_clears_everything():
+    cache = RetrievalCache()
+    cache.put("a", [1])
+    cache.invalidate()
+    assert cache.get("a") is None and cache.get_stats()["bytes"] == 0
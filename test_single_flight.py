@@ -0,0 +1,73 @@
+import asyncio
+import importlib.util
+
+spec = importlib.util.spec_from_file_location("single_flight", "single-flight.py")
+single_flight_module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(single_flight_module)
+SingleFlight = single_flight_module.SingleFlight
+call_key = single_flight_module.call_key
+
+spec = importlib.util.spec_from_file_location("enhanced_development_agent", "enhanced-development-agent.py")
+dev_agent_module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(dev_agent_module)
+EnhancedDevelopmentAgent = dev_agent_module.EnhancedDevelopmentAgent
+
+def test_concurrent_identical_calls_share_one_result():
+    async def scenario():
+        flight = SingleFlight()
+        runs = []
+
+        async def work():
+            runs.append(1)
+            await asyncio.sleep(0.01)
+            return object()
+
+        first, second = await asyncio.gather(flight.do("key", work), flight.do("key", work))
+        assert first is second
+        assert len(runs) == 1
+        assert flight.stats["coalesced"] == 1
+
+    asyncio.run(scenario())
+
+def test_cancelling_one_waiter_keeps_the_shared_call_running():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.01)
+            return "done"
+
+        leaving = asyncio.create_task(flight.do("key", work))
+        staying = asyncio.create_task(flight.do("key", work))
+        await asyncio.sleep(0)
+        leaving.cancel()
+        assert await staying == "done"
+
+    asyncio.run(scenario())
+
+def test_call_key_ignores_only_case_and_whitespace():
+    assert call_key("brief", "Fantasy", "A young  wizard") == call_key("brief", "fantasy", " a young wizard ")
+    assert call_key("brief", "fantasy", "finds his powers") != call_key("brief", "fantasy", "finds her powers")
+
+def test_briefs_with_the_same_retrieval_key_are_generated_separately():
+    async def scenario():
+        agent = EnhancedDevelopmentAgent()
+        generated = []
+
+        async def fake_create(genre, tone, requirements):
+            generated.append(requirements)
+            await asyncio.sleep(0.01)
+            return [requirements]
+
+        agent._create_characters = fake_create
+        wizard, sorceress, wizard_again = await asyncio.gather(
+            agent.create_characters("Fantasy", "epic", "A young wizard who finds his powers"),
+            agent.create_characters("fantasy", "Epic", "young sorceress uncovers her magic powers"),
+            agent.create_characters("fantasy", "epic", "A young wizard  who finds his powers")
+        )
+        assert wizard == ["A young wizard who finds his powers"]
+        assert sorceress == ["young sorceress uncovers her magic powers"]
+        assert wizard_again is wizard
+        assert len(generated) == 2
+
+    asyncio.run(scenario())
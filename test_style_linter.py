@@ -0,0 +1,46 @@
+import importlib.util
+import sys
+
+style_linter_module = sys.modules.get("style_linter")
+if style_linter_module is None:
+    spec = importlib.util.spec_from_file_location("style_linter", "style-linter.py")
+    style_linter_module = importlib.util.module_from_spec(spec)
+    sys.modules["style_linter"] = style_linter_module
+    spec.loader.exec_module(style_linter_module)
+fix_text = style_linter_module.fix_text
+lint_text = style_linter_module.lint_text
+
+INTENDED = [
+    "Visit www.example.com for details.",
+    "The service was rewritten in Node.js last spring.",
+    "She attached report.pdf. Nobody opened it.",
+    "They drove on to Walla Walla at dawn.",
+    "Knock knock. Who is there?",
+    "\"No no no,\" she said.",
+]
+
+def rules(text):
+    return [issue.rule for issue in lint_text(text)]
+
+def test_fixes_never_rewrite_words_or_names():
+    for text in INTENDED:
+        assert fix_text(text) == (text, 0), text
+
+def test_urls_filenames_and_names_are_not_reported():
+    for text in INTENDED[:4]:
+        assert "missing_space_after_punctuation" not in rules(text), text
+        assert "repeated_word" not in rules(text), text
+    assert "repeated_word" not in rules(INTENDED[5])
+
+def test_slips_are_reported_but_left_for_the_editor():
+    text = "The the gate opened.Then it shut,quietly."
+    issues = lint_text(text)
+    found = {(issue.rule, issue.text) for issue in issues}
+    assert ("repeated_word", "The the") in found
+    assert ("missing_space_after_punctuation", ".") in found
+    assert ("missing_space_after_punctuation", ",") in found
+    assert not any(issue.fixable for issue in issues if issue.rule in ("repeated_word", "missing_space_after_punctuation"))
+    assert fix_text(text) == (text, 0)
+
+def test_spacing_is_still_fixed():
+    assert fix_text("It  was late .Far too late!!") == ("It was late. Far too late!", 3)
@@ -0,0 +1,91 @@
+import asyncio
+import importlib.util
+
+spec = importlib.util.spec_from_file_location("token_budget", "token-budget.py")
+token_budget_module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(token_budget_module)
+TokenBudgeter = token_budget_module.TokenBudgeter
+AgentBudget = token_budget_module.AgentBudget
+TokenLedger = token_budget_module.TokenLedger
+project_scope = token_budget_module.project_scope
+count_tokens = token_budget_module.count_tokens
+count_message_tokens = token_budget_module.count_message_tokens
+DEFAULT_BUDGETS = token_budget_module.DEFAULT_BUDGETS
+
+FIXED = [{"role": "system", "content": "You are Dr. Elena Rodriguez."},
+         {"role": "user", "content": "Create characters for a fantasy novel."}]
+USAGE = {"prompt_tokens": 900, "completion_tokens": 400, "prompt_tokens_details": {"cached_tokens": 768}}
+
+def test_fit_context_packs_by_relevance_and_truncates_the_last():
+    first = "A mentor guides the hero."
+    budgeter = TokenBudgeter(budgets={"development": AgentBudget(max_context_tokens=count_tokens(first) + 40)})
+    passages = [
+        first + "   \n\n\n",
+        first,
+        "Magic systems need clear costs and limits. " * 20,
+        "Dark Lords make memorable antagonists."
+    ]
+
+    kept = budgeter.fit_context("development", passages)
+
+    # Compressed duplicates count once; the long passage takes what is left and the last is dropped
+    assert kept[0] == first and len(kept) == 2
+    assert count_tokens(kept[1]) <= 40 and kept[1].startswith("Magic systems")
+    assert budgeter.stats["passages_kept"] == 2
+    assert budgeter.stats["passages_truncated"] == 1
+    assert budgeter.stats["passages_dropped"] == 1
+
+def test_fit_context_drops_a_passage_too_small_to_truncate():
+    budgeter = TokenBudgeter(budgets={"development": AgentBudget(max_context_tokens=20)})
+    assert budgeter.fit_context("development", ["Magic systems need clear costs and limits. " * 20]) == []
+    assert budgeter.stats["passages_dropped"] == 1 and budgeter.stats["passages_truncated"] == 0
+
+def test_per_agent_budgets_and_the_model_window():
+    budgeter = TokenBudgeter(budgets={"development": AgentBudget(max_context_tokens=120)})
+    assert budgeter.budget_for("development").max_context_tokens == 120
+    assert budgeter.budget_for("research") == DEFAULT_BUDGETS["research"]
+    assert budgeter.budget_for("unknown") == AgentBudget()
+    assert budgeter.available_context("development", FIXED) == 120
+    assert budgeter.get_stats()["budgets"]["development"]["max_context_tokens"] == 120
+
+    # The fixed prompt comes out of the prompt budget, and the model's window caps the prompt
+    tight = TokenBudgeter(budgets={
+        "research": AgentBudget(max_prompt_tokens=200, max_context_tokens=8000),
+        "writing": AgentBudget(max_prompt_tokens=50000, max_context_tokens=50000, max_completion_tokens=6000)
+    })
+    assert tight.available_context("research", FIXED) == 200 - count_message_tokens(FIXED)
+    assert tight.available_context("writing", FIXED, model="gpt-3.5-turbo") == 16385 - 6000 - count_message_tokens(FIXED)
+    assert tight.available_context("writing", FIXED, model="gpt-4o") == 50000 - count_message_tokens(FIXED)
+    assert TokenBudgeter(budgets={"research": AgentBudget(max_prompt_tokens=10)}).available_context("research", FIXED) == 0
+
+def test_ledger_attributes_calls_to_the_project_in_scope():
+    ledger = TokenLedger()
+
+    async def scenario():
+        with project_scope("book_42"):
+            ledger.record("development", "gpt-4o-mini", USAGE)
+            # Tasks spawned inside the scope inherit it
+            await asyncio.create_task(asyncio.to_thread(ledger.record, "writing", "gpt-4o", USAGE))
+            ledger.record("writing", "gpt-4o", USAGE, project_id="book_7")
+            ledger.record("writing", "gpt-4o", USAGE, cached_response=True)
+        ledger.record("outline", "gpt-4o", USAGE)
+
+    asyncio.run(scenario())
+
+    assert [call["project_id"] for call in ledger.recent_calls()] == ["book_42", "book_42", "book_7", "book_42", None]
+    usage = ledger.project_usage("book_42")
+    assert usage["calls"] == 3 and usage["response_cache_hits"] == 1
+    assert usage["prompt_tokens"] == 1800 and usage["completion_tokens"] == 800
+    assert usage["cached_prompt_tokens"] == 1536
+    assert ledger.project_usage("book_7")["calls"] == 1
+    assert ledger.project_usage("missing")["calls"] == 0
+    assert len(ledger.recent_calls(project_id="book_42")) == 3
+    assert ledger.by_agent["writing"]["calls"] == 3
+    assert ledger.get_stats()["projects"] == 2
+
+def test_ledger_keeps_recent_calls_and_all_time_totals():
+    ledger = TokenLedger(max_calls=3)
+    for _ in range(5):
+        ledger.record("editing", "gpt-4o", USAGE)
+    assert len(ledger.recent_calls()) == 3 and len(ledger.recent_calls(limit=2)) == 2
+    assert ledger.by_agent["editing"]["calls"] == 5
@@ -0,0 +1,103 @@
+import asyncio
+import importlib.util
+from types import SimpleNamespace
+
+spec = importlib.util.spec_from_file_location("writing_agent", "writing-agent.py")
+writing_agent_module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(writing_agent_module)
+WritingAgent = writing_agent_module.WritingAgent
+StoryBible = writing_agent_module.StoryBible
+Chapter = writing_agent_module.Chapter
+default_outline = writing_agent_module.default_outline
+parse_outline = writing_agent_module.parse_outline
+
+class RecordingClient:
+    """Fake LLM client: later chapters finish first, and every prompt is kept"""
+    enabled = True
+    model = "fake"
+
+    def __init__(self):
+        self.prompts = []
+
+    async def chat(self, messages, call_class=None, **kwargs):
+        prompt = messages[-1]["content"]
+        self.prompts.append((call_class, prompt))
+        if call_class == "final_writing":
+            number = int(prompt.split("Write chapter ")[1].split(",")[0])
+            await asyncio.sleep(0.002 * (10 - number))
+            return SimpleNamespace(text=f"Chapter {number} begins.\n\nChapter {number} ends here.", model="fake")
+        return SimpleNamespace(text=prompt.split("Opening paragraph of chapter ")[1].split(":\n")[1].split("\n\n")[0],
+                               model="fake")
+
+def test_every_chapter_call_shares_the_same_bible_prefix():
+    async def scenario():
+        plans = parse_outline(default_outline("The Clockwork Heir", "fantasy", chapters=6))
+        bible = StoryBible("The Clockwork Heir", "fantasy", "adventurous", "A tinkerer inherits a kingdom",
+                           chapter_summaries={plan.number: f"{plan.title}: {plan.summary}" for plan in plans})
+        client = RecordingClient()
+        agent = WritingAgent(llm_client=client, workers=6)
+        planned = bible.render(agent.budget.max_context_tokens)
+
+        chapters = await agent.write_book(bible, plans)
+
+        prefixes = {prompt.split("\n\nWrite chapter ")[0] for call_class, prompt in client.prompts
+                    if call_class == "final_writing"}
+        assert prefixes == {planned}
+        revisions = [prompt for call_class, prompt in client.prompts if call_class == "editing"]
+        assert len(revisions) == 5
+        assert all(prompt.startswith(planned) for prompt in revisions)
+        assert "Chapter 2 ended: Chapter 2 begins. Chapter 2 ends here." in "".join(revisions)
+        # Actual summaries reach the bible once the fan-out is done
+        assert bible.chapter_summaries[3] == f"{chapters[2].title}: {chapters[2].summary}"
+
+    asyncio.run(scenario())
+
+def test_openings_follow_the_chapter_numbered_before_them():
+    async def scenario():
+        plans = parse_outline(default_outline("The Clockwork Heir", "fantasy", chapters=6))
+        # Chapters 3 and 4 were approved and written earlier; 3 is not needed, 4 precedes 5
+        earlier = {4: Chapter.from_text(4, plans[3].title, "The vault opened.\n\nThe heir took the crown.")}
+        approved = [plan for plan in plans if plan.number in (1, 2, 5, 6)]
+        bible = StoryBible("The Clockwork Heir", "fantasy", "adventurous", "A tinkerer inherits a kingdom")
+        client = RecordingClient()
+
+        await WritingAgent(llm_client=client, workers=4).write_book(bible, approved, earlier)
+
+        pairs = sorted(
+            (int(prompt.split("Opening paragraph of chapter ")[1].split(":")[0]),
+             int(prompt.split("\n\nChapter ")[1].split(" ended:")[0]))
+            for call_class, prompt in client.prompts if call_class == "editing"
+        )
+        assert pairs == [(2, 1), (5, 4), (6, 5)]
+        assert "Chapter 4 ended: The vault opened. The heir took the crown." in "".join(
+            prompt for call_class, prompt in client.prompts if call_class == "editing"
+        )
+
+    asyncio.run(scenario())
+
+def test_render_trims_characters_and_world_before_summaries():
+    count_tokens = writing_agent_module.count_tokens
+    bible = StoryBible(
+        "The Clockwork Heir", "fantasy", "adventurous", "A tinkerer inherits a kingdom",
+        characters=[f"Character {n}: " + "a restless inventor with debts and rivals. " * 10 for n in range(8)],
+        world="A city of brass towers and canals. " * 40,
+        chapter_summaries={n: f"Part {n}: the heir faces trial number {n}." for n in range(1, 21)}
+    )
+    full = bible.render()
+    summaries = full[full.index("CHAPTERS:"):]
+
+    # The character and world lines run to about a thousand tokens; the summaries to a few hundred
+    budget = count_tokens(full) - 300
+    text = bible.render(budget)
+    assert count_tokens(text) <= budget
+    assert text.endswith(summaries)
+    assert "CHARACTERS:" in text and "WORLD:" in text
+
+    # Once the summaries alone overflow, those nearest the chapters being written are kept
+    budget = count_tokens(full[:full.index("\n\nCHARACTERS:")]) + 60
+    text = bible.render(budget, around=[11, 12])
+    assert count_tokens(text) <= budget
+    assert "CHARACTERS:" not in text and "WORLD:" not in text
+    kept = [int(line.split(".")[0]) for line in text[text.index("CHAPTERS:"):].splitlines()[1:]]
+    assert 11 in kept and 12 in kept
+    assert kept == list(range(kept[0], kept[-1] + 1)) and len(kept) < 20
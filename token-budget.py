@@ -0,0 +1,270 @@
+import asyncio
+import contextvars
+import re
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+from functools import lru_cache
+from typing import Dict, List, Any, Optional
+
+try:
+    import tiktoken
+except ImportError:  # token counts fall back to a characters/4 estimate
+    tiktoken = None
+
+# Context windows (prompt + completion) of the models agents are routed to
+MODEL_CONTEXT_WINDOWS = {
+    "gpt-4o": 128000,
+    "gpt-4o-mini": 128000,
+    "gpt-4.1": 1047576,
+    "gpt-4.1-mini": 1047576,
+    "gpt-4-turbo": 128000,
+    "gpt-3.5-turbo": 16385
+}
+DEFAULT_CONTEXT_WINDOW = 128000
+
+# Chat framing overhead per message and for the assistant reply primer
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+
+DEFAULT_COMPLETION_TOKENS = 512
+
+# The project a call is attributed to; set per request/workflow, inherited by child tasks
+current_project: contextvars.ContextVar = contextvars.ContextVar("current_project", default=None)
+
+@contextmanager
+def project_scope(project_id: str):
+    """Attribute every LLM call made inside the block (and tasks it spawns) to project_id"""
+    token = current_project.set(project_id)
+    try:
+        yield
+    finally:
+        current_project.reset(token)
+
+@lru_cache(maxsize=None)
+def _encoding(name: str):
+    """Load a tokenizer once; None when tiktoken or its BPE files are unavailable (e.g. offline)"""
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.get_encoding(name)
+    except Exception:
+        return None
+
+@lru_cache(maxsize=64)
+def encoding_for(model: str = None):
+    """Cached encoder for a model name, falling back to o200k_base"""
+    if tiktoken is not None and model:
+        try:
+            return _encoding(tiktoken.encoding_name_for_model(model))
+        except (KeyError, AttributeError):
+            pass
+    return _encoding("o200k_base")
+
+def count_tokens(text: str, model: str = None) -> int:
+    encoding = encoding_for(model)
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+def count_message_tokens(messages: List[Dict[str, str]], model: str = None) -> int:
+    return sum(
+        TOKENS_PER_MESSAGE + count_tokens(message.get("content") or "", model)
+        for message in messages
+    ) + TOKENS_PER_REPLY
+
+def estimate_call_tokens(messages: List[Dict[str, str]], model: str = None, params: Dict[str, Any] = None) -> int:
+    """Prompt tokens plus the completion budget the call may consume"""
+    params = params or {}
+    completion = params.get("max_tokens") or params.get("max_completion_tokens") or DEFAULT_COMPLETION_TOKENS
+    return count_message_tokens(messages, model) + completion
+
+def truncate_tokens(text: str, max_tokens: int, model: str = None) -> str:
+    """Cut text to at most max_tokens, preferring a sentence boundary"""
+    if max_tokens <= 0:
+        return ""
+    encoding = encoding_for(model)
+    if encoding is None:
+        clipped = text[:max_tokens * 4]
+    else:
+        tokens = encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+        clipped = encoding.decode(tokens[:max_tokens])
+    if len(clipped) >= len(text):
+        return text
+    boundary = max(clipped.rfind(". "), clipped.rfind("\n"))
+    return clipped[:boundary + 1] if boundary > len(clipped) // 2 else clipped
+
+def compress(text: str) -> str:
+    """Cheap lossless-for-the-model compression: collapse whitespace and markdown rules"""
+    text = re.sub(r"[ \t]+", " ", text)
+    text = re.sub(r"\n\s*\n+", "\n", text)
+    text = re.sub(r"^[#>*\-= ]{2,}$", "", text, flags=re.MULTILINE)
+    return text.strip()
+
+@dataclass
+class AgentBudget:
+    max_prompt_tokens: int = 8000
+    max_context_tokens: int = 3000
+    max_completion_tokens: int = 1500
+
+# Retrieval-heavy agents get more context; writing needs long completions
+DEFAULT_BUDGETS = {
+    "development": AgentBudget(max_prompt_tokens=6000, max_context_tokens=2500, max_completion_tokens=2000),
+    "research": AgentBudget(max_prompt_tokens=12000, max_context_tokens=8000, max_completion_tokens=2000),
+    "outline": AgentBudget(max_prompt_tokens=8000, max_context_tokens=3000, max_completion_tokens=3000),
+    "writing": AgentBudget(max_prompt_tokens=16000, max_context_tokens=6000, max_completion_tokens=6000),
+    "editing": AgentBudget(max_prompt_tokens=16000, max_context_tokens=4000, max_completion_tokens=6000),
+    "cover_design": AgentBudget(max_prompt_tokens=4000, max_context_tokens=1500, max_completion_tokens=1000),
+    "audiobook": AgentBudget(max_prompt_tokens=8000, max_context_tokens=2000, max_completion_tokens=2000)
+}
+
+class TokenBudgeter:
+    """
+    Fits retrieved context into each agent's prompt budget.
+
+    The fixed part of a prompt (persona, task, requirements) is counted first;
+    retrieved passages, already ordered by relevance, are compressed and packed
+    into what remains, truncating the last one that only partly fits.
+    """
+
+    def __init__(self, budgets: Dict[str, AgentBudget] = None, model: str = None):
+        self.budgets = dict(DEFAULT_BUDGETS, **(budgets or {}))
+        self.model = model
+        self.stats = {"fits": 0, "passages_kept": 0, "passages_dropped": 0, "passages_truncated": 0, "tokens_trimmed": 0}
+
+    def budget_for(self, agent: str) -> AgentBudget:
+        return self.budgets.get(agent) or AgentBudget()
+
+    def available_context(self, agent: str, fixed_messages: List[Dict[str, str]], model: str = None) -> int:
+        """Tokens left for retrieved context once the fixed prompt and completion are reserved"""
+        budget = self.budget_for(agent)
+        model = model or self.model
+        window = MODEL_CONTEXT_WINDOWS.get(model, DEFAULT_CONTEXT_WINDOW)
+        prompt_limit = min(budget.max_prompt_tokens, window - budget.max_completion_tokens)
+        return max(0, min(budget.max_context_tokens, prompt_limit - count_message_tokens(fixed_messages, model)))
+
+    def fit_context(self, agent: str, passages: List[str], fixed_messages: List[Dict[str, str]] = None,
+                    model: str = None) -> List[str]:
+        model = model or self.model
+        remaining = self.available_context(agent, fixed_messages or [], model)
+        kept, seen = [], set()
+        self.stats["fits"] += 1
+        for passage in passages:
+            passage = compress(passage)
+            if not passage or passage in seen:
+                continue
+            seen.add(passage)
+            tokens = count_tokens(passage, model)
+            if tokens <= remaining:
+                kept.append(passage)
+                remaining -= tokens
+            elif remaining >= 32:
+                kept.append(truncate_tokens(passage, remaining, model))
+                self.stats["passages_truncated"] += 1
+                self.stats["tokens_trimmed"] += tokens - remaining
+                remaining = 0
+            else:
+                self.stats["passages_dropped"] += 1
+                self.stats["tokens_trimmed"] += tokens
+        self.stats["passages_kept"] += len(kept)
+        return kept
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.stats, budgets={agent: asdict(budget) for agent, budget in self.budgets.items()})
+
+@dataclass
+class CallUsage:
+    agent: str
+    project_id: Optional[str]
+    model: str
+    prompt_tokens: int
+    completion_tokens: int
+    cached_prompt_tokens: int
+    estimated_tokens: int
+    latency: float
+    cached_response: bool
+    timestamp: float
+
+class TokenLedger:
+    """
+    Per-call token usage with running totals per agent and per project.
+    Only the most recent calls are kept individually; totals are kept forever.
+    """
+
+    def __init__(self, max_calls: int = 1000):
+        self.calls: deque = deque(maxlen=max_calls)
+        self.by_agent: Dict[str, Dict[str, float]] = {}
+        self.by_project: Dict[str, Dict[str, float]] = {}
+
+    def record(self, agent: str, model: str, usage: Dict[str, Any], estimated_tokens: int = 0,
+               latency: float = 0.0, cached_response: bool = False, project_id: str = None) -> CallUsage:
+        details = usage.get("prompt_tokens_details") or {}
+        call = CallUsage(
+            agent=agent or "default",
+            project_id=project_id or current_project.get(),
+            model=model,
+            prompt_tokens=0 if cached_response else usage.get("prompt_tokens", 0),
+            completion_tokens=0 if cached_response else usage.get("completion_tokens", 0),
+            cached_prompt_tokens=0 if cached_response else details.get("cached_tokens") or 0,
+            estimated_tokens=estimated_tokens,
+            latency=latency,
+            cached_response=cached_response,
+            timestamp=time.time()
+        )
+        self.calls.append(call)
+        totals = [self.by_agent.setdefault(call.agent, self._empty())]
+        if call.project_id:
+            totals.append(self.by_project.setdefault(call.project_id, self._empty()))
+        for total in totals:
+            total["calls"] += 1
+            total["response_cache_hits"] += cached_response
+            total["prompt_tokens"] += call.prompt_tokens
+            total["completion_tokens"] += call.completion_tokens
+            total["cached_prompt_tokens"] += call.cached_prompt_tokens
+            total["total_latency"] += latency
+        return call
+
+    def project_usage(self, project_id: str) -> Dict[str, Any]:
+        return dict(self.by_project.get(project_id) or self._empty())
+
+    def recent_calls(self, limit: int = 50, project_id: str = None) -> List[Dict[str, Any]]:
+        calls = [call for call in self.calls if project_id is None or call.project_id == project_id]
+        return [asdict(call) for call in calls[-limit:]]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "agents": {agent: dict(total) for agent, total in self.by_agent.items()},
+            "projects": len(self.by_project)
+        }
+
+    @staticmethod
+    def _empty() -> Dict[str, float]:
+        return {"calls": 0, "response_cache_hits": 0, "prompt_tokens": 0, "completion_tokens": 0,
+                "cached_prompt_tokens": 0, "total_latency": 0.0}
+
+# Example usage
+async def main():
+    budgeter = TokenBudgeter(budgets={"development": AgentBudget(max_context_tokens=120)})
+    fixed = [{"role": "system", "content": "You are Dr. Elena Rodriguez."},
+             {"role": "user", "content": "Create characters for a fantasy novel."}]
+    passages = [
+        "Fantasy stories often feature a Chosen One.   A mentor guides the hero.\n\n\n",
+        "Fantasy stories often feature a Chosen One. A mentor guides the hero.",
+        "Magic systems need clear costs and limits. " * 20,
+        "Dark Lords make memorable antagonists."
+    ]
+    print(f"Prompt tokens: {count_message_tokens(fixed)}")
+    print(f"Fitted context: {budgeter.fit_context('development', passages, fixed)}")
+    print(budgeter.get_stats())
+
+    ledger = TokenLedger()
+    with project_scope("book_42"):
+        ledger.record("development", "gpt-4o-mini", {"prompt_tokens": 900, "completion_tokens": 400,
+                                                      "prompt_tokens_details": {"cached_tokens": 256}})
+    print(ledger.project_usage("book_42"))
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,198 @@
+import asyncio
+import json
+from typing import Dict, Any
+
+import numpy as np
+
+class Float32Codec:
+    """
+    Identity codec: stores full-precision vectors
+    """
+    name = "none"
+
+    def train(self, vectors: np.ndarray):
+        return self
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        return np.ascontiguousarray(vectors, dtype=np.float32)
+
+    def scores(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        return codes @ query
+
+    def nbytes(self, codes: np.ndarray) -> int:
+        return int(codes.nbytes)
+
+    def overhead_bytes(self) -> int:
+        return 0
+
+class Int8Codec:
+    """
+    Scalar quantization to one signed byte per dimension (4x smaller than float32).
+    Each dimension gets its own offset and scale learned from the training vectors.
+    """
+    name = "int8"
+
+    def __init__(self, block_size: int = 4096):
+        self.block_size = block_size
+        self.offset = None
+        self.scale = None
+
+    def train(self, vectors: np.ndarray):
+        if not len(vectors):
+            raise ValueError("int8 codec needs at least one training vector")
+        low = vectors.min(axis=0)
+        high = vectors.max(axis=0)
+        self.scale = np.maximum(high - low, 1e-12).astype(np.float32) / 255.0
+        self.offset = (low + 128.0 * self.scale).astype(np.float32)
+        return self
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        codes = np.rint((vectors - self.offset) / self.scale)
+        return np.clip(codes, -128, 127).astype(np.int8)
+
+    def scores(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        # q . (code * scale + offset) = code . (q * scale) + q . offset
+        scaled_query = (query * self.scale).astype(np.float32)
+        bias = float(query @ self.offset)
+        out = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), self.block_size):
+            block = codes[start:start + self.block_size].astype(np.float32)
+            out[start:start + len(block)] = block @ scaled_query + bias
+        return out
+
+    def nbytes(self, codes: np.ndarray) -> int:
+        return int(codes.nbytes)
+
+    def overhead_bytes(self) -> int:
+        return int(self.scale.nbytes + self.offset.nbytes)
+
+class ProductQuantizer:
+    """
+    Product quantization: each vector is split into subvectors, and every subvector
+    is replaced by the index of its nearest centroid (one byte per subvector).
+    With the default 4 dimensions per subvector this is 16x smaller than float32.
+    """
+    name = "pq"
+
+    def __init__(self, subvector_dim: int = 4, n_centroids: int = 256, iterations: int = 12, seed: int = 0):
+        self.subvector_dim = subvector_dim
+        self.n_centroids = n_centroids
+        self.iterations = iterations
+        self.seed = seed
+        self.codebooks = None
+
+    def train(self, vectors: np.ndarray):
+        if not len(vectors):
+            raise ValueError("product quantizer needs at least one training vector")
+        subvectors = self._split(vectors)
+        rng = np.random.default_rng(self.seed)
+        n_centroids = min(self.n_centroids, len(vectors))
+        codebooks = []
+        for sub in subvectors:
+            centroids = sub[rng.choice(len(sub), n_centroids, replace=False)].copy()
+            for _ in range(self.iterations):
+                assignment = self._nearest(sub, centroids)
+                counts = np.bincount(assignment, minlength=n_centroids)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, assignment, sub)
+                filled = counts > 0
+                centroids[filled] = sums[filled] / counts[filled, None]
+            codebooks.append(centroids)
+        self.codebooks = np.stack(codebooks).astype(np.float32)
+        return self
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        subvectors = self._split(vectors)
+        return np.stack(
+            [self._nearest(sub, centroids) for sub, centroids in zip(subvectors, self.codebooks)],
+            axis=1
+        ).astype(np.uint8)
+
+    def scores(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        # Asymmetric distance: one lookup table per subspace, then gather and sum
+        query_subvectors = self._split(query[None, :])[:, 0, :]
+        table = np.einsum("mkd,md->mk", self.codebooks, query_subvectors)
+        return table[np.arange(table.shape[0]), codes].sum(axis=1)
+
+    def nbytes(self, codes: np.ndarray) -> int:
+        return int(codes.nbytes)
+
+    def overhead_bytes(self) -> int:
+        return int(self.codebooks.nbytes)
+
+    def _split(self, vectors: np.ndarray) -> np.ndarray:
+        """Reshape (n, d) into (m, n, subvector_dim), zero-padding d if needed"""
+        n, d = vectors.shape
+        m = -(-d // self.subvector_dim)
+        padded = np.zeros((n, m * self.subvector_dim), dtype=np.float32)
+        padded[:, :d] = vectors
+        return padded.reshape(n, m, self.subvector_dim).transpose(1, 0, 2)
+
+    @staticmethod
+    def _nearest(sub: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        distances = (sub ** 2).sum(1)[:, None] - 2 * sub @ centroids.T + (centroids ** 2).sum(1)[None, :]
+        return distances.argmin(axis=1)
+
+CODECS = {
+    "none": Float32Codec,
+    "int8": Int8Codec,
+    "pq": ProductQuantizer
+}
+
+def create_codec(quantization: str = "none", **options):
+    """Create an untrained codec by name ("none", "int8" or "pq")"""
+    if quantization not in CODECS:
+        raise ValueError(f"Unknown quantization '{quantization}', expected one of {list(CODECS)}")
+    return CODECS[quantization](**options)
+
+def evaluate_recall(vectors: np.ndarray, queries: np.ndarray, quantization: str = "int8",
+                    k: int = 10, rerank_factor: int = 4, **codec_options) -> Dict[str, Any]:
+    """
+    Measure recall@k of quantized search (with full-precision re-ranking of the
+    top k * rerank_factor candidates) against exact float32 search.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    queries = np.asarray(queries, dtype=np.float32)
+    k = min(k, len(vectors))
+    codec = create_codec(quantization, **codec_options).train(vectors)
+    codes = codec.encode(vectors)
+
+    hits = 0
+    hits_without_rerank = 0
+    for query in queries:
+        exact = set(np.argsort(-(vectors @ query))[:k].tolist())
+        approx = codec.scores(codes, query)
+        n_candidates = min(len(vectors), k * max(rerank_factor, 1))
+        candidates = np.argpartition(-approx, n_candidates - 1)[:n_candidates]
+        reranked = candidates[np.argsort(-(vectors[candidates] @ query))][:k]
+        hits += len(exact & set(reranked.tolist()))
+        hits_without_rerank += len(exact & set(np.argsort(-approx)[:k].tolist()))
+
+    full_bytes = int(vectors.nbytes)
+    quantized_bytes = codec.nbytes(codes) + codec.overhead_bytes()
+    return {
+        "quantization": quantization,
+        "k": k,
+        "rerank_factor": rerank_factor,
+        "recall_at_k": hits / (k * len(queries)) if len(queries) else 1.0,
+        "recall_without_rerank": hits_without_rerank / (k * len(queries)) if len(queries) else 1.0,
+        "full_precision_bytes": full_bytes,
+        "quantized_bytes": quantized_bytes,
+        "compression_ratio": full_bytes / quantized_bytes if quantized_bytes else 0.0
+    }
+
+# Example usage
+async def main():
+    rng = np.random.default_rng(42)
+    # Clustered data behaves much more like real embeddings than uniform noise
+    centers = rng.normal(size=(64, 256)).astype(np.float32)
+    vectors = centers[rng.integers(0, 64, 5000)] + 0.3 * rng.normal(size=(5000, 256)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    queries = vectors[rng.choice(5000, 50, replace=False)] + 0.05 * rng.normal(size=(50, 256)).astype(np.float32)
+
+    for quantization in ["int8", "pq"]:
+        report = evaluate_recall(vectors, queries, quantization=quantization, k=10)
+        print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    asyncio.run(main())
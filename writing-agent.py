@@ -0,0 +1,359 @@
+import asyncio
+import os
+import re
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Any, AsyncIterator
+import importlib.util
+
+spec = importlib.util.spec_from_file_location("crew_ai_integration", "crew-ai-integration.py")
+crew_ai_module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(crew_ai_module)
+CrewAIIntegration = crew_ai_module.CrewAIIntegration
+
+# Load once per process so every agent shares one connection pool
+llm_client_module = sys.modules.get("llm_client")
+if llm_client_module is None:
+    spec = importlib.util.spec_from_file_location("llm_client", "llm-client.py")
+    llm_client_module = importlib.util.module_from_spec(spec)
+    sys.modules["llm_client"] = llm_client_module
+    spec.loader.exec_module(llm_client_module)
+LLMClientPool = llm_client_module.LLMClientPool
+get_llm_client = llm_client_module.get_llm_client
+token_budget_module = llm_client_module.token_budget_module
+TokenBudgeter = token_budget_module.TokenBudgeter
+truncate_tokens = token_budget_module.truncate_tokens
+count_tokens = token_budget_module.count_tokens
+
+spec = importlib.util.spec_from_file_location("outline_tree", "outline-tree.py")
+outline_tree_module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(outline_tree_module)
+OutlineTree = outline_tree_module.OutlineTree
+OutlineNode = outline_tree_module.OutlineNode
+
+DEFAULT_CHAPTER_COUNT = 12
+
+# Story beats a default outline is spread over, in order
+DEFAULT_BEATS = [
+    ("Opening Image", "Introduce the protagonist in their ordinary world and hint at what is missing."),
+    ("The Inciting Incident", "An event disrupts the ordinary world and poses the central question."),
+    ("Crossing the Threshold", "The protagonist commits to the journey and leaves safety behind."),
+    ("New Allies and Rivals", "Relationships form and the rules of the new situation are tested."),
+    ("Rising Stakes", "Early wins give way to complications that raise the cost of failure."),
+    ("The Midpoint", "A revelation changes the protagonist's understanding of the goal."),
+    ("Closing In", "The antagonist's pressure tightens and the team begins to fracture."),
+    ("All Is Lost", "A major defeat strips away the protagonist's false beliefs."),
+    ("The Dark Night", "The protagonist confronts their flaw and finds a new resolve."),
+    ("The Final Plan", "Allies regroup and the protagonist takes decisive action."),
+    ("The Climax", "The central conflict comes to a head and the central question is answered."),
+    ("Resolution", "Show the new world and how the protagonist has changed.")
+]
+
+@dataclass
+class ChapterPlan:
+    number: int
+    title: str
+    summary: str
+    word_target: int = 0
+    scenes: List[str] = field(default_factory=list)
+
+    @classmethod
+    def from_node(cls, chapter: OutlineNode) -> "ChapterPlan":
+        return cls(
+            number=chapter.number,
+            title=chapter.title,
+            summary=chapter.summary,
+            word_target=chapter.total_target(),
+            scenes=[f"{scene.title}: {scene.summary}" if scene.summary else scene.title for scene in chapter.children]
+        )
+
+@dataclass
+class Chapter:
+    number: int
+    title: str
+    text: str
+    summary: str
+    word_count: int
+    model: str = None
+    revised_opening: bool = False
+
+    @classmethod
+    def from_text(cls, number: int, title: str, text: str, model: str = None) -> "Chapter":
+        return cls(number=number, title=title, text=text, summary=summarize(text),
+                   word_count=len(text.split()), model=model)
+
+@dataclass
+class StoryBible:
+    """
+    The compact shared context every chapter is written against.
+    It is rendered once per fan-out and the text is identical for every chapter
+    call in it, so it forms a cacheable prompt prefix. Summaries of the chapters
+    actually written are applied only after the fan-out completes.
+    """
+    title: str
+    genre: str
+    tone: str
+    premise: str
+    characters: List[str] = field(default_factory=list)
+    world: str = ""
+    style_notes: List[str] = field(default_factory=list)
+    chapter_summaries: Dict[int, str] = field(default_factory=dict)
+
+    @classmethod
+    def from_project(cls, project, plans: List[ChapterPlan]) -> "StoryBible":
+        return cls(
+            title=project.title or "Untitled",
+            genre=project.genre or "",
+            tone=project.tone or "",
+            premise=project.requirements or "",
+            characters=[_describe(character) for character in getattr(project, "characters", None) or []],
+            world=_describe(getattr(project, "world", None) or ""),
+            chapter_summaries={plan.number: f"{plan.title}: {plan.summary}" for plan in plans}
+        )
+
+    def render(self, max_tokens: int = None, around: List[int] = None) -> str:
+        """
+        The bible as prompt text, within max_tokens when given.
+        Over budget, the character and world lines are trimmed first; if the chapter
+        summaries alone still do not fit, those furthest from the chapters in `around`
+        (the ones being written) are left out.
+        """
+        head = [f"BOOK: {self.title} ({self.genre}, {self.tone})", f"PREMISE: {self.premise}"]
+        lore = []
+        if self.characters:
+            lore.append("CHARACTERS:\n" + "\n".join(f"- {c}" for c in self.characters))
+        if self.world:
+            lore.append(f"WORLD: {self.world}")
+        style = ["STYLE NOTES:\n" + "\n".join(f"- {note}" for note in self.style_notes)] if self.style_notes else []
+        lines = {number: f"{number}. {summary}" for number, summary in self.chapter_summaries.items()}
+
+        def join(lore, numbers):
+            chapters = "CHAPTERS:\n" + "\n".join(lines[number] for number in sorted(numbers))
+            return "\n\n".join(head + lore + style + [chapters])
+
+        text = join(lore, lines)
+        if not max_tokens or count_tokens(text) <= max_tokens:
+            return text
+        # Two tokens per trimmed section cover the blank line that joins it on
+        spare = max_tokens - count_tokens(join([], lines)) - 2 * len(lore)
+        if spare > 0:
+            costs = [count_tokens(section) for section in lore]
+            trimmed = [truncate_tokens(section, spare * cost // sum(costs)) for section, cost in zip(lore, costs)]
+            return truncate_tokens(join([section for section in trimmed if section], lines), max_tokens)
+
+        around = around or sorted(lines)
+        spare = max_tokens - count_tokens(join([], []))
+        kept = []
+        for number in sorted(lines, key=lambda n: (min(abs(n - focus) for focus in around), n)):
+            cost = count_tokens(lines[number]) + 1
+            if cost > spare:
+                break
+            kept.append(number)
+            spare -= cost
+        return truncate_tokens(join([], kept), max_tokens)
+
+def _describe(entity: Any) -> str:
+    """One bible line for a character or world, given as text, a dict or a development-agent dataclass"""
+    if isinstance(entity, str):
+        return entity
+    get = entity.get if isinstance(entity, dict) else lambda key: getattr(entity, key, None)
+    name, role, description = get("name"), get("role"), get("description")
+    line = f"{name} ({role})" if role else name or ""
+    if description:
+        line = f"{line}: {description}" if line else description
+    traits = get("personality_traits")
+    if traits:
+        line = f"{line}; {', '.join(traits)}"
+    return line
+
+def default_outline(title: str, genre: str, chapters: int = DEFAULT_CHAPTER_COUNT) -> str:
+    """A beat-sheet outline, one "Chapter N: Title - summary" line per chapter"""
+    lines = [f"Outline for {title} ({genre})"]
+    for number in range(1, chapters + 1):
+        beat_title, beat = DEFAULT_BEATS[(number - 1) * len(DEFAULT_BEATS) // chapters]
+        lines.append(f"Chapter {number}: {beat_title} - {beat}")
+    return "\n".join(lines)
+
+def parse_outline(outline: str) -> List[ChapterPlan]:
+    """Chapter plans from a text outline ("Chapter N: Title - summary" lines, optionally with acts and scenes)"""
+    return [ChapterPlan.from_node(chapter) for chapter in OutlineTree.from_outline(outline, words_per_chapter=0).chapters()]
+
+def summarize(text: str, max_tokens: int = 80) -> str:
+    """Extractive summary: the opening sentence and the last two, where the chapter lands"""
+    sentences = re.split(r"(?<=[.!?])\s+", " ".join(text.split()))
+    picked = sentences if len(sentences) <= 3 else [sentences[0]] + sentences[-2:]
+    return truncate_tokens(" ".join(picked), max_tokens)
+
+class WritingAgent:
+    """
+    Writes chapters concurrently from the outline.
+
+    Every chapter is conditioned on the same story bible (characters, world and
+    planned summaries of all chapters), so chapters do not wait on each other and
+    at most `workers` are in flight. The bible is frozen for the whole fan-out, so
+    what a chapter sees does not depend on which others finished first. Each
+    opening is then reconciled with the real ending of the chapter before it, as
+    soon as that one is written too, and the bible takes the actual summaries
+    once the fan-out is done. Chapters are handed on in completion order, so
+    downstream stages need not wait for the book.
+    """
+
+    def __init__(self, llm_client: LLMClientPool = None, crew_ai: CrewAIIntegration = None,
+                 token_budgeter: TokenBudgeter = None, workers: int = None):
+        self.name = "Writing Agent"
+        self.rag_knowledge = ["writing_styles", "genre_conventions"]
+        self.knowledge = None
+        self.llm_client = llm_client or get_llm_client()
+        self.crew_ai = crew_ai or CrewAIIntegration()
+        self.token_budgeter = token_budgeter or TokenBudgeter()
+        self.budget = self.token_budgeter.budget_for("writing")
+        self.workers = workers or int(os.getenv("WRITING_WORKERS", 8))
+        self.stats = {
+            "books": 0, "chapters_written": 0, "template_chapters": 0, "openings_revised": 0,
+            "max_in_flight": 0, "total_write_time": 0.0
+        }
+        self._in_flight = 0
+
+    async def write_book(self, bible: StoryBible, plans: List[ChapterPlan],
+                         earlier: Dict[int, Chapter] = None) -> List[Chapter]:
+        chapters = [chapter async for chapter in self.stream_book(bible, plans, earlier)]
+        return sorted(chapters, key=lambda c: c.number)
+
+    async def stream_book(self, bible: StoryBible, plans: List[ChapterPlan],
+                          earlier: Dict[int, Chapter] = None) -> AsyncIterator[Chapter]:
+        """
+        Yield each chapter, continuity-reconciled, as soon as it is ready.
+        earlier holds chapters written by previous fan-outs (e.g. earlier approvals);
+        a chapter whose predecessor is there is reconciled against it directly.
+        """
+        started = time.monotonic()
+        bible.style_notes = bible.style_notes or self._style_notes(bible.genre)
+        prefix = bible.render(self.budget.max_context_tokens, [plan.number for plan in plans])
+        semaphore = asyncio.Semaphore(self.workers)
+        written = {plan.number: asyncio.Event() for plan in plans}
+        chapters: Dict[int, Chapter] = {}
+        earlier = earlier or {}
+
+        async def produce(plan: ChapterPlan) -> Chapter:
+            async with semaphore:
+                chapter = await self.write_chapter(bible, plan, prefix)
+            chapters[plan.number] = chapter
+            written[plan.number].set()
+            # The predecessor is chapter number - 1, not the previous plan: plans may skip chapters
+            previous_number = plan.number - 1
+            if self.llm_client.enabled and (previous_number in written or previous_number in earlier):
+                if previous_number in written:
+                    await written[previous_number].wait()
+                previous = chapters.get(previous_number) or earlier[previous_number]
+                async with semaphore:
+                    await self._revise_opening(prefix, previous, chapter)
+            return chapter
+
+        tasks = [asyncio.ensure_future(produce(plan)) for plan in plans]
+        try:
+            for next_ready in asyncio.as_completed(tasks):
+                yield await next_ready
+        finally:
+            for task in tasks:
+                task.cancel()
+        bible.chapter_summaries.update(
+            {number: f"{chapter.title}: {chapter.summary}" for number, chapter in chapters.items()}
+        )
+        self.stats["books"] += 1
+        self.stats["total_write_time"] += time.monotonic() - started
+
+    async def write_chapter(self, bible: StoryBible, plan: ChapterPlan, prefix: str = None) -> Chapter:
+        self._in_flight += 1
+        self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self._in_flight)
+        try:
+            text, model = None, None
+            if self.llm_client.enabled:
+                try:
+                    result = await self.llm_client.chat(
+                        self._chapter_messages(bible, plan, prefix), agent="writing", call_class="final_writing",
+                        max_tokens=self.budget.max_completion_tokens
+                    )
+                    text, model = result.text.strip(), result.model
+                except Exception as e:
+                    print(f"Chapter {plan.number} generation failed, using template: {e}")
+            if not text:
+                text = self._template_chapter(bible, plan)
+                self.stats["template_chapters"] += 1
+            self.stats["chapters_written"] += 1
+            return Chapter.from_text(plan.number, plan.title, text, model)
+        finally:
+            self._in_flight -= 1
+
+    async def _revise_opening(self, prefix: str, previous: Chapter, chapter: Chapter):
+        paragraphs = chapter.text.split("\n\n")
+        # Same frozen bible as the fan-out; the actual ending goes in the tail
+        task = (
+            f"{prefix}\n\n"
+            f"Chapter {previous.number} ended: {previous.summary}\n\n"
+            f"Opening paragraph of chapter {chapter.number}:\n{paragraphs[0]}\n\n"
+            "If the opening contradicts how the previous chapter ended (who is present, where they are, "
+            "what they know), rewrite it to follow on. Reply with the paragraph only, unchanged if it already fits."
+        )
+        try:
+            result = await self.llm_client.chat(
+                self.crew_ai.create_personality_messages("editing", task), agent="writing",
+                call_class="editing", max_tokens=600
+            )
+        except Exception as e:
+            print(f"Continuity pass for chapter {chapter.number} failed: {e}")
+            return
+        revised = result.text.strip()
+        if revised and revised != paragraphs[0].strip():
+            paragraphs[0] = revised
+            chapter.text = "\n\n".join(paragraphs)
+            chapter.word_count = len(chapter.text.split())
+            chapter.revised_opening = True
+            self.stats["openings_revised"] += 1
+
+    def _chapter_messages(self, bible: StoryBible, plan: ChapterPlan, prefix: str = None) -> List[Dict[str, str]]:
+        # The bible comes first and is the same for every chapter; only the tail varies
+        task = (
+            f"{prefix or bible.render(self.budget.max_context_tokens, [plan.number])}\n\n"
+            f"Write chapter {plan.number}, \"{plan.title}\": {plan.summary}\n"
+            + "".join(f"- Scene: {scene}\n" for scene in plan.scenes)
+            + (f"Aim for about {plan.word_target} words.\n" if plan.word_target else "")
+            + "Stay consistent with the characters, world and the other chapters' summaries. "
+            "Reply with the chapter prose only, paragraphs separated by blank lines."
+        )
+        return self.crew_ai.create_personality_messages("writing", task)
+
+    def _style_notes(self, genre: str) -> List[str]:
+        if self.knowledge is None:
+            return []
+        results = self.knowledge.search(f"{genre} prose style voice pacing", k=3, genre=genre or None)
+        return self.token_budgeter.fit_context("writing", [result.text for result in results])
+
+    @staticmethod
+    def _template_chapter(bible: StoryBible, plan: ChapterPlan) -> str:
+        lead = bible.characters[0].split(" (")[0] if bible.characters else "Our protagonist"
+        return "\n\n".join([
+            f"{lead} faced the next turn of the story. {plan.summary}",
+            f"The {bible.tone or 'steady'} mood of {bible.title} carried through every scene, "
+            f"as the {bible.genre or 'story'} moved toward its next turning point."
+        ])
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.stats, workers=self.workers, in_flight=self._in_flight)
+
+# Example usage
+async def main():
+    class Project:
+        title, genre, tone = "The Clockwork Heir", "fantasy", "adventurous"
+        requirements = "A young tinkerer discovers she is heir to a mechanical kingdom"
+        characters = ["Mira (protagonist): a tinkerer who distrusts the crown"]
+
+    plans = parse_outline(default_outline(Project.title, Project.genre, chapters=6))
+    agent = WritingAgent(workers=3)
+    chapters = await agent.write_book(StoryBible.from_project(Project, plans), plans)
+    for chapter in chapters:
+        print(f"Chapter {chapter.number}: {chapter.title} ({chapter.word_count} words) - {chapter.summary[:60]}")
+    print(agent.get_stats())
+
+if __name__ == "__main__":
+    asyncio.run(main())